@@ -14,6 +14,7 @@ export const ML_ENDPOINTS = {
   RETRAIN: '/retrain-model',
   STATS: '/model-stats',
   PENDING_REPORTS: '/get-pending-reports',
+  MODERATE_REPORTS: '/moderate-reports',
   HEALTH: '/health',
 } as const
 
@@ -26,6 +27,7 @@ export interface MLPrediction {
   requires_immediate_action: boolean
   ml_confidence: number
   pattern_confidence: number
+  degraded?: boolean // pattern-only while the ML server is warming up
 }
 
 export interface AbuseReport {
@@ -41,4 +43,19 @@ export interface TrainingData {
   userId?: number
   prediction: any
   humanLabel?: 'hate_speech' | 'not_hate_speech'
-} 
\ No newline at end of file
+} 
+export interface BulkModerationRequest {
+  action: 'resolve' | 'dismiss' | 'escalate'
+  moderatorId: number
+  reportIds?: number[]
+  contentHash?: string
+  filter?: {
+    status?: string
+    severity?: MLPrediction['severity']
+    reportedUserId?: number
+    requiresImmediateAction?: boolean
+    createdBefore?: string
+    createdAfter?: string
+  }
+  recordLabels?: boolean
+}
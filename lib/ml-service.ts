@@ -1,4 +1,4 @@
-import { ML_CONFIG, ML_ENDPOINTS, type MLPrediction, type AbuseReport, type TrainingData } from './ml-config'
+import { ML_CONFIG, ML_ENDPOINTS, type MLPrediction, type AbuseReport, type TrainingData, type BulkModerationRequest } from './ml-config'
 
 class MLService {
   private async makeRequest<T>(
@@ -72,6 +72,15 @@ class MLService {
     })
   }
 
+  // Admin route: call from server code only, with ML_ADMIN_TOKEN matching the ML server's ADMIN_TOKEN
+  async moderateReports(request: BulkModerationRequest): Promise<any> {
+    return this.makeRequest(ML_ENDPOINTS.MODERATE_REPORTS, {
+      method: 'POST',
+      body: JSON.stringify(request),
+      headers: process.env.ML_ADMIN_TOKEN ? { 'X-Admin-Token': process.env.ML_ADMIN_TOKEN } : {},
+    })
+  }
+
   async healthCheck(): Promise<any> {
     return this.makeRequest(ML_ENDPOINTS.HEALTH, {
       method: 'GET',
@@ -3,25 +3,34 @@ HOPE - Advanced Psychological Counseling AI System
 A comprehensive AI-powered mental health support system for SafeSocial platform
 """
 
+import atexit
+import base64
+import gzip
 import json
 import logging
 import os
 import pickle
-import re
+import queue
 import sqlite3
 import random
-from datetime import datetime
-from threading import Lock
+import time
+import uuid
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from threading import Condition, Event, Lock, Thread
 
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
 import traceback
 
+from memory_introspection import MemoryMonitor
+from pattern_config import PatternStore, PatternWatcher
+from request_profiler import PROFILER_DEFAULT_INTERVAL_MS, RequestProfiler, admin_only
+from service_startup import StartupState
+from text_normalization import AnalyzedText, analyze_text, preprocess_counseling_text, text_windows
+
 app = Flask(__name__)
 
 # Configure logging
@@ -39,9 +48,72 @@ model_lock = Lock()
 # Database path for Hope's training data
 DB_PATH = "hope_training_data.db"
 
+# Conversation history paging limits
+CONVERSATIONS_DEFAULT_PAGE_SIZE = 50
+CONVERSATIONS_MAX_PAGE_SIZE = 200
+
+# Escalation feed settings
+ESCALATION_BUFFER_SIZE = 1000
+ESCALATION_BATCH_SIZE = 100
+ESCALATION_MAX_WAIT_SECONDS = 30
+ESCALATION_HEARTBEAT_SECONDS = 15
+# Write attempts per publish; events still unwritten are retried by the next publish
+ESCALATION_PERSIST_ATTEMPTS = 3
+
+# Conversation log settings
+CONVERSATION_BATCH_SIZE = 200
+CONVERSATION_FLUSH_SECONDS = 0.5
+CONVERSATION_QUEUE_SIZE = 10000
+CONVERSATION_ARCHIVE_CHECK_SECONDS = 3600
+CONVERSATION_RETENTION_MONTHS = int(os.environ.get('HOPE_CONVERSATION_RETENTION_MONTHS', 6))
+CONVERSATION_ARCHIVE_DIR = os.environ.get('HOPE_ARCHIVE_DIR', 'hope_archive')
+
+# Longest message analyzed; longer text is analyzed in overlapping windows
+MAX_MESSAGE_CHARS = int(os.environ.get('HOPE_MAX_MESSAGE_CHARS', 5000))
+ANALYSIS_WINDOW_CHARS = 1000
+ANALYSIS_WINDOW_OVERLAP = 200
+
+# Crisis keyword groups in priority order and the crisis level each one signals
+CRISIS_KEYWORD_ORDER = ('suicide', 'self_harm', 'abuse', 'emergency')
+CRISIS_LEVEL_BY_GROUP = {
+    'suicide': 'suicide_crisis',
+    'self_harm': 'self_harm_crisis',
+    'abuse': 'abuse_crisis',
+    'emergency': 'emergency'
+}
+
+# Background training settings
+TRAINING_CHUNK_SIZE = 1000
+TRAINING_HOLDOUT_PERCENT = 20
+TRAINING_JOB_HISTORY = 20
+
+# Synthetic messages analyzed during warm-up so the first real message is not the slowest
+WARMUP_MESSAGES = (
+    "I've been feeling really stressed and alone lately",
+    "Someone keeps posting mean comments about me online",
+)
+
+# Startup phase timings; the model loads in the background after the port binds
+startup = StartupState()
+
+# Switchable live-request profiler; idle unless an admin starts a session
+request_profiler = RequestProfiler()
+request_profiler.install(app)
+
 class HopeCounselingAI:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
+        # Fitted objects come from load_model or training, so sklearn loads only when needed
+        self.vectorizer = None
+        self.model = None
+        self.is_trained = False
+        self.counseling_patterns = self._load_counseling_patterns()
+        self.user_memory = {}  # Store user conversation history
+        self.crisis_keywords = self._load_crisis_keywords()
+        
+    def build_vectorizer(self):
+        """Create an unfitted vectorizer with Hope's feature settings"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(
             max_features=10000,
             ngram_range=(1, 3),
             stop_words='english',
@@ -49,117 +121,37 @@ class HopeCounselingAI:
             min_df=2,
             max_df=0.8
         )
-        self.model = LogisticRegression(
+
+    def build_model(self):
+        """Create an unfitted classifier with Hope's model settings"""
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(
             random_state=42,
             class_weight='balanced',
             C=1.0
         )
-        self.is_trained = False
-        self.counseling_patterns = self._load_counseling_patterns()
-        self.user_memory = {}  # Store user conversation history
-        self.crisis_keywords = self._load_crisis_keywords()
-        
+
     def _load_counseling_patterns(self):
-        """Load comprehensive counseling and mental health support patterns"""
-        patterns = {
-            'crisis_suicide': [
-                r'\b(kill.*self|suicide|want.*die|end.*life|don.*want.*live)\b',
-                r'\b(better.*off.*dead|no.*reason.*live|everyone.*better.*without.*me)\b',
-                r'\b(want.*end.*it|life.*not.*worth|no.*point.*living)\b'
-            ],
-            'crisis_self_harm': [
-                r'\b(hurt.*self|cut.*self|self.*harm|want.*pain|deserve.*pain)\b',
-                r'\b(self.*injury|burn.*self|hit.*self)\b'
-            ],
-            'abuse_domestic': [
-                r'\b(girlfriend|boyfriend|partner|spouse|husband|wife).*abusive\b',
-                r'\b(domestic.*violence|physical.*abuse|emotional.*abuse)\b',
-                r'\b(being.*hit|being.*yelled.*at|being.*controlled)\b',
-                r'\b(partner.*violent|relationship.*toxic)\b'
-            ],
-            'abuse_online': [
-                r'\b(harass.*online|cyber.*bully|online.*bully|stalk.*online)\b',
-                r'\b(someone.*following|threat.*online|hate.*messages)\b',
-                r'\b(being.*stalked|online.*threats|cyber.*stalking)\b'
-            ],
-            'hate_speech': [
-                r'\b(hate.*speech|called.*names|racial.*slur|discrimination)\b',
-                r'\b(targeted.*because|hate.*content|offensive.*comments)\b',
-                r'\b(racist.*comments|homophobic|transphobic|sexist)\b',
-                r'\b(religious.*hate|ethnic.*slur)\b'
-            ],
-            'depression': [
-                r'\b(depression|depressed|clinical.*depression|major.*depression)\b',
-                r'\b(feeling.*down|no.*energy|can.*t.*get.*out.*bed)\b',
-                r'\b(hopeless|worthless|empty|sad|miserable)\b'
-            ],
-            'anxiety': [
-                r'\b(anxious|worried|nervous|panic|stress|overwhelm)\b',
-                r'\b(scared|fear|anxiety|panic.*attack|overwhelmed)\b'
-            ],
-            'grief': [
-                r'\b(grief|grieving|lost.*someone|death|passed.*away)\b',
-                r'\b(bereaved|mourning)\b'
-            ],
-            'relationship': [
-                r'\b(relationship.*problems|marriage.*problems|dating.*problems)\b',
-                r'\b(breakup|divorce|cheating|trust.*issues|communication.*problems)\b'
-            ],
-            'work_stress': [
-                r'\b(work.*stress|job.*problems|boss.*problems|workplace.*bully)\b',
-                r'\b(job.*loss|unemployment|career.*problems)\b'
-            ],
-            'financial': [
-                r'\b(money.*problems|financial.*stress|debt|bills)\b',
-                r'\b(can.*t.*pay|financial.*crisis|money.*worries)\b'
-            ],
-            'health': [
-                r'\b(health.*problems|medical.*issues|chronic.*pain|illness)\b',
-                r'\b(sick|health.*worries|medical.*stress)\b'
-            ],
-            'lonely': [
-                r'\b(lonely|alone|no.*friends|isolated|no.*one.*cares)\b',
-                r'\b(no.*support|by.*myself|no.*one.*understands|friendless)\b'
-            ],
-            'call_help': [
-                r'\b(call.*help|need.*help|emergency|urgent|immediate.*help)\b',
-                r'\b(crisis|help.*now)\b'
-            ]
-        }
-        return patterns
+        """Load counseling and mental health support patterns (patterns/counseling_patterns.json)"""
+        return PatternStore('counseling_patterns.json')
 
     def _load_crisis_keywords(self):
-        """Load crisis keywords for immediate intervention"""
-        return {
-            'suicide': ['kill myself', 'suicide', 'want to die', 'end my life', 'better off dead'],
-            'self_harm': ['hurt myself', 'cut myself', 'self harm', 'want pain'],
-            'abuse': ['abusive', 'domestic violence', 'being hit', 'threatened'],
-            'emergency': ['emergency', 'urgent', 'crisis', 'help now', 'immediate help']
-        }
+        """Load crisis keywords for immediate intervention (patterns/crisis_keywords.json)"""
+        return PatternStore('crisis_keywords.json', kind='keywords', required=CRISIS_KEYWORD_ORDER)
 
     def _preprocess_text(self, text):
-        """Preprocess text for analysis"""
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        """Preprocess text for analysis (shared with training)"""
+        return preprocess_counseling_text(text)
 
-    def _pattern_based_analysis(self, text):
-        """Analyze text using pattern matching for counseling categories"""
-        text_lower = text.lower()
+    def _pattern_based_analysis(self, text_lower):
+        """Analyze preprocessed (lowercased) text using pattern matching for counseling categories"""
         categories = {}
         max_confidence = 0.0
         
-        for category, patterns in self.counseling_patterns.items():
+        for category, patterns in self.counseling_patterns.current.entries.items():
             matches = 0
             for pattern in patterns:
-                if re.search(pattern, text_lower):
+                if pattern.search(text_lower):
                     matches += 1
             
             if matches > 0:
@@ -170,59 +162,77 @@ class HopeCounselingAI:
         
         return categories, max_confidence
 
-    def _check_crisis_level(self, text):
-        """Check for crisis-level situations requiring immediate intervention"""
-        text_lower = text.lower()
+    def _check_crisis_level(self, text_lower):
+        """Check preprocessed (lowercased) text for crisis-level situations requiring immediate intervention"""
         crisis_level = 'none'
+        keywords = self.crisis_keywords.current.entries
         
-        # Check for suicide crisis
-        for keyword in self.crisis_keywords['suicide']:
-            if keyword in text_lower:
-                return 'suicide_crisis'
-        
-        # Check for self-harm crisis
-        for keyword in self.crisis_keywords['self_harm']:
-            if keyword in text_lower:
-                return 'self_harm_crisis'
-        
-        # Check for abuse crisis
-        for keyword in self.crisis_keywords['abuse']:
-            if keyword in text_lower:
-                return 'abuse_crisis'
-        
-        # Check for general emergency
-        for keyword in self.crisis_keywords['emergency']:
-            if keyword in text_lower:
-                return 'emergency'
+        # Suicide, then self-harm, abuse and general emergency
+        for level in CRISIS_KEYWORD_ORDER:
+            for keyword in keywords[level]:
+                if keyword in text_lower:
+                    return CRISIS_LEVEL_BY_GROUP[level]
         
         return crisis_level
 
     def analyze_message(self, text, user_id=None):
-        """Analyze user message and provide counseling response"""
+        """Analyze user message (str or AnalyzedText) and provide counseling response"""
         try:
-            processed_text = self._preprocess_text(text)
+            analysis = analyze_text(text)
+            text = analysis.text
+            length = len(text)
+            truncated = length > MAX_MESSAGE_CHARS
+            if truncated:
+                text = text[:MAX_MESSAGE_CHARS]
+                analysis = AnalyzedText(text)
             
-            # Check crisis level first
-            crisis_level = self._check_crisis_level(processed_text)
+            # Overlapping windows of the message keep long messages bounded and
+            # locate the part that drove the reply
+            spans = text_windows(text, ANALYSIS_WINDOW_CHARS, ANALYSIS_WINDOW_OVERLAP)
+            if len(spans) == 1:
+                windows = [analysis.counseling]
+            else:
+                windows = [self._preprocess_text(text[start:end]) for start, end in spans]
             
-            # Pattern-based analysis
-            categories, pattern_confidence = self._pattern_based_analysis(processed_text)
+            # Check crisis level first: the most urgent level found in any window
+            urgency = [CRISIS_LEVEL_BY_GROUP[group] for group in CRISIS_KEYWORD_ORDER] + ['none']
+            window_crisis = [self._check_crisis_level(window) for window in windows]
+            crisis_level = min(window_crisis, key=urgency.index)
+            
+            # Pattern-based analysis; each category keeps its strongest window
+            categories = {}
+            category_windows = {}
+            pattern_confidence = 0.0
+            for index, window in enumerate(windows):
+                window_categories, window_confidence = self._pattern_based_analysis(window)
+                for category, confidence in window_categories.items():
+                    if confidence > categories.get(category, 0.0):
+                        categories[category] = confidence
+                        category_windows[category] = index
+                pattern_confidence = max(pattern_confidence, window_confidence)
             
             # ML-based analysis if model is trained
+            # Take a consistent snapshot; training publishes a new pair atomically
+            with model_lock:
+                vectorizer, model, is_trained = self.vectorizer, self.model, self.is_trained
+
             ml_confidence = 0.0
-            if self.is_trained:
+            if is_trained:
                 try:
-                    features = self.vectorizer.transform([processed_text])
-                    ml_confidence = self.model.predict_proba(features)[0][1]
+                    features = vectorizer.transform(windows)
+                    ml_confidence = model.predict_proba(features)[:, 1].max()
                 except Exception as e:
                     logger.warning(f"ML analysis failed: {e}")
             
-            # Determine primary concern
+            # Determine primary concern and the window it came from
             primary_concern = 'general_support'
+            concern_window = None
             if crisis_level != 'none':
                 primary_concern = crisis_level
+                concern_window = window_crisis.index(crisis_level)
             elif categories:
                 primary_concern = max(categories, key=categories.get)
+                concern_window = category_windows[primary_concern]
             
             # Generate appropriate response
             response = self._generate_counseling_response(primary_concern, crisis_level, user_id)
@@ -231,7 +241,7 @@ class HopeCounselingAI:
             if user_id:
                 self._update_user_memory(user_id, text, primary_concern)
             
-            return {
+            result = {
                 'primary_concern': primary_concern,
                 'crisis_level': crisis_level,
                 'categories': categories,
@@ -240,6 +250,18 @@ class HopeCounselingAI:
                 'response': response,
                 'requires_immediate_attention': crisis_level != 'none'
             }
+            if len(spans) > 1 or truncated:
+                concern_span = None
+                if concern_window is not None:
+                    start, end = spans[concern_window]
+                    concern_span = {'start': start, 'end': end}
+                result['long_text'] = {
+                    'length': length,
+                    'truncated': truncated,
+                    'windows': len(spans),
+                    'concern_span': concern_span
+                }
+            return result
             
         except Exception as e:
             logger.error(f"Error analyzing message: {e}")
@@ -324,43 +346,23 @@ class HopeCounselingAI:
         if len(memory['conversation_history']) > 10:
             memory['conversation_history'] = memory['conversation_history'][-10:]
 
-    def train(self, texts, labels):
-        """Train the counseling AI model"""
-        try:
-            logger.info(f"Training Hope with {len(texts)} examples")
-            
-            # Preprocess texts
-            processed_texts = [self._preprocess_text(text) for text in texts]
-            
-            # Fit vectorizer and transform texts
-            X = self.vectorizer.fit_transform(processed_texts)
-            
-            # Train model
-            self.model.fit(X, labels)
-            
-            # Calculate accuracy
-            y_pred = self.model.predict(X)
-            accuracy = accuracy_score(labels, y_pred)
-            
+    def publish_model(self, vectorizer, model):
+        """Swap in a freshly trained vectorizer and model without disturbing readers"""
+        with model_lock:
+            self.vectorizer = vectorizer
+            self.model = model
             self.is_trained = True
-            
-            logger.info(f"Hope training completed. Accuracy: {accuracy:.2%}")
-            return accuracy
-            
-        except Exception as e:
-            logger.error(f"Error training Hope: {e}")
-            traceback.print_exc()
-            return 0.0
 
     def save_model(self, filepath):
         """Save the trained model"""
         try:
-            model_data = {
-                'vectorizer': self.vectorizer,
-                'model': self.model,
-                'is_trained': self.is_trained,
-                'user_memory': self.user_memory
-            }
+            # User memory is session state and is deliberately not persisted with the model
+            with model_lock:
+                model_data = {
+                    'vectorizer': self.vectorizer,
+                    'model': self.model,
+                    'is_trained': self.is_trained
+                }
             with open(filepath, 'wb') as f:
                 pickle.dump(model_data, f)
             logger.info(f"Hope model saved to {filepath}")
@@ -374,10 +376,10 @@ class HopeCounselingAI:
                 with open(filepath, 'rb') as f:
                     model_data = pickle.load(f)
                 
-                self.vectorizer = model_data['vectorizer']
-                self.model = model_data['model']
-                self.is_trained = model_data['is_trained']
-                self.user_memory = model_data.get('user_memory', {})
+                with model_lock:
+                    self.vectorizer = model_data['vectorizer']
+                    self.model = model_data['model']
+                    self.is_trained = model_data['is_trained']
                 
                 logger.info(f"Hope model loaded from {filepath}")
                 return True
@@ -391,6 +393,448 @@ class HopeCounselingAI:
 # Initialize Hope AI
 hope_ai = HopeCounselingAI()
 
+# Pick up edits to the pattern files without a restart
+pattern_watcher = PatternWatcher([hope_ai.counseling_patterns, hope_ai.crisis_keywords])
+pattern_watcher.start()
+
+class EscalationBus:
+    """In-process publish/subscribe bus for crisis escalations with durable replay"""
+
+    def __init__(self, db_path, buffer_size=ESCALATION_BUFFER_SIZE):
+        self.db_path = db_path
+        self.events = deque(maxlen=buffer_size)
+        self.condition = Condition()
+        self.last_id = 0
+        # Published events not yet in hope_escalations, oldest first
+        self.unpersisted = []
+        self.persist_lock = Lock()
+
+    def load_cursor(self):
+        """Resume event ids from the durable escalation log"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM hope_escalations')
+        self.last_id = cursor.fetchone()[0]
+        conn.close()
+
+    def publish(self, user_id, crisis_level, concern, message):
+        """
+        Wake every waiting subscriber with a crisis event, then persist it
+        Ids are assigned in memory so the lock is never held across disk I/O;
+        this process is the only writer of hope_escalations.
+        """
+        event = {
+            'user_id': user_id,
+            'crisis_level': crisis_level,
+            'concern': concern,
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        }
+        with self.condition:
+            self.last_id += 1
+            event['id'] = self.last_id
+            self.events.append(event)
+            self.condition.notify_all()
+
+        with self.persist_lock:
+            self.unpersisted.append(event)
+            self._persist_pending()
+        return event
+
+    def flush(self):
+        """Retry writing events whose earlier writes failed"""
+        with self.persist_lock:
+            if self.unpersisted:
+                self._persist_pending()
+
+    def _persist_pending(self):
+        """
+        Write every unpersisted event; hold persist_lock
+        An id that never reached the table would be handed out again after a restart
+        (load_cursor resumes from MAX(id)), so failed writes stay queued for the next
+        publish instead of being dropped.
+        """
+        for attempt in range(1, ESCALATION_PERSIST_ATTEMPTS + 1):
+            conn = None
+            try:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO hope_escalations (id, user_id, crisis_level, concern, message, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(event['id'], event['user_id'], event['crisis_level'], event['concern'],
+                       event['message'], event['timestamp']) for event in self.unpersisted])
+                conn.commit()
+                self.unpersisted = []
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist escalations {[event['id'] for event in self.unpersisted]} "
+                             f"(attempt {attempt}/{ESCALATION_PERSIST_ATTEMPTS}): {e}")
+                if attempt < ESCALATION_PERSIST_ATTEMPTS:
+                    time.sleep(0.05 * attempt)
+            finally:
+                if conn is not None:
+                    conn.close()
+        return False
+
+    def events_after(self, after_id, limit=ESCALATION_BATCH_SIZE):
+        """Return events newer than after_id, replaying from SQLite if the buffer has moved on"""
+        with self.condition:
+            if self.events and after_id >= self.events[0]['id'] - 1:
+                return [event for event in self.events if event['id'] > after_id][:limit]
+            if after_id >= self.last_id:
+                return []
+            # Only replay what the buffer dropped; newer events may still be in flight to disk
+            buffered_from = self.events[0]['id'] if self.events else self.last_id + 1
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, crisis_level, concern, message, timestamp
+            FROM hope_escalations
+            WHERE id > ? AND id < ?
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, buffered_from, limit))
+        events = [{
+            'id': row[0],
+            'user_id': row[1],
+            'crisis_level': row[2],
+            'concern': row[3],
+            'message': row[4],
+            'timestamp': row[5]
+        } for row in cursor.fetchall()]
+        conn.close()
+        return events
+
+    def wait_for_events(self, after_id, timeout, limit=ESCALATION_BATCH_SIZE):
+        """Block until events newer than after_id exist or the timeout expires"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.last_id <= after_id:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.condition.wait(remaining)
+        return self.events_after(after_id, limit)
+
+def conversation_partition_table(period):
+    """Table name for a monthly conversation partition ('2025-08' -> hope_conversations_202508)"""
+    return f"hope_conversations_{period.replace('-', '')}"
+
+def ensure_conversation_partition(cursor, period):
+    """Create a monthly conversation partition with its indexes and totals triggers"""
+    table = conversation_partition_table(period)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT,
+            message TEXT NOT NULL,
+            response_id INTEGER NOT NULL,
+            concern TEXT,
+            crisis_level TEXT,
+            timestamp DATETIME NOT NULL
+        )
+    ''')
+
+    # Indexes backing the keyset-paginated history API. Every index ends in
+    # timestamp (plus the implicit rowid) so filtered pages come back in order.
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (user_id, timestamp)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_crisis ON {table} (crisis_level, timestamp)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_concern ON {table} (concern, timestamp)')
+    cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_{table}_any_crisis
+        ON {table} (timestamp) WHERE crisis_level != 'none'
+    ''')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_totals_insert
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO hope_conversation_totals (dimension, value, count) VALUES ('all', '', 1)
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+            INSERT INTO hope_conversation_totals (dimension, value, count) VALUES ('user_id', COALESCE(NEW.user_id, ''), 1)
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+            INSERT INTO hope_conversation_totals (dimension, value, count) VALUES ('crisis_level', COALESCE(NEW.crisis_level, ''), 1)
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+            INSERT INTO hope_conversation_totals (dimension, value, count) VALUES ('concern', COALESCE(NEW.concern, ''), 1)
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_totals_delete
+        AFTER DELETE ON {table}
+        BEGIN
+            UPDATE hope_conversation_totals SET count = count - 1
+            WHERE (dimension = 'all' AND value = '')
+               OR (dimension = 'user_id' AND value = COALESCE(OLD.user_id, ''))
+               OR (dimension = 'crisis_level' AND value = COALESCE(OLD.crisis_level, ''))
+               OR (dimension = 'concern' AND value = COALESCE(OLD.concern, ''));
+        END
+    ''')
+
+    cursor.execute(
+        'INSERT OR IGNORE INTO hope_conversation_partitions (period, table_name) VALUES (?, ?)',
+        (period, table)
+    )
+    return table
+
+def list_conversation_partitions(cursor, since=None, until=None):
+    """Live (unarchived) partitions newest first, pruned to an optional timestamp range"""
+    clauses = ['archived_at IS NULL']
+    params = []
+    if since:
+        clauses.append('period >= ?')
+        params.append(since[:7])
+    if until:
+        clauses.append('period <= ?')
+        params.append(until[:7])
+    cursor.execute(f'''
+        SELECT period, table_name FROM hope_conversation_partitions
+        WHERE {' AND '.join(clauses)}
+        ORDER BY period DESC
+    ''', params)
+    return cursor.fetchall()
+
+def migrate_legacy_conversations(cursor):
+    """Move rows from the pre-partitioning hope_conversations table into monthly partitions"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO hope_response_templates (text)
+        SELECT DISTINCT response FROM hope_conversations
+    ''')
+    cursor.execute('SELECT DISTINCT substr(timestamp, 1, 7) FROM hope_conversations')
+    for (period,) in cursor.fetchall():
+        table = ensure_conversation_partition(cursor, period)
+        cursor.execute(f'''
+            INSERT INTO {table} (id, user_id, message, response_id, concern, crisis_level, timestamp)
+            SELECT c.id, c.user_id, c.message, t.id, c.concern, c.crisis_level, c.timestamp
+            FROM hope_conversations c
+            JOIN hope_response_templates t ON t.text = c.response
+            WHERE substr(c.timestamp, 1, 7) = ?
+        ''', (period,))
+    cursor.execute('DROP TABLE hope_conversations')
+    logger.info("Migrated hope_conversations into monthly partitions")
+
+def rebuild_conversation_totals(cursor):
+    """Recompute hope_conversation_totals from every live partition"""
+    cursor.execute('DELETE FROM hope_conversation_totals')
+    for period, table in list_conversation_partitions(cursor):
+        cursor.execute(f'''
+            INSERT INTO hope_conversation_totals (dimension, value, count)
+            SELECT 'all', '', COUNT(*) FROM {table} WHERE true
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count
+        ''')
+        for dimension in ('user_id', 'crisis_level', 'concern'):
+            cursor.execute(f'''
+                INSERT INTO hope_conversation_totals (dimension, value, count)
+                SELECT '{dimension}', COALESCE({dimension}, ''), COUNT(*)
+                FROM {table} WHERE true GROUP BY COALESCE({dimension}, '')
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count
+            ''')
+
+class ConversationLog:
+    """Batched, month-partitioned conversation log that keeps disk writes off /counsel"""
+
+    def __init__(self, db_path, archive_dir=CONVERSATION_ARCHIVE_DIR,
+                 retention_months=CONVERSATION_RETENTION_MONTHS,
+                 batch_size=CONVERSATION_BATCH_SIZE,
+                 flush_interval=CONVERSATION_FLUSH_SECONDS):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=CONVERSATION_QUEUE_SIZE)
+        self.written = 0
+        self.dropped = 0
+        self.template_ids = {}
+        self.partitions = set()
+        self.next_id = None
+        self.archive_requested = Event()
+        self.last_archive_check = 0.0
+        self.thread = None
+
+    def start(self):
+        """Start the background writer thread"""
+        self.thread = Thread(target=self._run, name='hope-conversation-log', daemon=True)
+        self.thread.start()
+
+    def append(self, user_id, message, response, concern, crisis_level):
+        """Queue one conversation for the writer without touching disk"""
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self.queue.put_nowait((user_id, message, response, concern, crisis_level, timestamp))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Conversation log queue is full, dropping conversation")
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been committed"""
+        done = Event()
+        self.queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Commit pending conversations and stop the writer"""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def request_archive(self):
+        """Ask the writer to apply the retention policy on its next pass"""
+        self.archive_requested.set()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        stopping = False
+        while not stopping:
+            items = []
+            try:
+                items.append(self.queue.get(timeout=self.flush_interval))
+                while len(items) < self.batch_size:
+                    items.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            entries = [item for item in items if isinstance(item, tuple)]
+            if entries:
+                try:
+                    self._write_batch(conn, entries)
+                except Exception as e:
+                    conn.rollback()
+                    # Cached ids may refer to rolled-back rows
+                    self.template_ids.clear()
+                    self.partitions.clear()
+                    self.next_id = None
+                    logger.error(f"Failed to write {len(entries)} conversations: {e}")
+
+            for item in items:
+                if isinstance(item, Event):
+                    item.set()
+            stopping = any(item is None for item in items)
+
+            if (self.archive_requested.is_set() or
+                    time.monotonic() - self.last_archive_check > CONVERSATION_ARCHIVE_CHECK_SECONDS):
+                self.archive_requested.clear()
+                self.last_archive_check = time.monotonic()
+                try:
+                    self.archive_expired(conn)
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Conversation archival failed: {e}")
+        conn.close()
+
+    def _load_next_id(self, cursor):
+        """Continue conversation ids after the highest live or archived id"""
+        cursor.execute('SELECT COALESCE(MAX(max_id), 0) FROM hope_conversation_partitions')
+        next_id = cursor.fetchone()[0]
+        for period, table in list_conversation_partitions(cursor):
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+            next_id = max(next_id, cursor.fetchone()[0])
+        self.next_id = next_id + 1
+
+    def _template_id(self, cursor, text):
+        """Intern a response text and return its template id"""
+        template_id = self.template_ids.get(text)
+        if template_id is None:
+            cursor.execute('INSERT OR IGNORE INTO hope_response_templates (text) VALUES (?)', (text,))
+            cursor.execute('SELECT id FROM hope_response_templates WHERE text = ?', (text,))
+            template_id = cursor.fetchone()[0]
+            self.template_ids[text] = template_id
+        return template_id
+
+    def _write_batch(self, conn, entries):
+        """Insert a batch of conversations into their partitions in one transaction"""
+        cursor = conn.cursor()
+        if self.next_id is None:
+            self._load_next_id(cursor)
+
+        rows_by_table = {}
+        for user_id, message, response, concern, crisis_level, timestamp in entries:
+            period = timestamp[:7]
+            if period not in self.partitions:
+                ensure_conversation_partition(cursor, period)
+                self.partitions.add(period)
+            rows_by_table.setdefault(conversation_partition_table(period), []).append((
+                self.next_id, user_id, message, self._template_id(cursor, response),
+                concern, crisis_level, timestamp
+            ))
+            self.next_id += 1
+
+        for table, rows in rows_by_table.items():
+            cursor.executemany(f'''
+                INSERT INTO {table} (id, user_id, message, response_id, concern, crisis_level, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        conn.commit()
+        self.written += len(entries)
+
+    def archive_expired(self, conn):
+        """Archive and drop every partition older than the retention window"""
+        now = datetime.now(timezone.utc)
+        month_index = now.year * 12 + now.month - 1 - self.retention_months
+        cutoff = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT period, table_name FROM hope_conversation_partitions
+            WHERE archived_at IS NULL AND period < ?
+            ORDER BY period
+        ''', (cutoff,))
+        for period, table in cursor.fetchall():
+            self._archive_partition(conn, period, table)
+
+    def _archive_partition(self, conn, period, table):
+        """Write one partition to a gzipped JSON-lines file, then drop it"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{table}.jsonl.gz")
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT c.id, c.user_id, c.message, t.text, c.concern, c.crisis_level, c.timestamp
+            FROM {table} c
+            JOIN hope_response_templates t ON t.id = c.response_id
+            ORDER BY c.id
+        ''')
+        archived = 0
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+            for row in cursor:
+                f.write(json.dumps({
+                    'id': row[0],
+                    'user_id': row[1],
+                    'message': row[2],
+                    'response': row[3],
+                    'concern': row[4],
+                    'crisis_level': row[5],
+                    'timestamp': row[6]
+                }) + '\n')
+                archived += 1
+        os.replace(path + '.tmp', path)
+
+        # Take the partition's rows out of the maintained totals before dropping it
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+        max_id = cursor.fetchone()[0]
+        cursor.execute(
+            "UPDATE hope_conversation_totals SET count = count - ? WHERE dimension = 'all' AND value = ''",
+            (archived,)
+        )
+        for dimension in ('user_id', 'crisis_level', 'concern'):
+            cursor.execute(f"SELECT COALESCE({dimension}, ''), COUNT(*) FROM {table} GROUP BY 1")
+            cursor.executemany(
+                'UPDATE hope_conversation_totals SET count = count - ? WHERE dimension = ? AND value = ?',
+                [(count, dimension, value) for value, count in cursor.fetchall()]
+            )
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute('''
+            UPDATE hope_conversation_partitions
+            SET archived_at = CURRENT_TIMESTAMP, archive_path = ?, max_id = ?
+            WHERE period = ?
+        ''', (path, max_id, period))
+        conn.commit()
+        self.partitions.discard(period)
+        logger.info(f"Archived {archived} conversations from {period} to {path}")
+
 def init_hope_db():
     """Initialize Hope's training database"""
     try:
@@ -408,19 +852,57 @@ def init_hope_db():
             )
         ''')
         
-        # Create conversation history table
+        # Readers keep working while the conversation log writer commits
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+        # Conversation history lives in monthly partition tables registered here
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hope_conversation_partitions (
+                period TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                max_id INTEGER,
+                archive_path TEXT,
+                archived_at DATETIME,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Canned responses are stored once and referenced by id
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hope_response_templates (
+                id INTEGER PRIMARY KEY,
+                text TEXT NOT NULL UNIQUE
+            )
+        ''')
+
+        # Maintained conversation totals so counts never need a table scan
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hope_conversations (
+            CREATE TABLE IF NOT EXISTS hope_conversation_totals (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            )
+        ''')
+
+        # One-time move of the old single-table history into partitions
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hope_conversations'")
+        if cursor.fetchone():
+            migrate_legacy_conversations(cursor)
+            rebuild_conversation_totals(cursor)
+
+        # Durable log behind the crisis escalation feed; its ids are the replay cursor
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hope_escalations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id TEXT,
-                message TEXT NOT NULL,
-                response TEXT NOT NULL,
+                crisis_level TEXT NOT NULL,
                 concern TEXT,
-                crisis_level TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL
             )
         ''')
-        
+
         # Create user profiles table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS hope_user_profiles (
@@ -440,11 +922,195 @@ def init_hope_db():
         logger.error(f"Error initializing Hope database: {e}")
 
 # Initialize database
-init_hope_db()
+startup.run_phase('init_db', init_hope_db)
+
+# Crisis escalation feed
+escalation_bus = EscalationBus(DB_PATH)
+try:
+    escalation_bus.load_cursor()
+except Exception as e:
+    logger.error(f"Error loading escalation cursor: {e}")
+atexit.register(escalation_bus.flush)
+
+# Conversation history writer
+conversation_log = ConversationLog(DB_PATH)
+conversation_log.start()
+atexit.register(conversation_log.close)
 
-# Load existing model if available
+# Existing model, loaded by the background warm-up
 hope_model_path = "hope_model.pkl"
-hope_ai.load_model(hope_model_path)
+
+def warm_up_hope():
+    """Analyze synthetic messages so the model and patterns are hot for real traffic"""
+    for message in WARMUP_MESSAGES:
+        hope_ai.analyze_message(message)
+
+class TrainingCancelled(Exception):
+    """Raised inside a training job when cancellation was requested"""
+
+class HopeTrainingJob:
+    """Background Hope training run streamed from the hope_training_data table"""
+
+    def __init__(self, db_path, model_path, chunk_size=TRAINING_CHUNK_SIZE,
+                 holdout_percent=TRAINING_HOLDOUT_PERCENT):
+        self.job_id = uuid.uuid4().hex
+        self.db_path = db_path
+        self.model_path = model_path
+        self.chunk_size = chunk_size
+        self.holdout_percent = holdout_percent
+        self.status = 'pending'
+        self.phase = None
+        self.rows_read = 0
+        self.total_rows = 0
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = Event()
+        self.thread = Thread(target=self._run, name=f"hope-training-{self.job_id}", daemon=True)
+
+    def start(self):
+        """Run the job on its background thread"""
+        self.status = 'running'
+        self.started_at = datetime.now().isoformat()
+        self.thread.start()
+
+    def cancel(self):
+        """Ask the job to stop at the next chunk boundary"""
+        self.cancel_event.set()
+
+    def is_active(self):
+        """Whether the job is still pending or running"""
+        return self.status in ('pending', 'running')
+
+    def to_dict(self):
+        """JSON-serializable job status"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'phase': self.phase,
+            'rows_read': self.rows_read,
+            'total_rows': self.total_rows,
+            'progress': round(self.rows_read / self.total_rows, 4) if self.total_rows else 0.0,
+            'result': self.result,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def _is_holdout(self, row_id):
+        """Deterministically assign a row to the held-out split by hashing its id"""
+        return zlib.crc32(str(row_id).encode('ascii')) % 100 < self.holdout_percent
+
+    def _iter_texts(self, holdout, labels):
+        """Stream preprocessed texts for one split in chunks, collecting labels alongside"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            last_id = 0
+            while True:
+                if self.cancel_event.is_set():
+                    raise TrainingCancelled()
+                cursor.execute('''
+                    SELECT id, text, label FROM hope_training_data
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, self.chunk_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                self.rows_read += len(rows)
+                for row_id, text, label in rows:
+                    if self._is_holdout(row_id) == holdout:
+                        labels.append(label)
+                        yield hope_ai._preprocess_text(text)
+        finally:
+            conn.close()
+
+    def _run(self):
+        from sklearn.metrics import accuracy_score
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM hope_training_data')
+            # Both the fit and evaluation passes read every row
+            self.total_rows = cursor.fetchone()[0] * 2
+            conn.close()
+
+            logger.info(f"Hope training job {self.job_id} started on {self.total_rows // 2} examples")
+
+            # Train fresh objects; the serving model keeps answering /counsel meanwhile
+            self.phase = 'fitting'
+            vectorizer = hope_ai.build_vectorizer()
+            model = hope_ai.build_model()
+            train_labels = []
+            X_train = vectorizer.fit_transform(self._iter_texts(False, train_labels))
+            if len(set(train_labels)) < 2:
+                raise ValueError('Training data must contain at least two labels')
+            model.fit(X_train, train_labels)
+            train_accuracy = accuracy_score(train_labels, model.predict(X_train))
+
+            self.phase = 'evaluating'
+            test_labels = []
+            X_test = vectorizer.transform(self._iter_texts(True, test_labels))
+            test_accuracy = None
+            if test_labels:
+                test_accuracy = accuracy_score(test_labels, model.predict(X_test))
+
+            if self.cancel_event.is_set():
+                raise TrainingCancelled()
+
+            self.phase = 'publishing'
+            hope_ai.publish_model(vectorizer, model)
+            hope_ai.save_model(self.model_path)
+
+            self.result = {
+                'train_accuracy': float(train_accuracy),
+                'test_accuracy': float(test_accuracy) if test_accuracy is not None else None,
+                'training_samples': len(train_labels),
+                'test_samples': len(test_labels)
+            }
+            self.status = 'completed'
+            logger.info(f"Hope training job {self.job_id} completed: {self.result}")
+
+        except TrainingCancelled:
+            self.status = 'cancelled'
+            logger.info(f"Hope training job {self.job_id} cancelled")
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            logger.error(f"Hope training job {self.job_id} failed: {e}")
+        finally:
+            self.phase = None
+            self.finished_at = datetime.now().isoformat()
+
+# Background training jobs, newest last
+training_jobs = {}
+training_jobs_lock = Lock()
+
+# Long-lived structures reported by /memory-stats
+memory_monitor = MemoryMonitor({
+    'vectorizer.vocabulary_': lambda: getattr(hope_ai.vectorizer, 'vocabulary_', None),
+    'vectorizer.stop_words_': lambda: getattr(hope_ai.vectorizer, 'stop_words_', None),
+    'model.coef_': lambda: getattr(hope_ai.model, 'coef_', None),
+    'user_memory': lambda: hope_ai.user_memory,
+    'counseling_patterns': lambda: hope_ai.counseling_patterns.current,
+    'crisis_keywords': lambda: hope_ai.crisis_keywords.current,
+    'escalation_bus.events': lambda: escalation_bus.events,
+    'conversation_log.queue': lambda: conversation_log.queue.queue,
+    'conversation_log.template_ids': lambda: conversation_log.template_ids,
+    'training_jobs': lambda: training_jobs,
+}, counts={
+    'vectorizer.vocabulary_': lambda: len(getattr(hope_ai.vectorizer, 'vocabulary_', ())),
+    'vectorizer.stop_words_': lambda: len(getattr(hope_ai.vectorizer, 'stop_words_', ())),
+    'user_memory': lambda: len(hope_ai.user_memory),
+    'escalation_bus.events': lambda: len(escalation_bus.events),
+    'conversation_log.queue': lambda: conversation_log.queue.qsize(),
+})
+memory_monitor.start_logging()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -454,13 +1120,38 @@ def health_check():
             'status': 'healthy',
             'service': 'Hope Counseling AI',
             'model_trained': hope_ai.is_trained,
+            'ready': startup.is_ready(),
+            'startup': startup.to_dict(),
             'active_users': len(hope_ai.user_memory),
+            'patterns': {
+                'counseling': hope_ai.counseling_patterns.info(),
+                'crisis_keywords': hope_ai.crisis_keywords.info()
+            },
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
         logger.error(f"Health check error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    return startup.ready_response()
+
+@app.route('/reload-patterns', methods=['POST'])
+@admin_only
+def reload_patterns():
+    """Validate and activate edited pattern files now instead of at the next poll"""
+    try:
+        stores = {'counseling': hope_ai.counseling_patterns, 'crisis_keywords': hope_ai.crisis_keywords}
+        reloaded = {name: store.reload(force=True) for name, store in stores.items()}
+        patterns = {name: store.info() for name, store in stores.items()}
+        status = 400 if any(info['last_error'] for info in patterns.values()) else 200
+        return jsonify({'reloaded': reloaded, 'patterns': patterns}), status
+    except Exception as e:
+        logger.error(f"Pattern reload error: {e}")
+        return jsonify({'error': 'Pattern reload failed'}), 500
+
 def convert_types(obj):
     """Convert numpy types to standard Python types for JSON serialization"""
     if isinstance(obj, np.integer):
@@ -473,6 +1164,42 @@ def convert_types(obj):
         return bool(obj)
     return obj
 
+def counsel_message(message, user_id):
+    """Analyze a message (str or AnalyzedText), escalate and log it; returns the /counsel response body"""
+    # Analyze message with Hope
+    analysis = hope_ai.analyze_message(message, user_id)
+    message = analyze_text(message).text
+
+    # Push crisis results to escalation subscribers before anything else
+    if analysis['requires_immediate_attention']:
+        try:
+            escalation_bus.publish(user_id, analysis['crisis_level'],
+                                   analysis['primary_concern'], message)
+        except Exception as e:
+            logger.error(f"Failed to publish crisis escalation: {e}")
+
+    # Queue the conversation; the log writer commits it in the background
+    conversation_log.append(user_id, message, analysis['response'],
+                            analysis['primary_concern'], analysis['crisis_level'])
+
+    # Convert numpy types for JSON serialization
+    response_data = {
+        'response': analysis['response'],
+        'primary_concern': analysis['primary_concern'],
+        'crisis_level': analysis['crisis_level'],
+        'requires_immediate_attention': analysis['requires_immediate_attention'],
+        'confidence': max(analysis['pattern_confidence'], analysis['ml_confidence']),
+        'timestamp': datetime.now().isoformat()
+    }
+    if 'long_text' in analysis:
+        response_data['long_text'] = analysis['long_text']
+    if not startup.is_ready() and not hope_ai.is_trained:
+        # Patterns and crisis keywords only until warm-up loads the model
+        response_data['degraded'] = True
+
+    # Convert any numpy types
+    return json.loads(json.dumps(response_data, default=convert_types))
+
 @app.route('/counsel', methods=['POST'])
 def counsel_user():
     """Main counseling endpoint for Hope"""
@@ -485,37 +1212,7 @@ def counsel_user():
         message = data['message']
         user_id = data.get('user_id', 'anonymous')
         
-        # Analyze message with Hope
-        analysis = hope_ai.analyze_message(message, user_id)
-        
-        # Store conversation in database
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO hope_conversations (user_id, message, response, concern, crisis_level)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, message, analysis['response'], analysis['primary_concern'], analysis['crisis_level']))
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.warning(f"Failed to store conversation: {e}")
-        
-        # Convert numpy types for JSON serialization
-        response_data = {
-            'response': analysis['response'],
-            'primary_concern': analysis['primary_concern'],
-            'crisis_level': analysis['crisis_level'],
-            'requires_immediate_attention': analysis['requires_immediate_attention'],
-            'confidence': max(analysis['pattern_confidence'], analysis['ml_confidence']),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Convert any numpy types
-        response_data = json.loads(json.dumps(response_data, default=convert_types))
-        
-        return jsonify(response_data)
+        return jsonify(counsel_message(message, user_id))
         
     except Exception as e:
         logger.error(f"Error in counseling endpoint: {e}")
@@ -526,37 +1223,133 @@ def counsel_user():
         }), 500
 
 @app.route('/train-hope', methods=['POST'])
+@startup.requires_ready
 def train_hope():
-    """Train Hope with new counseling data"""
+    """
+    Start a background Hope training job over hope_training_data
+    Optional input: {"texts": [...], "labels": [...], "category": "..."} appended
+    to hope_training_data before training starts
+    """
     try:
-        data = request.get_json()
-        
-        if not data or 'texts' not in data or 'labels' not in data:
-            return jsonify({'error': 'Texts and labels are required'}), 400
-        
-        texts = data['texts']
-        labels = data['labels']
+        data = request.get_json(silent=True) or {}
         
-        if len(texts) != len(labels):
+        texts = data.get('texts')
+        labels = data.get('labels')
+        if (texts is None) != (labels is None):
+            return jsonify({'error': 'Texts and labels must be provided together'}), 400
+        if texts is not None and len(texts) != len(labels):
             return jsonify({'error': 'Texts and labels must have the same length'}), 400
         
-        # Train Hope
-        accuracy = hope_ai.train(texts, labels)
-        
-        # Save the trained model
-        hope_ai.save_model(hope_model_path)
+        with training_jobs_lock:
+            if any(job.is_active() for job in training_jobs.values()):
+                return jsonify({'error': 'A training job is already running'}), 409
+
+            if texts:
+                conn = sqlite3.connect(DB_PATH)
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO hope_training_data (text, label, category)
+                    VALUES (?, ?, ?)
+                ''', ((text, label, data.get('category')) for text, label in zip(texts, labels)))
+                conn.commit()
+                conn.close()
+
+            job = HopeTrainingJob(DB_PATH, hope_model_path)
+            training_jobs[job.job_id] = job
+            while len(training_jobs) > TRAINING_JOB_HISTORY:
+                training_jobs.pop(next(iter(training_jobs)))
+            job.start()
         
         return jsonify({
-            'message': 'Hope training completed successfully',
-            'accuracy': accuracy,
-            'training_samples': len(texts)
-        })
+            'message': 'Hope training started',
+            'job_id': job.job_id,
+            'added_samples': len(texts) if texts else 0,
+            'status_url': f"/train-hope/{job.job_id}"
+        }), 202
         
     except Exception as e:
         logger.error(f"Error training Hope: {e}")
         traceback.print_exc()
         return jsonify({'error': 'Training failed'}), 500
 
+@app.route('/train-hope/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """Get progress and results of a Hope training job"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Training job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/train-hope/<job_id>/cancel', methods=['POST'])
+@admin_only
+def cancel_training_job(job_id):
+    """Request cancellation of a running Hope training job"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Training job not found'}), 404
+    job.cancel()
+    return jsonify(job.to_dict())
+
+@app.route('/memory-stats', methods=['GET'])
+@admin_only
+def get_memory_stats():
+    """Approximate memory held by the model, session store and queues, plus process RSS and growth"""
+    try:
+        report = memory_monitor.report()
+        sessions = report['structures']['user_memory']
+        memories = list(hope_ai.user_memory.values())
+        report['sessions'] = {
+            'tracked_users': sessions.get('entries', 0),
+            'bytes_per_user': sessions.get('bytes_per_entry'),
+            'history_messages': sum(len(memory['conversation_history']) for memory in memories)
+        }
+        return jsonify(report)
+    except Exception as e:
+        logger.error(f"Memory stats error: {e}")
+        return jsonify({'error': 'Failed to measure memory'}), 500
+
+@app.route('/profiler', methods=['GET'])
+@admin_only
+def get_profiler_status():
+    """Status of the current or last profiling session"""
+    return jsonify({'session': request_profiler.status()})
+
+@app.route('/profiler/start', methods=['POST'])
+@admin_only
+def start_profiler():
+    """
+    Profile live requests for a bounded number of requests or seconds
+    Input: {"mode": "sample" | "cprofile", "requests": 500, "seconds": 30, "intervalMs": 5}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        session = request_profiler.start(
+            data.get('mode', 'sample'), data.get('requests'), data.get('seconds'),
+            data.get('intervalMs', PROFILER_DEFAULT_INTERVAL_MS))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'session': session}), 202
+
+@app.route('/profiler/stop', methods=['POST'])
+@admin_only
+def stop_profiler():
+    """Stop the running profiling session early"""
+    session = request_profiler.stop()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    return jsonify({'session': session.to_dict()})
+
+@app.route('/profiler/download', methods=['GET'])
+@admin_only
+def download_profile():
+    """Folded stacks (sample mode) for flamegraph.pl/speedscope, or a .prof file (cprofile mode)"""
+    exported = request_profiler.export()
+    if exported is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    body, mimetype, filename = exported
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/hope-stats', methods=['GET'])
 def get_hope_stats():
     """Get Hope's statistics and performance metrics"""
@@ -564,35 +1357,46 @@ def get_hope_stats():
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        # Get conversation count
-        cursor.execute('SELECT COUNT(*) FROM hope_conversations')
-        total_conversations = cursor.fetchone()[0]
-        
-        # Get unique users
-        cursor.execute('SELECT COUNT(DISTINCT user_id) FROM hope_conversations')
+        # Counts come from the maintained totals rather than table scans
+        total_conversations = get_conversation_total(cursor)
+
+        cursor.execute('''
+            SELECT COUNT(*) FROM hope_conversation_totals
+            WHERE dimension = 'user_id' AND count > 0
+        ''')
         unique_users = cursor.fetchone()[0]
-        
-        # Get crisis interventions
-        cursor.execute('SELECT COUNT(*) FROM hope_conversations WHERE crisis_level != "none"')
-        crisis_interventions = cursor.fetchone()[0]
-        
-        # Get recent conversations
+
         cursor.execute('''
-            SELECT concern, COUNT(*) as count 
-            FROM hope_conversations 
-            WHERE timestamp > datetime('now', '-7 days')
-            GROUP BY concern 
-            ORDER BY count DESC 
-            LIMIT 5
+            SELECT COALESCE(SUM(count), 0) FROM hope_conversation_totals
+            WHERE dimension = 'crisis_level' AND value NOT IN ('none', '')
         ''')
-        recent_concerns = dict(cursor.fetchall())
+        crisis_interventions = cursor.fetchone()[0]
+        
+        # Get recent conversations from the partitions covering the last week
+        week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+        concern_counts = {}
+        for period, table in list_conversation_partitions(cursor, since=week_ago):
+            cursor.execute(f'''
+                SELECT concern, COUNT(*) as count
+                FROM {table}
+                WHERE timestamp > ?
+                GROUP BY concern
+            ''', (week_ago,))
+            for concern, count in cursor.fetchall():
+                concern_counts[concern] = concern_counts.get(concern, 0) + count
+        recent_concerns = dict(sorted(concern_counts.items(), key=lambda item: item[1], reverse=True)[:5])
         
         conn.close()
+
+        # Held-out accuracy of the newest completed training job in this process
+        with training_jobs_lock:
+            completed = [job for job in training_jobs.values() if job.status == 'completed']
+        accuracy = completed[-1].result['test_accuracy'] if completed else None
         
         return jsonify({
             'total_conversations': total_conversations,
             'crisis_detected': crisis_interventions,
-            'accuracy': hope_ai.model.score(hope_ai.vectorizer.transform([""]), [0]), # Placeholder, actual accuracy is logged
+            'accuracy': accuracy,
             'last_training': hope_ai.is_trained,
             'model_trained': hope_ai.is_trained,
             'active_users': len(hope_ai.user_memory),
@@ -604,44 +1408,227 @@ def get_hope_stats():
         logger.error(f"Error getting Hope stats: {e}")
         return jsonify({'error': 'Failed to get statistics'}), 500
 
+def encode_conversation_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque cursor"""
+    raw = f"{timestamp}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_conversation_cursor(cursor_token):
+    """Decode a cursor produced by encode_conversation_cursor"""
+    raw = base64.urlsafe_b64decode(cursor_token.encode('ascii')).decode('utf-8')
+    timestamp, row_id = raw.rsplit('|', 1)
+    return timestamp, int(row_id)
+
+def normalize_timestamp_param(value):
+    """Convert an ISO-8601 query parameter to SQLite's CURRENT_TIMESTAMP format (UTC)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def get_conversation_total(cursor, dimension='all', value=''):
+    """Read a maintained conversation total for one dimension value"""
+    cursor.execute(
+        'SELECT count FROM hope_conversation_totals WHERE dimension = ? AND value = ?',
+        (dimension, value)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
 @app.route('/hope-conversations', methods=['GET'])
 def get_hope_conversations():
-    """Get recent conversations for analysis"""
+    """
+    Get conversation history, newest first, using keyset pagination across the
+    monthly partitions. Conversations appear once the log writer has committed them.
+    Query parameters: limit, cursor, user_id, crisis_level ('crisis' for any
+    crisis level), concern, since, until (ISO-8601)
+    """
     try:
-        limit = request.args.get('limit', 50, type=int)
-        
+        limit = request.args.get('limit', CONVERSATIONS_DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, CONVERSATIONS_MAX_PAGE_SIZE))
+        user_id = request.args.get('user_id')
+        crisis_level = request.args.get('crisis_level')
+        concern = request.args.get('concern')
+
+        try:
+            since = request.args.get('since')
+            until = request.args.get('until')
+            since = normalize_timestamp_param(since) if since else None
+            until = normalize_timestamp_param(until) if until else None
+            cursor_token = request.args.get('cursor')
+            after = decode_conversation_cursor(cursor_token) if cursor_token else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or time range'}), 400
+
+        clauses = []
+        params = []
+        if user_id:
+            clauses.append('c.user_id = ?')
+            params.append(user_id)
+        if crisis_level == 'crisis':
+            # Matches each monthly partition's partial index idx_{table}_any_crisis
+            clauses.append("c.crisis_level != 'none'")
+        elif crisis_level:
+            clauses.append('c.crisis_level = ?')
+            params.append(crisis_level)
+        if concern:
+            clauses.append('c.concern = ?')
+            params.append(concern)
+        if since:
+            clauses.append('c.timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('c.timestamp <= ?')
+            params.append(until)
+        if after:
+            clauses.append('(c.timestamp, c.id) < (?, ?)')
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT user_id, message, response, concern, crisis_level, timestamp
-            FROM hope_conversations
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
+        # Walk partitions newest first, skipping any outside the time range or
+        # newer than the cursor, until the page (plus one lookahead row) is full
+        rows = []
+        for period, table in list_conversation_partitions(cursor, since, until):
+            if after and period > after[0][:7]:
+                continue
+            cursor.execute(f'''
+                SELECT c.id, c.user_id, c.message, t.text, c.concern, c.crisis_level, c.timestamp
+                FROM {table} c
+                JOIN hope_response_templates t ON t.id = c.response_id
+                {where}
+                ORDER BY c.timestamp DESC, c.id DESC
+                LIMIT ?
+            ''', (*params, limit + 1 - len(rows)))
+            rows.extend(cursor.fetchall())
+            if len(rows) > limit:
+                break
         
         conversations = []
-        for row in cursor.fetchall():
+        for row in rows[:limit]:
             conversations.append({
-                'user_id': row[0],
-                'message': row[1],
-                'response': row[2],
-                'concern': row[3],
-                'crisis_level': row[4],
-                'timestamp': row[5]
+                'id': row[0],
+                'user_id': row[1],
+                'message': row[2],
+                'response': row[3],
+                'concern': row[4],
+                'crisis_level': row[5],
+                'timestamp': row[6]
             })
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_conversation_cursor(last[6], last[0])
+
+        # Totals are maintained per single dimension; combined filters have no
+        # precomputed total and report None instead of scanning.
+        total = None
+        if not (since or until):
+            filters = [(name, value) for name, value in
+                       (('user_id', user_id), ('crisis_level', crisis_level), ('concern', concern))
+                       if value]
+            if not filters:
+                total = get_conversation_total(cursor)
+            elif len(filters) == 1 and filters[0] != ('crisis_level', 'crisis'):
+                total = get_conversation_total(cursor, *filters[0])
+            elif len(filters) == 1:
+                cursor.execute('''
+                    SELECT COALESCE(SUM(count), 0) FROM hope_conversation_totals
+                    WHERE dimension = 'crisis_level' AND value NOT IN ('none', '')
+                ''')
+                total = cursor.fetchone()[0]
         
         conn.close()
         
         return jsonify({
             'conversations': conversations,
-            'count': total_conversations
+            'count': len(conversations),
+            'total': total,
+            'next_cursor': next_cursor,
+            'limit': limit
         })
         
     except Exception as e:
         logger.error(f"Error getting conversations: {e}")
         return jsonify({'error': 'Failed to get conversations'}), 500
 
+@app.route('/hope-conversations/archive', methods=['POST'])
+def archive_hope_conversations():
+    """Apply the conversation retention policy now instead of waiting for the hourly check"""
+    conversation_log.request_archive()
+    return jsonify({
+        'status': 'scheduled',
+        'retention_months': conversation_log.retention_months,
+        'archive_dir': conversation_log.archive_dir
+    }), 202
+
+def parse_escalation_cursor():
+    """Read the replay cursor from Last-Event-ID or the cursor query parameter"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    if value is None:
+        return escalation_bus.last_id
+    return int(value)
+
+@app.route('/escalations', methods=['GET'])
+@admin_only
+def get_escalations():
+    """
+    Long-poll for crisis escalations newer than cursor
+    Query parameters: cursor (last seen event id), timeout (seconds)
+    """
+    try:
+        try:
+            after_id = parse_escalation_cursor()
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        timeout = request.args.get('timeout', ESCALATION_MAX_WAIT_SECONDS, type=float)
+        timeout = max(0.0, min(timeout, ESCALATION_MAX_WAIT_SECONDS))
+
+        events = escalation_bus.wait_for_events(after_id, timeout)
+        return jsonify({
+            'events': events,
+            'cursor': events[-1]['id'] if events else after_id
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting escalations: {e}")
+        return jsonify({'error': 'Failed to get escalations'}), 500
+
+@app.route('/escalations/stream', methods=['GET'])
+@admin_only
+def stream_escalations():
+    """Server-Sent Events stream of crisis escalations, resumable via Last-Event-ID"""
+    try:
+        after_id = parse_escalation_cursor()
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    def generate(after_id):
+        yield 'retry: 3000\n\n'
+        while True:
+            events = escalation_bus.wait_for_events(after_id, ESCALATION_HEARTBEAT_SECONDS)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                after_id = event['id']
+                yield f"id: {event['id']}\nevent: crisis\ndata: {json.dumps(event)}\n\n"
+
+    return Response(generate(after_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Load and warm up the model in the background so the port binds immediately;
+# /counsel answers meanwhile from patterns and crisis keywords alone
+startup.start_background([
+    ('load_model', lambda: hope_ai.load_model(hope_model_path)),
+    ('warm_up', warm_up_hope),
+])
+
 if __name__ == '__main__':
     print("Starting Hope - Advanced Psychological Counseling AI...")
     print("Features:")
@@ -652,10 +1639,22 @@ if __name__ == '__main__':
     print("- Professional resource referrals")
     print("Endpoints available:")
     print("- POST /counsel - Main counseling endpoint")
-    print("- POST /train-hope - Train Hope with new data")
+    print("- POST /train-hope - Start background training from hope_training_data")
+    print("- GET /train-hope/<job_id> - Training job progress")
+    print("- POST /train-hope/<job_id>/cancel - Cancel a training job")
     print("- GET /hope-stats - Get Hope's statistics")
+    print("- GET /memory-stats - Memory footprint of the model, sessions and queues")
+    print("- POST /profiler/start - Profile live requests (sampling or cProfile, bounded)")
+    print("- POST /profiler/stop - Stop profiling early")
+    print("- GET /profiler - Profiling session status")
+    print("- GET /profiler/download - Folded stacks or .prof file of the last session")
     print("- GET /hope-conversations - Get conversation history")
+    print("- POST /hope-conversations/archive - Archive conversations past retention")
+    print("- GET /escalations - Long-poll crisis escalations")
+    print("- GET /escalations/stream - Crisis escalations over Server-Sent Events")
+    print("- POST /reload-patterns - Activate edited pattern files now")
     print("- GET /health - Health check")
+    print("- GET /ready - Readiness probe (model loaded and warmed up)")
     
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
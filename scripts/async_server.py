@@ -0,0 +1,365 @@
+"""
+Asyncio front end for the moderation and Hope servers
+Connections, keep-alive and request bodies are handled on one event loop, so an
+idle or slow connection costs a coroutine instead of a server thread. Requests
+are handed to the unchanged Flask apps on bounded executors: scoring requests on
+one pool, routes that mostly write to SQLite queued for a small writer pool (so
+the database sees few concurrent writers), and long-lived event streams on their
+own pool so they cannot starve scoring. Endpoints and JSON bodies are the same
+as under the Flask development server.
+
+Usage:
+    python async_server.py ml|hope [--host 0.0.0.0] [--port 5000] [--threads 32]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import io
+import logging
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from functools import partial
+from urllib.parse import unquote
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger('async_server')
+
+# Service script, default port and the routes whose work is mostly SQLite writes
+SERVICES = {
+    'ml': ('ml-integration-example.py', 5000,
+           ('/store-training-data', '/ingest-training-data', '/report-abuse', '/moderate-reports')),
+    'hope': ('Hope.py', 5001, ('/hope-conversations/archive',)),
+}
+
+# Threads running Flask handlers; scoring itself may go further to SCORING_WORKERS processes
+ASYNC_HANDLER_THREADS = int(os.environ.get('ASYNC_HANDLER_THREADS', '32'))
+# Threads for write routes; requests beyond this wait on the event loop, not on SQLite locks
+ASYNC_WRITE_THREADS = int(os.environ.get('ASYNC_WRITE_THREADS', '2'))
+# Threads for streaming responses (each open event stream holds one between events)
+ASYNC_STREAM_THREADS = int(os.environ.get('ASYNC_STREAM_THREADS', '64'))
+# Requests accepted at once across all connections; beyond this the answer is 503
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', '4096'))
+# Idle keep-alive connections are closed after this many seconds
+ASYNC_KEEPALIVE_SECONDS = float(os.environ.get('ASYNC_KEEPALIVE_SECONDS', '75'))
+ASYNC_MAX_HEADER_BYTES = 64 * 1024
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', str(32 * 1024 * 1024)))
+ASYNC_SHUTDOWN_SECONDS = 10
+
+_REASONS = {400: 'Bad Request', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class BadRequest(Exception):
+    """A request that cannot be parsed; answered with status and the connection closed"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_service(name):
+    """Import a service script by path (it initializes its database in the working directory)"""
+    filename = SERVICES[name][0]
+    spec = importlib.util.spec_from_file_location(f"{name}_service", os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class HandlerPools:
+    """Thread pools running request handlers, shareable by several front ends in one process"""
+
+    def __init__(self, handler_threads=ASYNC_HANDLER_THREADS, write_threads=ASYNC_WRITE_THREADS,
+                 stream_threads=ASYNC_STREAM_THREADS):
+        self.handlers = ThreadPoolExecutor(handler_threads, thread_name_prefix='async-handler')
+        self.writers = ThreadPoolExecutor(write_threads, thread_name_prefix='async-writer')
+        self.streams = ThreadPoolExecutor(stream_threads, thread_name_prefix='async-stream')
+
+    def shutdown(self):
+        for executor in (self.handlers, self.writers, self.streams):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncFrontEnd:
+    """HTTP/1.1 server on asyncio streams dispatching to a WSGI app"""
+
+    def __init__(self, app, write_routes=(), pools=None, max_in_flight=ASYNC_MAX_IN_FLIGHT):
+        self.app = app
+        self.write_routes = frozenset(write_routes)
+        self.pools = pools or HandlerPools()
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.connections = 0
+        self.server = None
+        self.host = None
+        self.port = None
+
+    async def start(self, host, port):
+        """Start listening"""
+        self.host, self.port = host, port
+        self.server = await asyncio.start_server(self._connection, host, port,
+                                                 limit=ASYNC_MAX_HEADER_BYTES)
+        logger.info(f"Async front end listening on {host}:{port}")
+
+    async def drain(self, deadline):
+        """Stop accepting connections and wait (until deadline) for in-flight requests"""
+        self.server.close()
+        loop = asyncio.get_running_loop()
+        while self.in_flight and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def _connection(self, reader, writer):
+        self.connections += 1
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(ASYNC_KEEPALIVE_SECONDS):
+                        head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._error(writer, 400, 'Request headers too large')
+                    return
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                    if headers.get('expect', '').lower() == '100-continue':
+                        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                    body = await self._read_body(reader, headers)
+                except BadRequest as e:
+                    await self._error(writer, e.status, str(e))
+                    return
+                connection = headers.get('connection', '').lower()
+                keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                              else connection == 'keep-alive')
+                keep_alive = await self._respond(writer, peer, method, target, version,
+                                                 headers, body, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Connection error: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head[:-4].decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise BadRequest(400, 'Malformed request line')
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise BadRequest(400, 'Unsupported HTTP version')
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise BadRequest(400, 'Malformed header')
+            name = name.strip().lower()
+            value = value.strip()
+            # Repeated headers are joined as WSGI expects
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        return method, target, version, headers
+
+    @staticmethod
+    async def _read_body(reader, headers):
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            size = 0
+            while True:
+                line = await reader.readuntil(b'\r\n')
+                try:
+                    length = int(line.split(b';', 1)[0], 16)
+                except ValueError:
+                    raise BadRequest(400, 'Malformed chunk')
+                if length == 0:
+                    # Trailers end with a blank line
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    return b''.join(chunks)
+                size += length
+                if size > ASYNC_MAX_BODY_BYTES:
+                    raise BadRequest(413, 'Request body too large')
+                chunks.append(await reader.readexactly(length))
+                await reader.readexactly(2)
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise BadRequest(400, 'Invalid Content-Length')
+        if length > ASYNC_MAX_BODY_BYTES:
+            raise BadRequest(413, 'Request body too large')
+        return await reader.readexactly(length) if length else b''
+
+    def _environ(self, peer, method, target, version, headers, body):
+        path, _, query = target.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(path, 'latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': str(self.port),
+            'SERVER_PROTOCOL': version,
+            'REMOTE_ADDR': peer[0],
+            'REMOTE_PORT': str(peer[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name not in ('content-length', 'transfer-encoding'):
+                environ['HTTP_' + name.upper().replace('-', '_')] = value
+        return environ
+
+    def _call_app(self, environ):
+        """Run the WSGI app; buffered bodies are read here, streams are returned as an iterator"""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = headers
+
+        result = self.app(environ, start_response)
+        headers = started['headers']
+        # Flask sets Content-Length on every buffered response; 204 and 304 have no body
+        if (any(name.lower() == 'content-length' for name, _ in headers)
+                or started['status'][:3] in ('204', '304')):
+            try:
+                body = b''.join(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            return started['status'], headers, body, None
+        return started['status'], headers, None, iter(result)
+
+    async def _respond(self, writer, peer, method, target, version, headers, body, keep_alive):
+        """Answer one request; returns whether the connection stays open"""
+        if self.in_flight >= self.max_in_flight:
+            await self._error(writer, 503, 'Server busy', keep_alive, {'Retry-After': '1'})
+            return keep_alive
+        self.in_flight += 1
+        try:
+            environ = self._environ(peer, method, target, version, headers, body)
+            path = environ['PATH_INFO']
+            if method == 'POST' and path in self.write_routes:
+                executor = self.pools.writers
+            else:
+                executor = self.pools.handlers
+            loop = asyncio.get_running_loop()
+            status, response_headers, response_body, stream = await loop.run_in_executor(
+                executor, self._call_app, environ)
+
+            # Streams without a length use chunked encoding on HTTP/1.1, else close the connection
+            chunked = stream is not None and version == 'HTTP/1.1'
+            keep_alive = keep_alive and (stream is None or chunked)
+            lines = [f"{version} {status}"]
+            for name, value in response_headers:
+                if name.lower() not in ('connection', 'transfer-encoding'):
+                    lines.append(f"{name}: {value}")
+            if chunked:
+                lines.append('Transfer-Encoding: chunked')
+            lines.append(f"Date: {formatdate(usegmt=True)}")
+            lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            if stream is None:
+                if method != 'HEAD':
+                    writer.write(response_body)
+                await writer.drain()
+                return keep_alive
+            await self._stream(writer, stream, chunked)
+            return keep_alive
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, writer, stream, chunked):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.pools.streams, partial(next, stream, None))
+                if chunk is None:
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if not chunk:
+                    continue
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                await writer.drain()
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        finally:
+            if hasattr(stream, 'close'):
+                await loop.run_in_executor(self.pools.streams, stream.close)
+
+    @staticmethod
+    async def _error(writer, status, message, keep_alive=False, extra_headers=None):
+        body = ('{"error": "%s"}' % message).encode('utf-8')
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                 'Content-Type: application/json',
+                 f"Content-Length: {len(body)}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in (extra_headers or {}).items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def serve(listeners):
+    """Run (front_end, host, port) listeners until SIGINT/SIGTERM, then drain them"""
+    for front_end, host, port in listeners:
+        await front_end.start(host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    await stop.wait()
+    deadline = loop.time() + ASYNC_SHUTDOWN_SECONDS
+    await asyncio.gather(*(front_end.drain(deadline) for front_end, _, _ in listeners))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the moderation or Hope API on an asyncio front end')
+    parser.add_argument('service', choices=sorted(SERVICES))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, help='default: PORT, then the service port')
+    parser.add_argument('--threads', type=int, default=ASYNC_HANDLER_THREADS)
+    parser.add_argument('--write-threads', type=int, default=ASYNC_WRITE_THREADS)
+    parser.add_argument('--max-in-flight', type=int, default=ASYNC_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Run from scripts/ like the services: databases and models are relative to it
+    module = load_service(args.service)
+    _, default_port, write_routes = SERVICES[args.service]
+    port = args.port or int(os.environ.get('PORT', default_port))
+
+    pools = HandlerPools(args.threads, args.write_threads)
+    front_end = AsyncFrontEnd(module.app, write_routes, pools, args.max_in_flight)
+    try:
+        asyncio.run(serve([(front_end, args.host, port)]))
+    finally:
+        pools.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Single-host mode: the moderation and Hope APIs served from one process
+A small deployment pays for one interpreter, one Flask/numpy/sklearn import and
+one cold start instead of two. Both apps share the text normalization and
+pattern modules, the asyncio front end's handler pools (including one writer
+pool, so writes to both SQLite databases are queued together) and, when
+SCORING_WORKERS is set, the scoring pool. POST /analyze-message scores one
+message for moderation and counseling in a single request.
+
+Usage:
+    python combined_server.py [--host 0.0.0.0] [--ml-port 5000] [--hope-port 5001]
+    python combined_server.py --single-port [--port 5000]    # Hope under /hope
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import traceback
+
+from flask import jsonify, request
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+from async_server import (ASYNC_HANDLER_THREADS, ASYNC_MAX_IN_FLIGHT, ASYNC_WRITE_THREADS, SERVICES,
+                          AsyncFrontEnd, HandlerPools, load_service, serve)
+from text_normalization import AnalyzedText
+
+logger = logging.getLogger('combined_server')
+
+# Mount point of the Hope API when both share one port
+HOPE_PREFIX = '/hope'
+
+
+def install_combined_routes(ml, hope):
+    """Add POST /analyze-message to the moderation app"""
+
+    def analyze_message():
+        """
+        Moderation and counseling for one message
+        Expected input: {"message": "text", "user_id": optional}
+        Returns: {"moderation": <predict-batch prediction>, "counseling": <counsel response>}
+        """
+        try:
+            data = request.get_json()
+            if not data or not data.get('message'):
+                return jsonify({'error': 'Message is required'}), 400
+
+            message = data['message']
+            user_id = data.get('user_id', 'anonymous')
+            # Moderation rejects oversized texts; counseling analyzes the first HOPE_MAX_MESSAGE_CHARS
+            if len(message) > ml.MAX_INPUT_CHARS:
+                return jsonify({'error': f'Message exceeds {ml.MAX_INPUT_CHARS} characters'}), 413
+
+            # One analyzed text feeds both services' normalization, patterns and models
+            analysis = AnalyzedText(message)
+            prediction, _ = ml.predict_text(analysis)
+            return jsonify({
+                'moderation': ml.convert_types(prediction),
+                'counseling': hope.counsel_message(analysis, user_id)
+            })
+
+        except Exception as e:
+            logger.error(f"Combined analysis error: {e}")
+            traceback.print_exc()
+            return jsonify({'error': 'Analysis failed', 'details': str(e)}), 500
+
+    ml.app.add_url_rule('/analyze-message', 'analyze_message', analyze_message, methods=['POST'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the moderation and Hope APIs from one process')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--ml-port', type=int, default=SERVICES['ml'][1])
+    parser.add_argument('--hope-port', type=int, default=SERVICES['hope'][1])
+    parser.add_argument('--single-port', action='store_true',
+                        help=f'serve both on --port (default PORT), with Hope under {HOPE_PREFIX}')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--threads', type=int, default=ASYNC_HANDLER_THREADS)
+    parser.add_argument('--write-threads', type=int, default=ASYNC_WRITE_THREADS)
+    parser.add_argument('--max-in-flight', type=int, default=ASYNC_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Moderation first: its scoring pool forks before Hope starts any thread
+    ml = load_service('ml')
+    hope = load_service('hope')
+    install_combined_routes(ml, hope)
+
+    pools = HandlerPools(args.threads, args.write_threads)
+    ml_writes, hope_writes = SERVICES['ml'][2], SERVICES['hope'][2]
+    if args.single_port:
+        app = DispatcherMiddleware(ml.app, {HOPE_PREFIX: hope.app})
+        write_routes = ml_writes + tuple(HOPE_PREFIX + route for route in hope_writes)
+        port = args.port or int(os.environ.get('PORT', args.ml_port))
+        listeners = [(AsyncFrontEnd(app, write_routes, pools, args.max_in_flight), args.host, port)]
+    else:
+        listeners = [
+            (AsyncFrontEnd(ml.app, ml_writes, pools, args.max_in_flight), args.host, args.ml_port),
+            (AsyncFrontEnd(hope.app, hope_writes, pools, args.max_in_flight), args.host, args.hope_port),
+        ]
+
+    try:
+        asyncio.run(serve(listeners))
+    finally:
+        pools.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Cross-validated hyperparameter search for the hate speech detector
+Vectorizer and classifier settings are tried from a grid (or a random sample of
+it) with stratified k-fold cross-validation on a process pool. Word n-grams are
+counted once for the whole corpus; every fold and vectorizer setting derives its
+features from those counts (vocabulary pruning and idf on the fold's training
+rows only, so scores match a TfidfVectorizer fitted per fold), and every
+classifier setting reuses the features of its fold. The best setting maximizes
+mean accuracy minus latency_weight times the inference time per 1000 texts.
+
+Usage:
+    python hyperparameter_search.py [--mode grid|random] [--iterations 20] [--folds 5]
+                                    [--workers N] [--latency-weight 0.0001] [--space JSON]
+                                    [--cache-dir DIR] [--db training_data.db] [--json]
+
+SIGTERM cancels the search: workers finish their current task and the pool is shut
+down before the process exits.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import numbers
+import os
+import random
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from threading import Event
+
+import numpy as np
+
+from training_corpus import DEFAULT_CACHE_DIR, build_corpus, default_sources, load_corpus
+
+logger = logging.getLogger(__name__)
+
+# The detector's feature and model settings; searches vary some of them
+DETECTOR_VECTORIZER_PARAMS = {
+    'max_features': 10000,
+    'ngram_range': (1, 3),
+    'stop_words': 'english',
+    'lowercase': True,
+    'min_df': 2,
+    'max_df': 0.8
+}
+DETECTOR_MODEL_PARAMS = {
+    'random_state': 42,
+    'class_weight': 'balanced',
+    'C': 1.0
+}
+
+# Searchable settings and the default search space
+SEARCHABLE_PARAMS = {
+    'vectorizer': ('max_features', 'ngram_range', 'min_df', 'max_df', 'sublinear_tf'),
+    'model': ('C', 'class_weight')
+}
+DEFAULT_SEARCH_SPACE = {
+    'vectorizer': {
+        'max_features': [5000, 10000, 20000],
+        'ngram_range': [(1, 1), (1, 2), (1, 3)],
+        'min_df': [1, 2],
+        'sublinear_tf': [False, True]
+    },
+    'model': {
+        'C': [0.25, 1.0, 4.0]
+    }
+}
+SEARCH_MODES = ('grid', 'random')
+SEARCH_MAX_CONFIGS = 500
+SEARCH_DEFAULT_ITERATIONS = 20
+SEARCH_DEFAULT_FOLDS = 5
+
+# Worker processes; defaults to one per core
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 0)) or os.cpu_count() or 1
+
+# Accuracy given up per millisecond of inference time per 1000 texts
+SEARCH_LATENCY_WEIGHT = float(os.environ.get('SEARCH_LATENCY_WEIGHT', '0.0001'))
+
+# Held-out texts timed per fold for the inference latency estimate
+SEARCH_LATENCY_SAMPLE_TEXTS = 1000
+
+# Fold data shared with the workers (inherited on fork, pickled once per worker otherwise)
+_shared = None
+
+
+class SearchCancelled(Exception):
+    """Raised when a search is cancelled between tasks"""
+
+
+def _config_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def _normalize_values(section, name, values):
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"{section}.{name} must be a non-empty list")
+    if name == 'ngram_range':
+        if not all(isinstance(value, (list, tuple)) and len(value) == 2 and 1 <= value[0] <= value[1]
+                   for value in values):
+            raise ValueError('ngram_range values must be [min_n, max_n] pairs')
+        return [tuple(int(n) for n in value) for value in values]
+    return values
+
+
+def expand_configs(space=None, mode='grid', iterations=SEARCH_DEFAULT_ITERATIONS, seed=42):
+    """
+    List of {'vectorizer': {...}, 'model': {...}} settings to evaluate
+    space maps 'vectorizer' and 'model' to {param: [values]}; unlisted params keep
+    the detector's settings. Random mode samples iterations distinct grid points.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+    space = DEFAULT_SEARCH_SPACE if space is None else space
+    unknown = set(space) - set(SEARCHABLE_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown search space sections: {', '.join(sorted(unknown))}")
+
+    axes = []
+    for section, allowed in SEARCHABLE_PARAMS.items():
+        params = space.get(section) or {}
+        unknown = set(params) - set(allowed)
+        if unknown:
+            raise ValueError(f"{section} parameters must be among {', '.join(allowed)}; "
+                             f"got {', '.join(sorted(unknown))}")
+        for name, values in params.items():
+            axes.append((section, name, _normalize_values(section, name, values)))
+
+    grid = list(itertools.product(*(values for _, _, values in axes)))
+    if mode == 'random' and iterations < len(grid):
+        grid = random.Random(seed).sample(grid, iterations)
+    if len(grid) > SEARCH_MAX_CONFIGS:
+        raise ValueError(f"Search space has {len(grid)} settings; the limit is {SEARCH_MAX_CONFIGS} "
+                         f"(use random mode)")
+
+    configs = []
+    for values in grid:
+        config = {'vectorizer': {}, 'model': {}}
+        for (section, name, _), value in zip(axes, values):
+            config[section][name] = value
+        configs.append(config)
+    return configs
+
+
+def decode_settings(result):
+    """(vectorizer_params, model_params) of a search result read back from JSON"""
+    vectorizer = dict(result['vectorizer'])
+    if 'ngram_range' in vectorizer:
+        vectorizer['ngram_range'] = tuple(vectorizer['ngram_range'])
+    return vectorizer, dict(result['model'])
+
+
+def count_ngrams(texts, ngram_range, base_params=DETECTOR_VECTORIZER_PARAMS):
+    """Raw n-gram counts for every text, with the terms (sorted) and their n-gram order"""
+    from sklearn.feature_extraction.text import CountVectorizer
+    counter = CountVectorizer(ngram_range=ngram_range, stop_words=base_params.get('stop_words'),
+                              lowercase=base_params.get('lowercase', True), dtype=np.float64)
+    counts = counter.fit_transform(texts).tocsr()
+    terms = counter.get_feature_names_out()
+    # Tokens never contain spaces, so an n-gram has n - 1 of them
+    orders = np.fromiter((term.count(' ') + 1 for term in terms), dtype=np.int8, count=len(terms))
+    return counts, terms, orders
+
+
+def select_features(X_train, params):
+    """
+    Columns of X_train a TfidfVectorizer fitted on these rows would keep:
+    terms seen in training, pruned by max_df/min_df, then the max_features most frequent
+    """
+    n_docs = X_train.shape[0]
+    dfs = np.bincount(X_train.indices, minlength=X_train.shape[1])
+    present = np.flatnonzero(dfs)
+    X_train = X_train[:, present]
+    dfs = dfs[present]
+
+    max_df, min_df = params.get('max_df', 1.0), params.get('min_df', 1)
+    high = max_df if isinstance(max_df, numbers.Integral) else max_df * n_docs
+    low = min_df if isinstance(min_df, numbers.Integral) else min_df * n_docs
+    if high < low:
+        raise ValueError('max_df corresponds to < documents than min_df')
+    mask = (dfs <= high) & (dfs >= low)
+
+    limit = params.get('max_features')
+    if limit is not None and mask.sum() > limit:
+        tfs = np.asarray(X_train.sum(axis=0)).ravel()
+        kept = np.flatnonzero(mask)[(-tfs[mask]).argsort()[:limit]]
+        mask = np.zeros(len(dfs), dtype=bool)
+        mask[kept] = True
+    if not mask.any():
+        raise ValueError('After pruning, no terms remain. Try a lower min_df or a higher max_df.')
+    return present[mask]
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _evaluate(vectorizer_params, model_configs, fold):
+    """Fit one vectorizer setting on one fold and score every classifier setting on it"""
+    from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, f1_score
+
+    counts, terms, orders = _shared['counts'], _shared['terms'], _shared['orders']
+    labels, texts = _shared['labels'], _shared['texts']
+    train_rows, test_rows = _shared['folds'][fold]
+    params = dict(_shared['vectorizer_params'], **vectorizer_params)
+
+    min_n, max_n = params['ngram_range']
+    columns = np.flatnonzero((orders >= min_n) & (orders <= max_n))
+    X_train = counts[train_rows][:, columns]
+    columns = columns[select_features(X_train, params)]
+
+    transformer = TfidfTransformer(norm=params.get('norm', 'l2'), smooth_idf=params.get('smooth_idf', True),
+                                   sublinear_tf=params.get('sublinear_tf', False))
+    X_train = transformer.fit_transform(counts[train_rows][:, columns])
+    X_test = transformer.transform(counts[test_rows][:, columns])
+    y_train, y_test = labels[train_rows], labels[test_rows]
+
+    # Serving-path latency: a vectorizer with this fold's vocabulary and idf on raw held-out texts
+    vectorizer = TfidfVectorizer(
+        vocabulary=terms[columns], **{name: value for name, value in params.items()
+                                      if name not in ('max_features', 'min_df', 'max_df')})
+    vectorizer.idf_ = transformer.idf_
+    sample = [texts[row] for row in test_rows[:SEARCH_LATENCY_SAMPLE_TEXTS]]
+    started = time.perf_counter()
+    X_sample = vectorizer.transform(sample)
+    transform_seconds = time.perf_counter() - started
+
+    results = []
+    for model_params in model_configs:
+        model = LogisticRegression(**dict(_shared['model_params'], **model_params))
+        model.fit(X_train, y_train)
+        predictions = model.predict(X_test)
+        started = time.perf_counter()
+        model.predict_proba(X_sample)
+        seconds = transform_seconds + time.perf_counter() - started
+        results.append({
+            'model': model_params,
+            'accuracy': float(accuracy_score(y_test, predictions)),
+            'f1': float(f1_score(y_test, predictions, zero_division=0)),
+            'latency_ms_per_1k': seconds * 1000 * 1000 / max(len(sample), 1),
+            'features': len(columns)
+        })
+    return results
+
+
+def run_search(texts, labels, configs, folds=SEARCH_DEFAULT_FOLDS, workers=SEARCH_WORKERS,
+               latency_weight=SEARCH_LATENCY_WEIGHT, progress=None, cancel_event=None):
+    """
+    Cross-validate configs and return them ranked, best first
+    progress(done, total) is called after each (vectorizer setting, fold) task;
+    setting cancel_event stops the search with SearchCancelled.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    started = time.perf_counter()
+    labels = np.asarray(labels)
+    if folds < 2:
+        raise ValueError('folds must be at least 2')
+    if np.bincount(labels).min(initial=len(labels)) < folds:
+        raise ValueError(f"Every label needs at least {folds} examples for {folds}-fold cross-validation")
+
+    # Configs sharing a vectorizer setting share its features on every fold
+    groups = {}
+    for config in configs:
+        groups.setdefault(_config_key(config['vectorizer']), (config['vectorizer'], []))[1].append(config['model'])
+
+    ngram_ranges = [dict(DETECTOR_VECTORIZER_PARAMS, **vectorizer)['ngram_range'] for vectorizer, _ in groups.values()]
+    counts, terms, orders = count_ngrams(texts, (min(n for n, _ in ngram_ranges), max(n for _, n in ngram_ranges)))
+    counted_seconds = time.perf_counter() - started
+
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    shared = {
+        'counts': counts, 'terms': terms, 'orders': orders, 'labels': labels, 'texts': texts,
+        'folds': list(splitter.split(np.zeros(len(labels)), labels)),
+        'vectorizer_params': DETECTOR_VECTORIZER_PARAMS, 'model_params': DETECTOR_MODEL_PARAMS
+    }
+    tasks = [(vectorizer, models, fold) for vectorizer, models in groups.values() for fold in range(folds)]
+    workers = max(1, min(workers, len(tasks)))
+    logger.info(f"Searching {len(configs)} settings ({len(groups)} vectorizer settings x {folds} folds) "
+                f"on {workers} workers; n-grams counted in {counted_seconds:.2f}s")
+
+    scores = {}
+
+    def collect(task, results):
+        vectorizer = task[0]
+        for result in results:
+            key = _config_key({'vectorizer': vectorizer, 'model': result['model']})
+            scores.setdefault(key, []).append(result)
+
+    done = 0
+    if workers == 1:
+        _init_worker(shared)
+        try:
+            for task in tasks:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SearchCancelled()
+                collect(task, _evaluate(*task))
+                done += 1
+                if progress:
+                    progress(done, len(tasks))
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared,)) as executor:
+            pending = {executor.submit(_evaluate, *task): task for task in tasks}
+            try:
+                while pending:
+                    finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise SearchCancelled()
+                    for future in finished:
+                        collect(pending.pop(future), future.result())
+                        done += 1
+                        if progress:
+                            progress(done, len(tasks))
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    ranked = []
+    for config in configs:
+        fold_results = scores[_config_key(config)]
+        accuracies = np.array([result['accuracy'] for result in fold_results])
+        latency = float(np.mean([result['latency_ms_per_1k'] for result in fold_results]))
+        ranked.append({
+            'vectorizer': config['vectorizer'],
+            'model': config['model'],
+            'cv_accuracy': float(accuracies.mean()),
+            'cv_accuracy_std': float(accuracies.std()),
+            'cv_f1': float(np.mean([result['f1'] for result in fold_results])),
+            'latency_ms_per_1k': latency,
+            'features': int(np.mean([result['features'] for result in fold_results])),
+            'objective': float(accuracies.mean()) - latency_weight * latency
+        })
+    ranked.sort(key=lambda result: result['objective'], reverse=True)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Search of {len(configs)} settings finished in {elapsed:.2f}s; "
+                f"best cv accuracy {ranked[0]['cv_accuracy']:.4f}")
+    return {
+        'results': ranked,
+        'best': ranked[0],
+        'settings': len(configs),
+        'vectorizer_settings': len(groups),
+        'folds': folds,
+        'workers': workers,
+        'latency_weight': latency_weight,
+        'samples': len(labels),
+        'elapsed_seconds': round(elapsed, 2)
+    }
+
+
+def _json_line(payload):
+    sys.stdout.write(json.dumps(payload) + '\n')
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter search for the detector')
+    parser.add_argument('--mode', choices=SEARCH_MODES, default='grid')
+    parser.add_argument('--iterations', type=int, default=SEARCH_DEFAULT_ITERATIONS,
+                        help='settings sampled in random mode')
+    parser.add_argument('--folds', type=int, default=SEARCH_DEFAULT_FOLDS)
+    parser.add_argument('--workers', type=int, default=SEARCH_WORKERS)
+    parser.add_argument('--latency-weight', type=float, default=SEARCH_LATENCY_WEIGHT)
+    parser.add_argument('--space', help='JSON search space, e.g. {"model": {"C": [0.5, 1, 2]}}')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--db', default=None, help='training_data SQLite database to include')
+    parser.add_argument('--json', action='store_true', help='emit JSON lines (progress, then result or error)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    # Terminating only this process would orphan its pool workers, so SIGTERM cancels instead
+    cancel_event = Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancel_event.set())
+    try:
+        configs = expand_configs(json.loads(args.space) if args.space else None, args.mode,
+                                 args.iterations, args.seed)
+        corpus = load_corpus(args.cache_dir)
+        if corpus is None:
+            corpus = build_corpus(default_sources(args.db), args.cache_dir)
+        progress = (lambda done, total: _json_line({'progress': {'done': done, 'total': total}})) \
+            if args.json else None
+        summary = run_search(corpus.texts(), np.asarray(corpus.labels), configs, args.folds, args.workers,
+                             args.latency_weight, progress=progress, cancel_event=cancel_event)
+    except SearchCancelled:
+        if args.json:
+            _json_line({'error': 'Search cancelled'})
+        else:
+            print('Search cancelled', file=sys.stderr)
+        return 1
+    except ValueError as e:
+        if args.json:
+            _json_line({'error': str(e)})
+        else:
+            print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        _json_line({'result': summary})
+        return 0
+
+    print(f"{summary['settings']} settings, {summary['folds']} folds, {summary['samples']} samples, "
+          f"{summary['workers']} workers: {summary['elapsed_seconds']}s")
+    print(f"{'objective':>9} {'accuracy':>8} {'std':>6} {'f1':>6} {'ms/1k':>7} {'features':>8}  settings")
+    for result in summary['results']:
+        settings = json.dumps(dict(result['vectorizer'], **result['model']), sort_keys=True)
+        print(f"{result['objective']:9.4f} {result['cv_accuracy']:8.4f} {result['cv_accuracy_std']:6.4f} "
+              f"{result['cv_f1']:6.4f} {result['latency_ms_per_1k']:7.1f} {result['features']:8d}  {settings}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
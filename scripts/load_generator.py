@@ -0,0 +1,328 @@
+"""
+Replay load generator for capacity planning of the moderation and Hope servers
+Replays comment traffic drawn from labeled_data.csv, plus crisis messages for Hope,
+against locally running servers. Each step runs either at a fixed arrival rate
+(open loop) or at a fixed concurrency (closed loop). The JSON/HTML report gives
+throughput, p50/p95/p99 latency and error rate per step, which together form the
+saturation curve, and the highest throughput that stayed within the latency SLO.
+
+Usage:
+    python load_generator.py --mode rate --steps 5,10,20,40,80 --step-seconds 20
+    python load_generator.py --mode concurrency --steps 1,2,4,8,16,32 \
+                             --toxic-share 0.3 --crisis-share 0.05 --report capacity
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from threading import Event, Lock, Thread
+
+import numpy as np
+
+logger = logging.getLogger('load_generator')
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELED_DATA_PATH = os.path.join(SCRIPTS_DIR, 'labeled_data.csv')
+ML_SERVER_URL = os.environ.get('ML_SERVER_URL', 'http://localhost:5000')
+HOPE_SERVER_URL = os.environ.get('HOPE_SERVER_URL', 'http://localhost:5001')
+REQUEST_TIMEOUT_SECONDS = 10
+
+# labeled_data.csv "class" values that count as toxic (hate speech, offensive)
+TOXIC_CLASSES = {'0', '1'}
+
+# Messages that should drive Hope's crisis path
+CRISIS_MESSAGES = [
+    "I want to die, I can't do this anymore",
+    "I keep thinking about suicide and ending it all",
+    "I want to hurt myself tonight",
+    "There's no reason to live, I want to kill myself",
+    "This is an emergency, I'm not safe right now",
+    "I've been cutting again and I can't stop",
+]
+
+
+def load_texts(path=LABELED_DATA_PATH):
+    """(toxic, clean) tweets from the labeled dataset"""
+    toxic, clean = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            text = row.get('tweet')
+            if not text:
+                continue
+            (toxic if row.get('class') in TOXIC_CLASSES else clean).append(text)
+    return toxic, clean
+
+
+class TrafficMix:
+    """Builds requests with the configured toxic, crisis and Hope shares"""
+
+    def __init__(self, toxic, clean, toxic_share, crisis_share, hope_share, services, seed):
+        self.toxic = toxic
+        self.clean = clean
+        self.toxic_share = toxic_share
+        self.crisis_share = crisis_share
+        if 'hope' not in services:
+            hope_share = 0.0
+        elif 'ml' not in services:
+            hope_share = 1.0
+        self.hope_share = hope_share
+        self.rng = random.Random(seed)
+        self.lock = Lock()
+
+    def _comment(self):
+        pool = self.toxic if self.rng.random() < self.toxic_share else self.clean
+        return self.rng.choice(pool)
+
+    def next_request(self):
+        """(service, url, payload) for the next request"""
+        with self.lock:
+            user_id = self.rng.randint(1, 10000)
+            if self.rng.random() < self.hope_share:
+                message = (self.rng.choice(CRISIS_MESSAGES) if self.rng.random() < self.crisis_share
+                           else self._comment())
+                return 'hope', f"{HOPE_SERVER_URL}/counsel", {'message': message, 'user_id': f"load-{user_id}"}
+            return 'ml', f"{ML_SERVER_URL}/predict-hate-speech", {'text': self._comment(), 'userId': user_id}
+
+
+def send(url, payload):
+    """POST JSON and return the HTTP status, or None when no response arrived"""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError) as e:
+        logger.debug(f"Request to {url} failed: {e}")
+        return None
+
+
+class StepRecorder:
+    """Latencies and outcomes of one load step"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.samples = []
+
+    def record(self, service, latency_ms, status):
+        with self.lock:
+            self.samples.append((service, latency_ms, status))
+
+    def summary(self, elapsed):
+        with self.lock:
+            samples = list(self.samples)
+        result = summarize_samples(samples, elapsed)
+        result['services'] = {
+            service: summarize_samples([s for s in samples if s[0] == service], elapsed)
+            for service in sorted({s[0] for s in samples})
+        }
+        return result
+
+
+def summarize_samples(samples, elapsed):
+    latencies = np.asarray([latency for _, latency, _ in samples])
+    errors = sum(1 for _, _, status in samples if status is None or status >= 400)
+    summary = {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 5) if samples else 0.0,
+        'throughput_rps': round((len(samples) - errors) / elapsed, 2) if elapsed else 0.0,
+    }
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update(p50_ms=round(float(p50), 2), p95_ms=round(float(p95), 2),
+                       p99_ms=round(float(p99), 2), max_ms=round(float(latencies.max()), 2))
+    else:
+        summary.update(p50_ms=None, p95_ms=None, p99_ms=None, max_ms=None)
+    return summary
+
+
+def timed_send(mix, recorder, scheduled_at=None):
+    """Send one request; open-loop latency counts from the scheduled time so queueing shows"""
+    service, url, payload = mix.next_request()
+    started = scheduled_at if scheduled_at is not None else time.perf_counter()
+    status = send(url, payload)
+    recorder.record(service, (time.perf_counter() - started) * 1000, status)
+
+
+def run_rate_step(mix, rate, seconds, max_workers):
+    """Open loop: Poisson arrivals at the target rate, regardless of how fast responses come"""
+    recorder = StepRecorder()
+    rng = random.Random(int(rate * 1000))
+    started = time.perf_counter()
+    deadline = started + seconds
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='load') as pool:
+        next_at = started
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at >= deadline:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(timed_send, mix, recorder, next_at)
+    return recorder.summary(time.perf_counter() - started)
+
+
+def run_concurrency_step(mix, concurrency, seconds):
+    """Closed loop: each worker sends its next request as soon as the previous one returns"""
+    recorder = StepRecorder()
+    stop_event = Event()
+
+    def worker():
+        while not stop_event.is_set():
+            timed_send(mix, recorder)
+
+    started = time.perf_counter()
+    workers = [Thread(target=worker, name=f"load-{i}", daemon=True) for i in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    stop_event.wait(seconds)
+    stop_event.set()
+    for thread in workers:
+        thread.join()
+    return recorder.summary(time.perf_counter() - started)
+
+
+def find_capacity(steps, slo_p99_ms, max_error_rate):
+    """Highest-throughput step that kept p99 and the error rate within limits"""
+    within = [step for step in steps
+              if step['p99_ms'] is not None and step['p99_ms'] <= slo_p99_ms
+              and step['error_rate'] <= max_error_rate]
+    if not within:
+        return None
+    best = max(within, key=lambda step: step['throughput_rps'])
+    return {'load': best['load'], 'throughput_rps': best['throughput_rps'], 'p99_ms': best['p99_ms']}
+
+
+def _polyline(values, width, height, top):
+    points = []
+    for i, value in enumerate(values):
+        x = 60 + (width - 120) * (i / max(len(values) - 1, 1))
+        y = height - 40 - (height - 80) * ((value or 0) / top if top else 0)
+        points.append(f"{x:.1f},{y:.1f}")
+    return ' '.join(points)
+
+
+def render_html(report):
+    """Self-contained HTML page with the saturation curve and per-step table"""
+    steps = report['steps']
+    width, height = 760, 320
+    throughput = [step['throughput_rps'] for step in steps]
+    p99 = [step['p99_ms'] for step in steps]
+    top_rps = max(throughput + [1])
+    top_p99 = max([value or 0 for value in p99] + [1])
+    labels = ''.join(
+        f'<text x="{60 + (width - 120) * (i / max(len(steps) - 1, 1)):.1f}" y="{height - 20}" '
+        f'text-anchor="middle" font-size="11">{step["load"]}</text>'
+        for i, step in enumerate(steps))
+    rows = ''.join(
+        f"<tr><td>{step['load']}</td><td>{step['requests']}</td><td>{step['throughput_rps']}</td>"
+        f"<td>{step['p50_ms']}</td><td>{step['p95_ms']}</td><td>{step['p99_ms']}</td>"
+        f"<td>{step['error_rate']:.2%}</td></tr>"
+        for step in steps)
+    capacity = report['capacity']
+    capacity_text = (f"{capacity['throughput_rps']} req/s at {report['config']['mode']} "
+                     f"{capacity['load']} (p99 {capacity['p99_ms']} ms)" if capacity
+                     else 'No step stayed within the SLO')
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Load test report</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 10px;text-align:right}}</style></head>
+<body>
+<h1>Load test report</h1>
+<p>{escape(report['started_at'])} &middot; {escape(json.dumps(report['config']))}</p>
+<p><strong>Capacity within SLO (p99 &le; {report['config']['slo_p99_ms']} ms):</strong> {escape(capacity_text)}</p>
+<svg width="{width}" height="{height}" style="border:1px solid #ddd">
+<polyline fill="none" stroke="#2a7ae2" stroke-width="2" points="{_polyline(throughput, width, height, top_rps)}"/>
+<polyline fill="none" stroke="#e2562a" stroke-width="2" points="{_polyline(p99, width, height, top_p99)}"/>
+<text x="60" y="20" fill="#2a7ae2" font-size="12">throughput (max {top_rps} req/s)</text>
+<text x="{width - 60}" y="20" fill="#e2562a" font-size="12" text-anchor="end">p99 latency (max {top_p99} ms)</text>
+{labels}
+</svg>
+<table><tr><th>{escape(report['config']['mode'])}</th><th>requests</th><th>req/s</th>
+<th>p50 ms</th><th>p95 ms</th><th>p99 ms</th><th>errors</th></tr>{rows}</table>
+</body></html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay comment traffic against the local servers')
+    parser.add_argument('--mode', choices=['rate', 'concurrency'], default='concurrency')
+    parser.add_argument('--steps', default='1,2,4,8,16',
+                        help='comma-separated request rates (req/s) or concurrency levels')
+    parser.add_argument('--step-seconds', type=float, default=20.0)
+    parser.add_argument('--services', choices=['ml', 'hope', 'both'], default='both')
+    parser.add_argument('--toxic-share', type=float, default=0.3,
+                        help='share of comments drawn from hate speech/offensive rows')
+    parser.add_argument('--crisis-share', type=float, default=0.05,
+                        help='share of Hope messages that are crisis messages')
+    parser.add_argument('--hope-share', type=float, default=0.2,
+                        help='share of requests sent to Hope when both services are targeted')
+    parser.add_argument('--max-workers', type=int, default=256,
+                        help='sender threads available to open-loop steps')
+    parser.add_argument('--slo-p99-ms', type=float, default=500.0)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--report', default='load_report', help='report path without extension')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    loads = [float(value) if args.mode == 'rate' else int(value) for value in args.steps.split(',')]
+    services = ('ml', 'hope') if args.services == 'both' else (args.services,)
+    toxic, clean = load_texts()
+    mix = TrafficMix(toxic, clean, args.toxic_share, args.crisis_share, args.hope_share,
+                     services, args.seed)
+
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'mode': args.mode, 'step_seconds': args.step_seconds, 'services': list(services),
+            'toxic_share': args.toxic_share, 'crisis_share': args.crisis_share,
+            'hope_share': mix.hope_share, 'slo_p99_ms': args.slo_p99_ms,
+            'ml_server': ML_SERVER_URL, 'hope_server': HOPE_SERVER_URL
+        },
+        'steps': []
+    }
+
+    for load in loads:
+        logger.info(f"Running {args.mode} step {load} for {args.step_seconds}s")
+        if args.mode == 'rate':
+            step = run_rate_step(mix, load, args.step_seconds, args.max_workers)
+        else:
+            step = run_concurrency_step(mix, load, args.step_seconds)
+        step['load'] = load
+        report['steps'].append(step)
+        logger.info(
+            f"{args.mode} {load}: {step['throughput_rps']} req/s, p50 {step['p50_ms']} ms, "
+            f"p99 {step['p99_ms']} ms, errors {step['error_rate']:.2%}")
+
+    report['capacity'] = find_capacity(report['steps'], args.slo_p99_ms, args.max_error_rate)
+
+    with open(f"{args.report}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(f"{args.report}.html", 'w', encoding='utf-8') as f:
+        f.write(render_html(report))
+    print(f"Wrote {args.report}.json and {args.report}.html")
+    if report['capacity']:
+        print(f"Capacity within SLO: {report['capacity']['throughput_rps']} req/s "
+              f"at {args.mode} {report['capacity']['load']}")
+    else:
+        print('No step stayed within the SLO')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Approximate memory footprint of the servers' long-lived structures
+Sizes are deep sizes (containers, numpy arrays and scipy sparse matrices are
+followed, objects already counted are skipped) and process RSS comes from
+/proc, so regressions and leaks show up before a small container is OOM-killed.
+"""
+
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+from threading import Event, Thread
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds between memory log lines; 0 disables periodic logging
+MEMORY_LOG_SECONDS = float(os.environ.get('MEMORY_LOG_SECONDS', '0'))
+
+# Sized shallowly: code, modules and synchronization primitives are not data
+_OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.MethodType,
+                 types.BuiltinFunctionType, threading.Thread, type(threading.Lock()),
+                 type(threading.RLock()))
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by obj and everything it references"""
+    if seen is None:
+        seen = set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, complex) + _OPAQUE_TYPES):
+        return size
+    if isinstance(obj, np.ndarray):
+        # A view (e.g. LogisticRegression.coef_) holds its base's buffer alive; count it once
+        if obj.base is not None:
+            return size + deep_sizeof(obj.base, seen)
+        return max(size, obj.nbytes)
+    if hasattr(obj, 'tocsr') and hasattr(obj, 'nnz'):
+        # scipy sparse matrix
+        return size + sum(deep_sizeof(getattr(obj, name, None), seen)
+                          for name in ('data', 'indices', 'indptr', 'row', 'col'))
+    # Containers are copied first so concurrent writers cannot break iteration
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen)
+                          for key, value in list(obj.items()))
+    if isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        return size + sum(deep_sizeof(item, seen) for item in list(obj))
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    for name in getattr(type(obj), '__slots__', ()):
+        size += deep_sizeof(getattr(obj, name, None), seen)
+    return size
+
+
+def process_memory():
+    """Current and peak resident set size in bytes"""
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == 'darwin' else peak * 1024
+    return {'rss_bytes': rss if rss is not None else peak, 'peak_rss_bytes': peak}
+
+
+def _mb(value):
+    return round(value / (1024 * 1024), 2)
+
+
+class MemoryMonitor:
+    """Sizes named structures on demand and tracks RSS growth since startup"""
+
+    def __init__(self, structures, counts=None):
+        """structures and counts map names to zero-argument callables returning the object or its entry count"""
+        self.structures = structures
+        self.counts = counts or {}
+        self.started_at = datetime.now().isoformat()
+        self.baseline = process_memory()
+        self.stop_event = Event()
+        self.thread = None
+
+    def measure(self):
+        """{name: {'bytes', 'entries'?}} for every registered structure"""
+        sizes = {}
+        for name, get in self.structures.items():
+            try:
+                entry = {'bytes': deep_sizeof(get())}
+                if name in self.counts:
+                    entry['entries'] = self.counts[name]()
+                    if entry['entries']:
+                        entry['bytes_per_entry'] = round(entry['bytes'] / entry['entries'], 1)
+            except Exception as e:
+                entry = {'bytes': None, 'error': str(e)}
+            sizes[name] = entry
+        return sizes
+
+    def report(self):
+        """Process RSS, growth since startup and per-structure sizes"""
+        started = time.perf_counter()
+        memory = process_memory()
+        structures = self.measure()
+        tracked = sum(entry['bytes'] or 0 for entry in structures.values())
+        return {
+            'rss_bytes': memory['rss_bytes'],
+            'rss_mb': _mb(memory['rss_bytes']),
+            'peak_rss_mb': _mb(memory['peak_rss_bytes']),
+            'startup_rss_mb': _mb(self.baseline['rss_bytes']),
+            'growth_since_startup_mb': _mb(memory['rss_bytes'] - self.baseline['rss_bytes']),
+            'tracked_mb': _mb(tracked),
+            'structures': structures,
+            'started_at': self.started_at,
+            'measured_in_ms': round((time.perf_counter() - started) * 1000, 1),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def log_line(self):
+        """One compact log line: RSS, growth and the largest structures"""
+        report = self.report()
+        largest = sorted(((entry['bytes'] or 0, name) for name, entry in report['structures'].items()),
+                         reverse=True)[:5]
+        details = ', '.join(f"{name}={_mb(size)}MB" for size, name in largest)
+        logger.info(f"Memory: rss={report['rss_mb']}MB growth={report['growth_since_startup_mb']}MB "
+                    f"peak={report['peak_rss_mb']}MB {details}")
+
+    def start_logging(self, interval=MEMORY_LOG_SECONDS):
+        """Log a memory line every interval seconds on a background thread (off when 0)"""
+        if interval <= 0:
+            return
+
+        def run():
+            while not self.stop_event.wait(interval):
+                try:
+                    self.log_line()
+                except Exception as e:
+                    logger.error(f"Memory log error: {e}")
+
+        self.thread = Thread(target=run, name='memory-log', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop periodic logging"""
+        self.stop_event.set()
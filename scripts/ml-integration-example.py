@@ -7,20 +7,38 @@ import json
 import logging
 import os
 import pickle
-import re
+import queue
+import random
 import sqlite3
+import atexit
+import io
+import time
+import uuid
+import zlib
+import subprocess
+import sys
+from collections import Counter, OrderedDict, deque
 from datetime import datetime
-from threading import Lock
+from threading import Condition, Event, Lock, Thread
 
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
 import traceback
 
+from text_normalization import (AnalyzedText, analyze_text, content_fingerprint, preprocess_moderation_text,
+                                text_windows, word_analyzer_settings)
+from hyperparameter_search import (DETECTOR_MODEL_PARAMS, DETECTOR_VECTORIZER_PARAMS, SEARCH_DEFAULT_FOLDS,
+                                   SEARCH_DEFAULT_ITERATIONS, SEARCH_LATENCY_WEIGHT, SEARCH_MODES,
+                                   SearchCancelled, decode_settings, expand_configs)
+from memory_introspection import MemoryMonitor
+from pattern_config import PatternStore, PatternWatcher
+from request_profiler import PROFILER_DEFAULT_INTERVAL_MS, RequestProfiler, admin_only
+from scoring_pool import ScoringPool, detect_patterns
+from service_startup import StartupState
+from training_corpus import CsvSource, TrainingDataSource, build_corpus
+from training_ingest import CSV_PRESETS, csv_training_rows, ingest_rows, init_training_table
+
 app = Flask(__name__)
 
 # Configure logging
@@ -35,25 +53,130 @@ CORS(app, origins=["http://localhost:3000", "https://*.vercel.app", "https://*.r
 # Thread-safe model updates
 model_lock = Lock()
 
+# Longest text accepted for scoring; longer texts are scored in overlapping windows
+MAX_INPUT_CHARS = int(os.environ.get('MAX_INPUT_CHARS', 10000))
+PREDICT_WINDOW_CHARS = 1000
+PREDICT_WINDOW_OVERLAP = 200
+# Most texts accepted by one /predict-batch call
+PREDICT_BATCH_MAX_TEXTS = 1000
+
 # Database setup for training data and abuse reports
 DB_PATH = 'training_data.db'
 
+# Cluster repeated abuse reports per reported user as well as per content
+REPORT_DEDUP_BY_REPORTED_USER = os.environ.get('REPORT_DEDUP_BY_REPORTED_USER', '0') == '1'
+
+# Near-duplicate campaign detection over recent posts and comments
+CAMPAIGN_NUM_PERM = 64
+CAMPAIGN_BANDS = 16
+CAMPAIGN_SIMILARITY = 0.7
+CAMPAIGN_WINDOW_SECONDS = 3600
+CAMPAIGN_MAX_DOCUMENTS = 20000
+CAMPAIGN_MAX_CANDIDATES = 50
+CAMPAIGN_MIN_TOKENS = 5
+CAMPAIGN_MIN_CLUSTER_SIZE = 5
+
+# Repeat-offender windows: (name, window length, bucket width) in seconds
+OFFENDER_WINDOWS = (('hour', 3600, 60), ('day', 86400, 3600), ('week', 604800, 3600))
+OFFENDER_WINDOW_WEIGHTS = {'hour': 1.0, 'day': 0.5, 'week': 0.1}
+OFFENDER_SEVERITY_WEIGHTS = {'critical': 1.0, 'high': 0.7, 'medium': 0.5, 'low': 0.3}
+REPEAT_OFFENDER_SCORE = 3.0
+OFFENDER_MAX_USERS = 100000
+OFFENDER_CHECKPOINT_SECONDS = 60
+
+# Bulk moderation actions and the report status they set
+MODERATION_ACTIONS = {'resolve': 'resolved', 'dismiss': 'dismissed', 'escalate': 'escalated'}
+OPEN_REPORT_STATUSES = ('pending', 'escalated')
+# Training label recorded for each final moderator decision
+MODERATION_LABELS = {'resolve': 'hate_speech', 'dismiss': 'not_hate_speech'}
+
+# Full-text search paging and snippet settings
+SEARCH_DEFAULT_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_SNIPPET_TOKENS = 16
+
+# Normalized, columnar copy of the labeled training_data rows used by retraining
+CORPUS_CACHE_DIR = os.path.join('corpus_cache', 'retrain')
+
+# Cross-validated hyperparameter searches, run by hyperparameter_search.py in a
+# child process so its worker pool never forks this server
+HYPERPARAMETER_SEARCH_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hyperparameter_search.py')
+HYPERPARAMETER_SEARCH_LEADERBOARD = 10
+HYPERPARAMETER_SEARCH_JOB_HISTORY = 10
+
+# Backfill re-scoring of stored texts after a retrain, kept behind live traffic
+RESCORE_AFTER_RETRAIN = os.environ.get('RESCORE_AFTER_RETRAIN', '1') == '1'
+RESCORE_TABLES = ('abuse_reports', 'training_data')
+RESCORE_BATCH_SIZE = 200
+# Share of wall time the backfill may spend scoring, and the quiet period it
+# waits for after the last live prediction before scoring the next batch
+RESCORE_DUTY_CYCLE = float(os.environ.get('RESCORE_DUTY_CYCLE', '0.2'))
+RESCORE_IDLE_SECONDS = 0.25
+RESCORE_JOB_HISTORY = 10
+
+# Shadow evaluation of a candidate model on a sample of live predictions
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_QUEUE_SIZE = 1000
+SHADOW_LATENCY_SAMPLES = 2000
+SHADOW_CANDIDATE_PATH = 'hate_speech_model.candidate.pkl'
+
+# Synthetic texts scored during warm-up so the first real request is not the slowest
+WARMUP_TEXTS = (
+    'Thanks for sharing, this made my day',
+    'You are an idiot and nobody wants you here',
+    'Meet me after school, you will regret it',
+)
+
+# Startup phase timings; the model loads in the background after the port binds
+startup = StartupState()
+
+# Switchable live-request profiler; idle unless an admin starts a session
+request_profiler = RequestProfiler()
+request_profiler.install(app)
+
+# Worker processes for scoring (SCORING_WORKERS); forked here, before any thread starts
+scoring_pool = ScoringPool()
+scoring_pool.start()
+atexit.register(scoring_pool.close)
+
+def merge_open_report_duplicates(cursor):
+    """Merge open reports sharing a dedup key into one, preferring the escalated report"""
+    cursor.execute('''
+        SELECT dedup_key FROM abuse_reports
+        WHERE status IN ('pending', 'escalated') AND dedup_key IS NOT NULL
+        GROUP BY dedup_key
+        HAVING COUNT(*) > 1
+    ''')
+    for (dedup_key,) in cursor.fetchall():
+        cursor.execute('''
+            SELECT id, occurrence_count, last_seen_at, requires_immediate_action FROM abuse_reports
+            WHERE dedup_key = ? AND status IN ('pending', 'escalated')
+            ORDER BY status = 'escalated' DESC, id
+        ''', (dedup_key,))
+        (keep_id, occurrences, last_seen_at, immediate), *duplicates = cursor.fetchall()
+        for report_id, count, seen_at, duplicate_immediate in duplicates:
+            occurrences = (occurrences or 1) + (count or 1)
+            last_seen_at = max(filter(None, (last_seen_at, seen_at)), default=None)
+            immediate = max(immediate or 0, duplicate_immediate or 0)
+            cursor.execute('''
+                UPDATE OR IGNORE abuse_report_reporters SET report_id = ? WHERE report_id = ?
+            ''', (keep_id, report_id))
+            cursor.execute('DELETE FROM abuse_report_reporters WHERE report_id = ?', (report_id,))
+            cursor.execute('DELETE FROM abuse_reports WHERE id = ?', (report_id,))
+        cursor.execute('''
+            UPDATE abuse_reports
+            SET occurrence_count = ?, last_seen_at = ?, requires_immediate_action = ?
+            WHERE id = ?
+        ''', (occurrences, last_seen_at, immediate, keep_id))
+        logger.info(f"Merged {len(duplicates)} open duplicate reports into report {keep_id}")
+
+
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    # Training data table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS training_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            text TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            user_id INTEGER,
-            prediction TEXT,
-            human_label TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    # Training data table, shared with the bulk ingestion CLI
+    init_training_table(cursor)
 
     # Abuse reports table
     cursor.execute('''
@@ -72,6 +195,127 @@ def init_db():
         )
     ''')
 
+    # Repeated content is aggregated into one pending report per dedup key
+    cursor.execute('PRAGMA table_info(abuse_reports)')
+    report_columns = {row[1] for row in cursor.fetchall()}
+    for column, definition in (
+        ('content_hash', 'TEXT'),
+        ('dedup_key', 'TEXT'),
+        ('occurrence_count', 'INTEGER DEFAULT 1'),
+        ('last_seen_at', 'TIMESTAMP'),
+    ):
+        if column not in report_columns:
+            cursor.execute(f'ALTER TABLE abuse_reports ADD COLUMN {column} {definition}')
+            if column == 'last_seen_at':
+                cursor.execute('UPDATE abuse_reports SET last_seen_at = created_at')
+    # One open (pending or escalated) report per dedup key. Older databases indexed
+    # pending reports only; fold any pending duplicate of an escalated cluster into it
+    cursor.execute('''
+        SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_abuse_reports_open_cluster'
+    ''')
+    open_cluster_index = cursor.fetchone()
+    if open_cluster_index is not None and 'escalated' not in open_cluster_index[0]:
+        cursor.execute('DROP INDEX idx_abuse_reports_open_cluster')
+        merge_open_report_duplicates(cursor)
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_abuse_reports_open_cluster
+        ON abuse_reports (dedup_key) WHERE status IN ('pending', 'escalated')
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_abuse_reports_queue
+        ON abuse_reports (status, requires_immediate_action, last_seen_at)
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_abuse_reports_content_hash
+        ON abuse_reports (content_hash)
+    ''')
+
+    # Report counts per status, maintained by triggers for consistent cheap stats
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'abuse_report_status_counts'")
+    backfill_status_counts = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS abuse_report_status_counts (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS abuse_reports_status_insert AFTER INSERT ON abuse_reports
+        BEGIN
+            INSERT INTO abuse_report_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS abuse_reports_status_delete AFTER DELETE ON abuse_reports
+        BEGIN
+            UPDATE abuse_report_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS abuse_reports_status_update AFTER UPDATE OF status ON abuse_reports
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE abuse_report_status_counts SET count = count - 1 WHERE status = COALESCE(OLD.status, '');
+            INSERT INTO abuse_report_status_counts (status, count) VALUES (COALESCE(NEW.status, ''), 1)
+                ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    if backfill_status_counts:
+        cursor.execute('''
+            INSERT INTO abuse_report_status_counts (status, count)
+            SELECT COALESCE(status, ''), COUNT(*) FROM abuse_reports GROUP BY COALESCE(status, '')
+        ''')
+
+    # Distinct users who reported (or posted, for automatic reports) each cluster
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS abuse_report_reporters (
+            report_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (report_id, user_id)
+        )
+    ''')
+
+    # Checkpointed sliding-window offense counters, one JSON state per user
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS offender_counters (
+            user_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            last_offense_at REAL NOT NULL
+        )
+    ''')
+
+    # Re-scoring backfill progress; cursor holds the last id done per table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rescore_jobs (
+            job_id TEXT PRIMARY KEY,
+            model_version INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            cursor TEXT NOT NULL,
+            stats TEXT NOT NULL,
+            error TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+
+    # Outcome of each shadow-evaluated candidate model
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shadow_evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id TEXT NOT NULL,
+            decision TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            agreement REAL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     # Model performance metrics table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS model_metrics (
@@ -85,27 +329,88 @@ def init_db():
         )
     ''')
 
+    # Settings each model was trained with and, for searched models, cross-validation results
+    cursor.execute('PRAGMA table_info(model_metrics)')
+    metrics_columns = {row[1] for row in cursor.fetchall()}
+    for column, definition in (
+        ('params', 'TEXT'),
+        ('cv_accuracy', 'REAL'),
+        ('cv_accuracy_std', 'REAL'),
+        ('latency_ms_per_1k', 'REAL'),
+        ('search', 'TEXT'),
+    ):
+        if column not in metrics_columns:
+            cursor.execute(f'ALTER TABLE model_metrics ADD COLUMN {column} {definition}')
+
     conn.commit()
     conn.close()
 
-init_db()
+startup.run_phase('init_db', init_db)
+
+
+# FTS5 indexes over report and training texts, kept in sync by triggers
+FULL_TEXT_INDEXES = {
+    'abuse_reports': 'abuse_reports_fts',
+    'training_data': 'training_data_fts',
+}
+
+
+def init_full_text_search():
+    """Create FTS5 indexes and sync triggers, backfilling existing rows once"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        for table, fts_table in FULL_TEXT_INDEXES.items():
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+            exists = cursor.fetchone() is not None
+
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+                USING fts5(text, content='{table}', content_rowid='id')
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table}
+                BEGIN
+                    INSERT INTO {fts_table} (rowid, text) VALUES (NEW.id, NEW.text);
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table}
+                BEGIN
+                    INSERT INTO {fts_table} ({fts_table}, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF text ON {table}
+                BEGIN
+                    INSERT INTO {fts_table} ({fts_table}, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+                    INSERT INTO {fts_table} (rowid, text) VALUES (NEW.id, NEW.text);
+                END
+            ''')
+
+            if not exists:
+                cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+                logger.info(f"Backfilled full-text index {fts_table}")
+
+        conn.commit()
+        return True
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        logger.warning(f"Full-text search unavailable: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+FTS_AVAILABLE = startup.run_phase('full_text_search', init_full_text_search)
 
 
 class AdvancedHateSpeechDetector:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=10000,
-            ngram_range=(1, 3),
-            stop_words='english',
-            lowercase=True,
-            min_df=2,
-            max_df=0.8
-        )
-        self.model = LogisticRegression(
-            random_state=42,
-            class_weight='balanced',
-            C=1.0
-        )
+        # Fitted objects come from load_model or train, so sklearn loads only when needed
+        self.vectorizer = None
+        self.model = None
         self.is_trained = False
         self.abuse_patterns = self._load_abuse_patterns()
         self.severity_weights = {
@@ -117,183 +422,165 @@ class AdvancedHateSpeechDetector:
             'spam': 0.3
         }
 
-    def _load_abuse_patterns(self):
-        """Load comprehensive abuse detection patterns, expanded for SDG 5 (gender) and SDG 16 (violence/xenophobia)"""
-        patterns = {
-            'threat': [
-                r'\b(kill|murder|death|die|hurt|harm|attack|destroy)\b.*\b(you|them|him|her)\b',
-                r'\b(going to|gonna|will)\b.*\b(kill|hurt|harm|destroy)\b',
-                r'\bwish.*\b(dead|death|die)\b',
-                r'\b(shoot|stab|beat|punch)\b.*\b(you|them)\b',
-                # SDG 16: Incitement/violence against groups
-                r'\b(kill|attack|destroy|eliminate)\b.*\b(all|every|these|those)\b.*\b(people|group|race|religion|immigrants|refugees)\b',
-                r'\b(ethnic cleansing|final solution)\b',
-                # Enhanced single word detection
-                r'\b(kill|murder|death|die|hurt|harm|attack|destroy)\b',
-                r'\b(shoot|stab|beat|punch|hit|slap)\b',
-            ],
-            'hate_speech': [
-                r'\b(hate|despise|loathe)\b.*\b(because|for being|all)\b',
-                r'\b(all|every)\b.*\b(are|should be)\b.*\b(killed|removed|eliminated)\b',
-                r'\b(inferior|subhuman|worthless)\b.*\b(race|people|group)\b',
-                r'\b(genocide|ethnic cleansing|final solution)\b',
-                # SDG 5: Gender-based hate
-                r'\b(women|girls|females)\b.*\b(should|must|deserve|are|be)\b.*\b(killed|raped|hurt|inferior|worthless|slaves?)\b',
-                r'\b(you are just a girl)\b',
-                r'\b(women should not have rights)\b',
-                # SDG 16: Xenophobia/racism - Enhanced patterns
-                r'\b(go back to your country)\b',
-                r'\b(go back where you came from)\b',
-                r'\b(you don\'t belong here)\b',
-                r'\b(you don\'t belong)\b',
-                r'\b(don\'t belong)\b',
-                r'\b(all immigrants are criminals)\b',
-                r'\b(refugees are terrorists)\b',
-                r'\b(go back to your own country)\b',
-                r'\b(you don\'t belong in this country)\b',
-                r'\b([a-z]+s? are criminals)\b',
-                # Enhanced single word detection for hate speech
-                r'\b(fuck|shit|bitch|cunt|dick|pussy|asshole|bastard|whore|slut|faggot)\b',
-                r'\b(nigger|nigga|kike|spic|chink|gook|wetback|towelhead|raghead)\b',
-                r'\b(hate|despise|loathe|inferior|subhuman|worthless)\b',
-            ],
-            'harassment': [
-                r'\b(stalking|following|watching)\b.*\byou\b',
-                r'\b(doxx|dox|expose|find)\b.*\b(address|location|info)\b',
-                r'\bshut up\b.*\b(stupid|idiot|moron)\b',
-                r'\b(constantly|always|keep)\b.*\b(bothering|annoying|messaging)\b',
-                # SDG 5: Sexual harassment
-                r'\bsend nudes\b',
-                r'\b(sexual (harassment|abuse|assault))\b',
-                r'\b(rape|raped|rapist)\b',
-                r'\b(you should be raped)\b',
-                # Enhanced single word detection for harassment
-                r'\b(stupid|idiot|moron|dumb|retard|imbecile)\b',
-                r'\b(rape|raped|rapist|harassment|stalking)\b',
-            ],
-            'offensive': [
-                r'\b(stupid|idiot|moron|dumb|retard|mental)\b',
-                r'\b(ugly|fat|gross|disgusting)\b.*\b(you|face|body)\b',
-                r'\b(loser|failure|pathetic|worthless)\b',
-                r'\b(shut up|go away|get lost)\b',
-                # SDG 5: Body shaming
-                r'\b(so fat|so ugly|no man will love you|too ugly for love)\b',
-            ],
-            'profanity': [
-                r'\bbitch\b',
-                r'\bslut\b',
-                r'\bwhore\b',
-                r'\bcunt\b',
-                r'\bf[u*][c*]k\b',
-                r'\bs[h*][i*]t\b',
-                r'\bb[i*]tch\b',
-                r'\ba[s*][s*]hole\b',
-                r'\bd[a*]mn\b',
-                r'\bc[r*]ap\b',
-            ],
-            'spam': [
-                r'\b(buy now|click here|limited time|act now)\b',
-                r'\b(free money|get rich|guaranteed)\b',
-                r'\b(winner|congratulations|selected)\b.*\b(prize|lottery|money)\b'
-            ]
-        }
-        # Compile regex patterns for efficiency
-        compiled_patterns = {}
-        for category, pattern_list in patterns.items():
-            compiled_patterns[category] = [re.compile(pattern, re.IGNORECASE)
-                                           for pattern in pattern_list]
-        return compiled_patterns
-
-    def _preprocess_text(self, text):
-        """Advanced text preprocessing"""
-        # Remove URLs
-        text = re.sub(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    def build_vectorizer(self, **params):
+        """Create an unfitted vectorizer with the detector's feature settings, overridden by params"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(**dict(DETECTOR_VECTORIZER_PARAMS, **params))
 
-        # Remove mentions and hashtags
-        text = re.sub(r'@\w+|#\w+', '', text)
+    def build_model(self, **params):
+        """Create an unfitted classifier with the detector's model settings, overridden by params"""
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(**dict(DETECTOR_MODEL_PARAMS, **params))
 
-        # Handle character repetition (e.g., "sooooo" -> "so")
-        text = re.sub(r'(.)\1{2,}', r'\1\1', text)
-
-        # Handle deliberate misspellings and l33t speak
-        replacements = {
-            '@': 'a', '3': 'e', '1': 'i', '0': 'o', '5': 's', '7': 't',
-            '4': 'a', '$': 's', '!': 'i', '+': 't'
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-
-        # Remove excessive punctuation
-        text = re.sub(r'[^\w\s]', ' ', text)
-
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        return text
-
-    def _pattern_based_detection(self, text):
-        """Pattern-based abuse detection for immediate response"""
-        text_processed = self._preprocess_text(text)
-        detected_categories = []
-        confidence_scores = []
-
-        for category, patterns in self.abuse_patterns.items():
-            category_matches = 0
-            for pattern in patterns:
-                if pattern.search(text_processed):
-                    category_matches += 1
-
-            if category_matches > 0:
-                detected_categories.append(category)
-                # Calculate confidence based on pattern matches
-                # Use a higher base confidence for any pattern match
-                base_confidence = 0.8 if category_matches > 0 else 0.0
-                confidence = min(base_confidence + (category_matches / len(patterns)) * 0.2, 1.0)
-                confidence_scores.append(
-                    confidence * self.severity_weights.get(category, 0.5))
-
-        return detected_categories, confidence_scores
-
-    def predict(self, text):
-        """Enhanced prediction with pattern-based and ML-based detection"""
-        if not text or len(text.strip()) < 2:
-            return {
-                'is_hate_speech': False,
-                'confidence': 0.0,
-                'categories': [],
-                'severity': 'none',
-                'requires_immediate_action': False
-            }
+    def publish_model(self, vectorizer, model):
+        """Swap in a trained vectorizer and model without disturbing readers"""
+        with model_lock:
+            self.vectorizer = vectorizer
+            self.model = model
+            self.is_trained = True
 
-        # Pattern-based detection for immediate response
-        pattern_categories, pattern_confidences = self._pattern_based_detection(
-            text)
+    def _load_abuse_patterns(self):
+        """
+        Abuse detection patterns, expanded for SDG 5 (gender) and SDG 16 (violence/xenophobia)
+        Kept in scripts/patterns/abuse_patterns.json and hot-reloaded on edit
+        """
+        return PatternStore('abuse_patterns.json')
 
-        # ML-based detection if model is trained
-        ml_confidence = 0.0
-        if self.is_trained:
+    def _preprocess_text(self, text):
+        """Advanced text preprocessing (shared with the training corpus builder)"""
+        return preprocess_moderation_text(text)
+
+    def _vectorize_windows(self, windows, vectorizer):
+        """
+        TF-IDF rows for AnalyzedText windows, as vectorizer.transform would produce them
+        Built from the windows' cached n-grams; customized analyzers still tokenize themselves
+        """
+        settings = word_analyzer_settings(vectorizer)
+        if settings is None:
+            return vectorizer.transform([window.normalized for window in windows])
+
+        from scipy.sparse import csr_matrix
+        from sklearn.preprocessing import normalize
+
+        vocabulary = vectorizer.vocabulary_
+        rows = []
+        columns = []
+        for row, window in enumerate(windows):
+            for gram in window.ngrams(settings):
+                column = vocabulary.get(gram)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        # Duplicate (row, column) entries are summed into term counts
+        features = csr_matrix((np.ones(len(rows)), (rows, columns)),
+                              shape=(len(windows), len(vocabulary)), dtype=np.float64)
+        if vectorizer.binary:
+            features.data[:] = 1.0
+        if vectorizer.sublinear_tf:
+            np.log(features.data, features.data)
+            features.data += 1.0
+        if vectorizer.use_idf:
+            features.data *= vectorizer.idf_[features.indices]
+        if vectorizer.norm:
+            features = normalize(features, norm=vectorizer.norm, copy=False)
+        return features
+
+    def _score_windows(self, windows, vectorizer, model):
+        """(categories, confidences, ml_confidence) for each AnalyzedText window, scored in this process"""
+        entries = self.abuse_patterns.current.entries
+        pattern_results = [detect_patterns(window.normalized, entries, self.severity_weights)
+                           for window in windows]
+
+        # ML-based detection if model is trained, all windows in one batch
+        ml_confidences = [0.0] * len(windows)
+        if model is not None and windows:
             try:
-                text_processed = self._preprocess_text(text)
-                text_vectorized = self.vectorizer.transform([text_processed])
-                ml_probability = self.model.predict_proba(text_vectorized)[0]
-                ml_confidence = ml_probability[1] if len(
-                    ml_probability) > 1 else 0.0
+                texts_vectorized = self._vectorize_windows(windows, vectorizer)
+                ml_probabilities = model.predict_proba(texts_vectorized)
+                if ml_probabilities.shape[1] > 1:
+                    ml_confidences = [float(p) for p in ml_probabilities[:, 1]]
             except Exception as e:
                 logger.error(f"ML prediction error: {e}")
-                ml_confidence = 0.0
 
-        # Combine pattern-based and ML-based results
+        return [(categories, confidences, ml_confidence)
+                for (categories, confidences), ml_confidence in zip(pattern_results, ml_confidences)]
+
+    def serving_model(self):
+        """The serving {'vectorizer', 'model'} pair (model None when untrained); hold model_lock"""
+        return {'vectorizer': self.vectorizer, 'model': self.model if self.is_trained else None}
+
+    def predict(self, text, candidate=None, pool=None):
+        """
+        Enhanced prediction with pattern-based and ML-based detection
+        A candidate {'vectorizer', 'model'} pair replaces the serving model for the ML part
+        """
+        return self.predict_many([text], candidate, pool)[0]
+
+    def predict_many(self, texts, candidate=None, pool=None):
+        """
+        Predictions for several texts (str or AnalyzedText), with every window scored in one batch
+        With a running scoring pool the windows are scored by its worker processes
+        """
+        if candidate is not None:
+            vectorizer, model = candidate['vectorizer'], candidate['model']
+        else:
+            vectorizer, model = self.vectorizer, self.model if self.is_trained else None
+
+        # Long texts are scored as overlapping windows so cost stays bounded
+        prepared = []
+        windows = []
+        for analysis in map(analyze_text, texts):
+            text = analysis.text
+            if not text or len(text.strip()) < 2:
+                prepared.append(None)
+                continue
+            truncated = len(text) > MAX_INPUT_CHARS
+            text = text[:MAX_INPUT_CHARS]
+            spans = text_windows(text, PREDICT_WINDOW_CHARS, PREDICT_WINDOW_OVERLAP)
+            prepared.append((text, truncated, spans, len(windows)))
+            if len(spans) == 1 and not truncated:
+                # The request's own normalization and n-grams, shared with campaign and report stages
+                windows.append(analysis)
+            else:
+                windows.extend(AnalyzedText(text[start:end]) for start, end in spans)
+
+        scores = None
+        if pool is not None and windows:
+            scores = pool.score(windows, vectorizer, model, self.abuse_patterns.current,
+                                self.severity_weights)
+        if scores is None:
+            scores = self._score_windows(windows, vectorizer, model)
+
+        results = []
+        for item in prepared:
+            if item is None:
+                results.append({
+                    'is_hate_speech': False,
+                    'confidence': 0.0,
+                    'categories': [],
+                    'severity': 'none',
+                    'requires_immediate_action': False
+                })
+                continue
+            text, truncated, spans, first = item
+            results.append(self._verdict(text, truncated, spans, scores[first:first + len(spans)]))
+        return results
+
+    def _verdict(self, text, truncated, spans, window_results):
+        """Combine per-window pattern and ML scores into one prediction"""
+        # The verdict is the worst window's: flagged windows first, then by confidence
+        window_scores = []
+        for _, confidences, ml_confidence in window_results:
+            max_pattern_confidence = max(confidences) if confidences else 0.0
+            # Lower threshold for pattern-based detection, higher for ML-based
+            flagged = max_pattern_confidence > 0.1 or ml_confidence > 0.5
+            window_scores.append((flagged, max(max_pattern_confidence, ml_confidence)))
+        worst = max(range(len(spans)), key=window_scores.__getitem__)
+
+        pattern_categories, pattern_confidences, ml_confidence = window_results[worst]
         max_pattern_confidence = max(
             pattern_confidences) if pattern_confidences else 0.0
-        combined_confidence = max(max_pattern_confidence, ml_confidence)
-
-        # Determine if it's hate speech
-        # Lower threshold for pattern-based detection, higher for ML-based
-        is_hate_speech = (
-            max_pattern_confidence > 0.1 or  # Pattern-based threshold
-            ml_confidence > 0.5              # ML-based threshold
-        )
+        is_hate_speech, combined_confidence = window_scores[worst]
 
         # Determine severity and immediate action requirement
         severity = self._calculate_severity(
@@ -304,7 +591,7 @@ class AdvancedHateSpeechDetector:
             combined_confidence > 0.85
         )
 
-        return {
+        result = {
             'is_hate_speech': is_hate_speech,
             'confidence': float(combined_confidence),
             'categories': pattern_categories,
@@ -313,6 +600,15 @@ class AdvancedHateSpeechDetector:
             'ml_confidence': float(ml_confidence),
             'pattern_confidence': float(max_pattern_confidence)
         }
+        if len(spans) > 1 or truncated:
+            start, end = spans[worst]
+            result['long_text'] = {
+                'length': len(text),
+                'truncated': truncated,
+                'windows': len(spans),
+                'offending_span': {'start': start, 'end': end} if is_hate_speech else None
+            }
+        return result
 
     def _calculate_severity(self, categories, confidence):
         """Calculate abuse severity level"""
@@ -331,14 +627,28 @@ class AdvancedHateSpeechDetector:
         else:
             return 'low'
 
-    def train(self, texts, labels):
-        """Train the ML model with provided data"""
+    def train(self, texts, labels, preprocessed=False, publish=True, vectorizer_params=None,
+              model_params=None):
+        """
+        Train the ML model with provided data (pass preprocessed=True for corpus texts)
+        Fresh objects are fitted while the serving model keeps answering; with
+        publish=False they are only returned, e.g. to evaluate as a shadow candidate.
+        vectorizer_params and model_params override the detector's settings.
+        """
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+
         try:
             # Preprocess texts
-            processed_texts = [self._preprocess_text(text) for text in texts]
+            if preprocessed:
+                processed_texts = texts
+            else:
+                processed_texts = [self._preprocess_text(text) for text in texts]
 
             # Fit vectorizer and transform texts
-            X = self.vectorizer.fit_transform(processed_texts)
+            vectorizer = self.build_vectorizer(**(vectorizer_params or {}))
+            model = self.build_model(**(model_params or {}))
+            X = vectorizer.fit_transform(processed_texts)
             y = np.array(labels)
 
             # Split data for training and validation
@@ -347,14 +657,15 @@ class AdvancedHateSpeechDetector:
             )
 
             # Train the model
-            self.model.fit(X_train, y_train)
+            model.fit(X_train, y_train)
 
             # Evaluate model
             train_accuracy = accuracy_score(
-                y_train, self.model.predict(X_train))
-            test_accuracy = accuracy_score(y_test, self.model.predict(X_test))
+                y_train, model.predict(X_train))
+            test_accuracy = accuracy_score(y_test, model.predict(X_test))
 
-            self.is_trained = True
+            if publish:
+                self.publish_model(vectorizer, model)
 
             logger.info(
                 f"Model trained successfully. Train accuracy: {train_accuracy:.3f}, Test accuracy: {test_accuracy:.3f}")
@@ -363,7 +674,10 @@ class AdvancedHateSpeechDetector:
                 'success': True,
                 'train_accuracy': train_accuracy,
                 'test_accuracy': test_accuracy,
-                'training_samples': len(texts)
+                'training_samples': len(texts),
+                'params': {'vectorizer': vectorizer_params or {}, 'model': model_params or {}},
+                'vectorizer': vectorizer,
+                'model': model
             }
 
         except Exception as e:
@@ -373,12 +687,14 @@ class AdvancedHateSpeechDetector:
     def save_model(self, filepath):
         """Save the trained model and vectorizer"""
         try:
-            with open(filepath, 'wb') as f:
-                pickle.dump({
+            with model_lock:
+                model_data = {
                     'vectorizer': self.vectorizer,
                     'model': self.model,
                     'is_trained': self.is_trained
-                }, f)
+                }
+            with open(filepath, 'wb') as f:
+                pickle.dump(model_data, f)
             return True
         except Exception as e:
             logger.error(f"Model save error: {e}")
@@ -390,6 +706,7 @@ class AdvancedHateSpeechDetector:
             if os.path.exists(filepath):
                 with open(filepath, 'rb') as f:
                     saved_data = pickle.load(f)
+                with model_lock:
                     self.vectorizer = saved_data['vectorizer']
                     self.model = saved_data['model']
                     self.is_trained = saved_data['is_trained']
@@ -400,12 +717,957 @@ class AdvancedHateSpeechDetector:
         return False
 
 
+class CampaignIndex:
+    """Streaming MinHash/LSH index of recent texts that groups near-duplicates into clusters"""
+
+    # Prime just above 2**32; hash coefficients stay below 2**31 so products fit in uint64
+    PRIME = 4294967311
+
+    def __init__(self, num_perm=CAMPAIGN_NUM_PERM, bands=CAMPAIGN_BANDS,
+                 similarity=CAMPAIGN_SIMILARITY, window_seconds=CAMPAIGN_WINDOW_SECONDS,
+                 max_documents=CAMPAIGN_MAX_DOCUMENTS, shingle_size=5):
+        rng = np.random.RandomState(42)
+        self.perm_a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.perm_b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.rows_per_band = num_perm // bands
+        self.bands = bands
+        self.similarity = similarity
+        self.window_seconds = window_seconds
+        self.max_documents = max_documents
+        self.shingle_size = shingle_size
+        self.buckets = [{} for _ in range(bands)]
+        # doc_id -> (timestamp, signature, band_keys, cluster_id, user_id), oldest first
+        self.documents = OrderedDict()
+        self.clusters = {}
+        self.next_doc_id = 1
+        self.next_cluster_id = 1
+        self.lock = Lock()
+
+    def _signature(self, text):
+        """MinHash signature over character shingles, or None for texts too short to judge"""
+        tokens = analyze_text(text).tokens
+        if len(tokens) < CAMPAIGN_MIN_TOKENS:
+            return None
+        # Character shingles keep small word edits from breaking the match
+        normalized = ' '.join(tokens)
+        shingles = {normalized[i:i + self.shingle_size]
+                    for i in range(len(normalized) - self.shingle_size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (self.perm_a[:, None] * hashes[None, :] + self.perm_b[:, None]) % self.PRIME
+        return permuted.min(axis=1)
+
+    def _remove(self, doc_id):
+        _, _, band_keys, cluster_id, user_id = self.documents.pop(doc_id)
+        for band, key in enumerate(band_keys):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[band][key]
+        cluster = self.clusters[cluster_id]
+        cluster['size'] -= 1
+        if user_id is not None:
+            cluster['users'][user_id] -= 1
+            if cluster['users'][user_id] <= 0:
+                del cluster['users'][user_id]
+        if cluster['size'] <= 0:
+            del self.clusters[cluster_id]
+
+    def _evict(self, now):
+        """Drop documents outside the time window or beyond the size bound"""
+        cutoff = now - self.window_seconds
+        while self.documents:
+            doc_id, document = next(iter(self.documents.items()))
+            if document[0] >= cutoff and len(self.documents) < self.max_documents:
+                break
+            self._remove(doc_id)
+
+    def observe(self, text, user_id=None):
+        """Index a text and return its near-duplicate cluster, or None if it is too short"""
+        signature = self._signature(text)
+        if signature is None:
+            return None
+        band_keys = [signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+                     for band in range(self.bands)]
+
+        with self.lock:
+            now = time.time()
+            self._evict(now)
+
+            # Candidates share at least one LSH band; verify a bounded number of them
+            candidates = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(self.buckets[band].get(key, ()))
+            cluster_id = None
+            similarity = 0.0
+            for doc_id in list(candidates)[:CAMPAIGN_MAX_CANDIDATES]:
+                estimate = float(np.mean(self.documents[doc_id][1] == signature))
+                if estimate >= self.similarity:
+                    cluster_id, similarity = self.documents[doc_id][3], estimate
+                    break
+
+            if cluster_id is None:
+                cluster_id = self.next_cluster_id
+                self.next_cluster_id += 1
+                self.clusters[cluster_id] = {'size': 0, 'users': Counter()}
+
+            doc_id = self.next_doc_id
+            self.next_doc_id += 1
+            self.documents[doc_id] = (now, signature, band_keys, cluster_id, user_id)
+            for band, key in enumerate(band_keys):
+                self.buckets[band].setdefault(key, set()).add(doc_id)
+            cluster = self.clusters[cluster_id]
+            cluster['size'] += 1
+            if user_id is not None:
+                cluster['users'][user_id] += 1
+
+            return {
+                'cluster_id': cluster_id,
+                'cluster_size': cluster['size'],
+                'accounts': len(cluster['users']),
+                'similarity': similarity
+            }
+
+    def stats(self):
+        """Current index occupancy"""
+        with self.lock:
+            return {
+                'documents': len(self.documents),
+                'clusters': len(self.clusters),
+                'campaigns': sum(1 for cluster in self.clusters.values()
+                                 if cluster['size'] >= CAMPAIGN_MIN_CLUSTER_SIZE),
+                'window_seconds': self.window_seconds
+            }
+
+
+class SlidingWindowCounter:
+    """Per-severity counts over a sliding window, kept in fixed-width time buckets"""
+
+    def __init__(self, window_seconds, bucket_seconds, buckets=None):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.buckets = deque()
+        self.totals = Counter()
+        for bucket_start, counts in buckets or []:
+            self.buckets.append((bucket_start, Counter(counts)))
+            self.totals.update(counts)
+
+    def _expire(self, now):
+        """Drop buckets that have slid out of the window"""
+        cutoff = now - self.window_seconds
+        while self.buckets and self.buckets[0][0] + self.bucket_seconds <= cutoff:
+            _, counts = self.buckets.popleft()
+            self.totals.subtract(counts)
+
+    def add(self, now, severity):
+        """Count one event at time now"""
+        self._expire(now)
+        bucket_start = now - now % self.bucket_seconds
+        if not self.buckets or self.buckets[-1][0] != bucket_start:
+            self.buckets.append((bucket_start, Counter()))
+        self.buckets[-1][1][severity] += 1
+        self.totals[severity] += 1
+
+    def counts(self, now):
+        """Current per-severity totals"""
+        self._expire(now)
+        return {severity: count for severity, count in self.totals.items() if count > 0}
+
+    def to_state(self):
+        """JSON-serializable bucket list for checkpoints"""
+        return [[bucket_start, dict(counts)] for bucket_start, counts in self.buckets]
+
+
+class OffenderTracker:
+    """Incremental per-user offense counters over the last hour, day and week"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # user_id -> {'windows': {name: SlidingWindowCounter}, 'last': timestamp}, least recent first
+        self.users = OrderedDict()
+        self.dirty = set()
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+
+    def _new_windows(self, state=None):
+        """Fresh (or checkpoint-restored) counters for every window"""
+        state = state or {}
+        return {name: SlidingWindowCounter(window, bucket, state.get(name))
+                for name, window, bucket in OFFENDER_WINDOWS}
+
+    def _summary(self, windows, now):
+        """Window counts, weighted score and repeat-offender verdict"""
+        counts = {name: windows[name].counts(now) for name, _, _ in OFFENDER_WINDOWS}
+        score = sum(
+            OFFENDER_WINDOW_WEIGHTS[name] * OFFENDER_SEVERITY_WEIGHTS.get(severity, 0.0) * count
+            for name, by_severity in counts.items()
+            for severity, count in by_severity.items()
+        )
+        return {
+            'counts': counts,
+            'score': round(score, 3),
+            'repeat_offender': score >= REPEAT_OFFENDER_SCORE
+        }
+
+    def record(self, user_id, severity):
+        """Count one offense (if severity is not 'none') and return the user's summary"""
+        user_key = str(user_id)
+        now = time.time()
+        with self.lock:
+            entry = self.users.get(user_key)
+            if severity != 'none':
+                if entry is None:
+                    entry = {'windows': self._new_windows(), 'last': now}
+                    self.users[user_key] = entry
+                for counter in entry['windows'].values():
+                    counter.add(now, severity)
+                entry['last'] = now
+                self.users.move_to_end(user_key)
+                self.dirty.add(user_key)
+                self._evict(now)
+            if entry is None:
+                return self._summary(self._new_windows(), now)
+            return self._summary(entry['windows'], now)
+
+    def _evict(self, now):
+        """Forget users with no offense inside the longest window, and cap the user count"""
+        longest = max(window for _, window, _ in OFFENDER_WINDOWS)
+        while self.users:
+            user_key, entry = next(iter(self.users.items()))
+            if entry['last'] >= now - longest and len(self.users) <= OFFENDER_MAX_USERS:
+                break
+            del self.users[user_key]
+            self.dirty.add(user_key)
+
+    def load(self):
+        """Restore counters from the last checkpoint"""
+        longest = max(window for _, window, _ in OFFENDER_WINDOWS)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT user_id, state, last_offense_at FROM offender_counters
+            WHERE last_offense_at >= ?
+            ORDER BY last_offense_at
+        ''', (time.time() - longest,))
+        with self.lock:
+            for user_key, state, last in cursor.fetchall():
+                self.users[user_key] = {'windows': self._new_windows(json.loads(state)), 'last': last}
+        conn.close()
+        logger.info(f"Loaded offense counters for {len(self.users)} users")
+
+    def checkpoint(self):
+        """Persist counters of users changed since the previous checkpoint"""
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            upserts = []
+            deletes = []
+            for user_key in dirty:
+                entry = self.users.get(user_key)
+                if entry is None:
+                    deletes.append((user_key,))
+                else:
+                    state = {name: counter.to_state() for name, counter in entry['windows'].items()}
+                    upserts.append((user_key, json.dumps(state), entry['last']))
+        if not dirty:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO offender_counters (user_id, state, last_offense_at)
+                VALUES (?, ?, ?)
+            ''', upserts)
+            cursor.executemany('DELETE FROM offender_counters WHERE user_id = ?', deletes)
+            conn.commit()
+            conn.close()
+        except Exception:
+            with self.lock:
+                self.dirty.update(dirty)
+            raise
+
+    def start(self):
+        """Checkpoint periodically on a background thread"""
+        def run():
+            while not self.stop_event.wait(OFFENDER_CHECKPOINT_SECONDS):
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Offender checkpoint failed: {e}")
+        self.thread = Thread(target=run, name='offender-checkpoint', daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Stop the checkpoint thread and write a final checkpoint"""
+        self.stop_event.set()
+        try:
+            self.checkpoint()
+        except Exception as e:
+            logger.error(f"Final offender checkpoint failed: {e}")
+
+
+class LiveTrafficGate:
+    """Tracks in-flight live predictions so background work can wait for quiet periods"""
+
+    def __init__(self):
+        self.condition = Condition()
+        self.active = 0
+        self.last_finished = 0.0
+
+    def enter(self):
+        """Mark a live request as started"""
+        with self.condition:
+            self.active += 1
+
+    def exit(self):
+        """Mark a live request as finished"""
+        with self.condition:
+            self.active -= 1
+            self.last_finished = time.monotonic()
+            self.condition.notify_all()
+
+    def wait_until_idle(self, quiet_seconds, stop_event):
+        """Block until no request has run for quiet_seconds; False if stop_event was set"""
+        with self.condition:
+            while not stop_event.is_set():
+                if self.active:
+                    self.condition.wait(0.5)
+                    continue
+                remaining = self.last_finished + quiet_seconds - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self.condition.wait(remaining)
+        return False
+
+
+class RescoreJob:
+    """Resumable, throttled re-scoring of stored texts with the serving model"""
+
+    def __init__(self, db_path, model_version, job_id=None, cursor=None, stats=None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.db_path = db_path
+        self.model_version = model_version
+        self.cursor = cursor or {table: 0 for table in RESCORE_TABLES}
+        self.stats = stats or {table: self._empty_stats() for table in RESCORE_TABLES}
+        self.status = 'pending'
+        self.table = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.stop_reason = None
+        self.stop_event = Event()
+        self.thread = Thread(target=self._run, name=f"rescore-{self.job_id}", daemon=True)
+
+    @staticmethod
+    def _empty_stats():
+        return {'scanned': 0, 'updated': 0, 'to_abusive': 0, 'to_clean': 0, 'severity_changed': 0}
+
+    @classmethod
+    def load_unfinished(cls, db_path, model_version, statuses=('running', 'paused')):
+        """The newest checkpointed job for model_version that did not finish, if any"""
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT job_id, cursor, stats FROM rescore_jobs
+            WHERE model_version = ? AND status IN ({', '.join('?' * len(statuses))})
+            ORDER BY started_at DESC
+            LIMIT 1
+        ''', (model_version, *statuses))
+        row = cursor.fetchone()
+        conn.close()
+        if row is None:
+            return None
+        job_id, job_cursor, stats = row
+        return cls(db_path, model_version, job_id, json.loads(job_cursor), json.loads(stats))
+
+    def start(self):
+        """Persist the job and run it on its background thread"""
+        self.status = 'running'
+        self.started_at = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO rescore_jobs (job_id, model_version, status, cursor, stats)
+            VALUES (?, ?, 'running', ?, ?)
+            ON CONFLICT (job_id) DO UPDATE SET status = 'running', error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (self.job_id, self.model_version, json.dumps(self.cursor), json.dumps(self.stats)))
+        conn.commit()
+        conn.close()
+        self.thread.start()
+
+    def stop(self, reason):
+        """Stop at the next batch boundary; progress so far stays checkpointed"""
+        self.stop_reason = reason
+        self.stop_event.set()
+
+    def is_active(self):
+        """Whether the job is still pending or running"""
+        return self.status in ('pending', 'running')
+
+    def totals(self):
+        """Stats summed over all tables"""
+        totals = self._empty_stats()
+        for table_stats in self.stats.values():
+            for key, value in table_stats.items():
+                totals[key] += value
+        return totals
+
+    def to_dict(self):
+        """JSON-serializable job status"""
+        return {
+            'job_id': self.job_id,
+            'model_version': self.model_version,
+            'status': self.status,
+            'table': self.table,
+            'cursor': self.cursor,
+            'totals': self.totals(),
+            'tables': self.stats,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def _rescore(self, table, rows):
+        """Score one batch and return the UPDATE parameters for rows whose verdict changed"""
+        stats = self.stats[table]
+        updates = []
+
+        # One snapshot of the serving pair per batch, scored in one pass outside the lock
+        with model_lock:
+            serving = detector.serving_model()
+        predictions = detector.predict_many([row[1] for row in rows], candidate=serving)
+
+        for row, prediction in zip(rows, predictions):
+            row_id, stored = row[0], row[2]
+            old = json.loads(stored) if stored else {}
+            old_severity = row[3] if table == 'abuse_reports' else old.get('severity')
+
+            new = convert_types(prediction)
+            # Campaign membership is not a model output; keep its spam verdict
+            if old.get('is_campaign') and 'spam' not in new['categories']:
+                new['categories'].append('spam')
+                new['is_hate_speech'] = True
+                new['severity'] = detector._calculate_severity(new['categories'], new['confidence'])
+
+            stats['scanned'] += 1
+            flipped = bool(old.get('is_hate_speech')) != new['is_hate_speech']
+            if not flipped and old_severity == new['severity']:
+                continue
+            if flipped:
+                stats['to_abusive' if new['is_hate_speech'] else 'to_clean'] += 1
+            else:
+                stats['severity_changed'] += 1
+
+            # Flags raised by offender history or moderators are never cleared here
+            merged = dict(old, **new)
+            merged['requires_immediate_action'] = bool(
+                old.get('requires_immediate_action') or new['requires_immediate_action'])
+            merged['rescored_model_version'] = self.model_version
+            if table == 'abuse_reports':
+                updates.append((json.dumps(merged), new['severity'],
+                                int(merged['requires_immediate_action']), row_id))
+            else:
+                updates.append((json.dumps(merged), row_id))
+        return updates
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            logger.info(f"Re-scoring job {self.job_id} started for model {self.model_version}")
+
+            for table in RESCORE_TABLES:
+                self.table = table
+                if table == 'abuse_reports':
+                    select = '''
+                        SELECT id, text, prediction, severity FROM abuse_reports
+                        WHERE id > ? ORDER BY id LIMIT ?
+                    '''
+                    update = '''
+                        UPDATE abuse_reports
+                        SET prediction = ?, severity = ?, requires_immediate_action = ?
+                        WHERE id = ?
+                    '''
+                else:
+                    # Only rows stored with a model verdict; imported examples carry none
+                    select = '''
+                        SELECT id, text, prediction FROM training_data
+                        WHERE id > ? AND json_extract(prediction, '$.is_hate_speech') IS NOT NULL
+                        ORDER BY id LIMIT ?
+                    '''
+                    update = 'UPDATE training_data SET prediction = ? WHERE id = ?'
+
+                while True:
+                    if not live_traffic.wait_until_idle(RESCORE_IDLE_SECONDS, self.stop_event):
+                        break
+                    batch_started = time.monotonic()
+                    cursor.execute(select, (self.cursor[table], RESCORE_BATCH_SIZE))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+
+                    updates = self._rescore(table, rows)
+                    self.cursor[table] = rows[-1][0]
+                    self.stats[table]['updated'] += len(updates)
+
+                    # Changed rows and the checkpoint commit together
+                    cursor.executemany(update, updates)
+                    cursor.execute('''
+                        UPDATE rescore_jobs SET cursor = ?, stats = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE job_id = ?
+                    ''', (json.dumps(self.cursor), json.dumps(self.stats), self.job_id))
+                    conn.commit()
+
+                    # Stay under the duty cycle so live requests keep the CPU
+                    busy = time.monotonic() - batch_started
+                    if self.stop_event.wait(busy * (1 / RESCORE_DUTY_CYCLE - 1)):
+                        break
+
+                if self.stop_event.is_set():
+                    break
+
+            self.status = self.stop_reason or 'completed'
+            logger.info(f"Re-scoring job {self.job_id} {self.status}: {self.totals()}")
+
+        except Exception as e:
+            conn.rollback()
+            self.status = 'failed'
+            self.error = str(e)
+            logger.error(f"Re-scoring job {self.job_id} failed: {e}")
+        finally:
+            self.table = None
+            self.finished_at = datetime.now().isoformat()
+            try:
+                conn.execute('''
+                    UPDATE rescore_jobs
+                    SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP,
+                        finished_at = CASE WHEN ? IN ('completed', 'failed', 'superseded')
+                                      THEN CURRENT_TIMESTAMP END
+                    WHERE job_id = ?
+                ''', (self.status, self.error, self.status, self.job_id))
+                conn.commit()
+            finally:
+                conn.close()
+
+
+class ShadowEvaluator:
+    """Scores a sample of live requests with a candidate model on a background thread"""
+
+    def __init__(self, sample_rate=SHADOW_SAMPLE_RATE, queue_size=SHADOW_QUEUE_SIZE):
+        self.sample_rate = sample_rate
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = Lock()
+        self.candidate = None
+        self.stats = None
+        self.thread = None
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'samples': 0, 'dropped': 0, 'errors': 0, 'agreements': 0, 'severity_agreements': 0,
+            'to_abusive': 0, 'to_clean': 0, 'confidence_delta_sum': 0.0,
+            'abs_confidence_delta_sum': 0.0,
+            'serving_latency_ms': deque(maxlen=SHADOW_LATENCY_SAMPLES),
+            'candidate_latency_ms': deque(maxlen=SHADOW_LATENCY_SAMPLES)
+        }
+
+    def load(self, vectorizer, model, metadata, sample_rate=None):
+        """Install a candidate, replacing any previous one and its statistics"""
+        candidate = dict(metadata, vectorizer=vectorizer, model=model)
+        candidate.setdefault('candidate_id', uuid.uuid4().hex[:12])
+        candidate.setdefault('loaded_at', datetime.now().isoformat())
+        with self.lock:
+            self.candidate = candidate
+            self.stats = self._empty_stats()
+            if sample_rate is not None:
+                self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+            if self.thread is None:
+                self.thread = Thread(target=self._run, name='shadow-evaluator', daemon=True)
+                self.thread.start()
+        return candidate['candidate_id']
+
+    def save(self, filepath):
+        """Persist the candidate so a restart keeps evaluating it"""
+        candidate = self.candidate
+        if candidate is None:
+            return
+        with open(filepath, 'wb') as f:
+            pickle.dump(candidate, f)
+
+    def restore(self, filepath):
+        """Reload a persisted candidate, if there is one"""
+        if not os.path.exists(filepath):
+            return False
+        with open(filepath, 'rb') as f:
+            saved = pickle.load(f)
+        vectorizer = saved.pop('vectorizer')
+        model = saved.pop('model')
+        self.load(vectorizer, model, saved)
+        return True
+
+    def submit(self, text, prediction, latency_ms):
+        """Queue a sampled live request for the candidate; never blocks the caller"""
+        candidate = self.candidate
+        if candidate is None or random.random() >= self.sample_rate:
+            return
+        serving = {key: prediction[key] for key in ('is_hate_speech', 'severity', 'confidence')}
+        try:
+            self.queue.put_nowait((candidate['candidate_id'], text, serving, latency_ms))
+        except queue.Full:
+            with self.lock:
+                # Promote or discard may have removed or replaced the candidate meanwhile
+                if self.candidate is candidate:
+                    self.stats['dropped'] += 1
+
+    def take(self):
+        """Remove the candidate and return it with its final summary"""
+        with self.lock:
+            candidate = self.candidate
+            summary = self._summary() if candidate else None
+            self.candidate = None
+            self.stats = None
+        return candidate, summary
+
+    def _run(self):
+        while True:
+            candidate_id, text, serving, serving_latency = self.queue.get()
+            candidate = self.candidate
+            if candidate is None or candidate['candidate_id'] != candidate_id:
+                continue
+            try:
+                started = time.perf_counter()
+                result = detector.predict(text, candidate)
+                candidate_latency = (time.perf_counter() - started) * 1000
+            except Exception as e:
+                logger.error(f"Shadow prediction error: {e}")
+                with self.lock:
+                    if self.candidate is candidate:
+                        self.stats['errors'] += 1
+                continue
+
+            with self.lock:
+                if self.candidate is not candidate:
+                    continue
+                stats = self.stats
+                stats['samples'] += 1
+                if bool(result['is_hate_speech']) == bool(serving['is_hate_speech']):
+                    stats['agreements'] += 1
+                elif result['is_hate_speech']:
+                    stats['to_abusive'] += 1
+                else:
+                    stats['to_clean'] += 1
+                if result['severity'] == serving['severity']:
+                    stats['severity_agreements'] += 1
+                delta = float(result['confidence']) - float(serving['confidence'])
+                stats['confidence_delta_sum'] += delta
+                stats['abs_confidence_delta_sum'] += abs(delta)
+                stats['serving_latency_ms'].append(serving_latency)
+                stats['candidate_latency_ms'].append(candidate_latency)
+
+    def _summary(self):
+        stats = self.stats
+        samples = stats['samples']
+
+        def latency(values):
+            if not values:
+                return None
+            p50, p95 = np.percentile(np.fromiter(values, dtype=float), [50, 95])
+            return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3)}
+
+        return {
+            'samples': samples,
+            'dropped': stats['dropped'],
+            'errors': stats['errors'],
+            'agreement': round(stats['agreements'] / samples, 4) if samples else None,
+            'severity_agreement': round(stats['severity_agreements'] / samples, 4) if samples else None,
+            'flips': {'to_abusive': stats['to_abusive'], 'to_clean': stats['to_clean']},
+            'mean_confidence_delta': round(stats['confidence_delta_sum'] / samples, 4) if samples else None,
+            'mean_abs_confidence_delta': round(stats['abs_confidence_delta_sum'] / samples, 4) if samples else None,
+            'latency_ms': {
+                'serving': latency(stats['serving_latency_ms']),
+                'candidate': latency(stats['candidate_latency_ms'])
+            }
+        }
+
+    def status(self):
+        """JSON-serializable candidate metadata and evaluation summary"""
+        with self.lock:
+            candidate = self.candidate
+            if candidate is None:
+                return {'candidate': None, 'sample_rate': self.sample_rate}
+            return {
+                'candidate': {key: value for key, value in candidate.items()
+                              if key not in ('vectorizer', 'model')},
+                'sample_rate': self.sample_rate,
+                'queued': self.queue.qsize(),
+                'evaluation': self._summary()
+            }
+
+
+class HyperparameterSearchJob:
+    """Cross-validated search over the retraining corpus, then a full refit of the best settings"""
+
+    def __init__(self, options, as_candidate=False, sample_rate=None):
+        self.job_id = uuid.uuid4().hex
+        self.options = options
+        self.as_candidate = as_candidate
+        self.sample_rate = sample_rate
+        self.status = 'pending'
+        self.phase = None
+        self.tasks_done = 0
+        self.total_tasks = 0
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self.cancel_event = Event()
+        self.thread = Thread(target=self._run, name=f"hyperparameter-search-{self.job_id}", daemon=True)
+
+    def start(self):
+        """Run the job on its background thread"""
+        self.status = 'running'
+        self.started_at = datetime.now().isoformat()
+        self.thread.start()
+
+    def cancel(self):
+        """Stop the search process; a refit in progress is discarded when it ends"""
+        self.cancel_event.set()
+        process = self.process
+        if process is not None and process.poll() is None:
+            # SIGTERM makes the search shut its worker pool down before exiting
+            process.terminate()
+
+    def is_active(self):
+        """Whether the job is still pending or running"""
+        return self.status in ('pending', 'running')
+
+    def to_dict(self):
+        """JSON-serializable job status"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'phase': self.phase,
+            'options': self.options,
+            'candidate': self.as_candidate,
+            'tasks_done': self.tasks_done,
+            'total_tasks': self.total_tasks,
+            'progress': round(self.tasks_done / self.total_tasks, 4) if self.total_tasks else 0.0,
+            'result': self.result,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def _search(self):
+        """Run hyperparameter_search.py over the cached corpus and return its summary"""
+        options = self.options
+        command = [sys.executable, HYPERPARAMETER_SEARCH_SCRIPT, '--json',
+                   '--cache-dir', os.path.abspath(CORPUS_CACHE_DIR),
+                   '--mode', options['mode'], '--iterations', str(options['iterations']),
+                   '--folds', str(options['folds']), '--latency-weight', str(options['latency_weight']),
+                   '--seed', str(options['seed'])]
+        if options['space'] is not None:
+            command += ['--space', json.dumps(options['space'])]
+        if options['workers']:
+            command += ['--workers', str(options['workers'])]
+
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        if self.cancel_event.is_set():
+            self.process.terminate()
+        summary = error = None
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if 'progress' in message:
+                self.tasks_done = message['progress']['done']
+                self.total_tasks = message['progress']['total']
+            summary = message.get('result', summary)
+            error = message.get('error', error)
+        returncode = self.process.wait()
+
+        if self.cancel_event.is_set():
+            raise SearchCancelled()
+        if summary is None:
+            raise ValueError(error or f"Search process exited with status {returncode}")
+        return summary
+
+    def _run(self):
+        try:
+            self.phase = 'building_corpus'
+            corpus = build_corpus([TrainingDataSource(DB_PATH)], CORPUS_CACHE_DIR)
+            if len(corpus) < 50:
+                raise ValueError('Insufficient training data (minimum 50 samples required)')
+
+            self.phase = 'searching'
+            summary = self._search()
+            best = summary['best']
+            logger.info(f"Hyperparameter search {self.job_id} evaluated {summary['settings']} settings "
+                        f"in {summary['elapsed_seconds']}s; best: {best}")
+
+            # Refit the winner on the whole corpus with the usual holdout split
+            self.phase = 'refitting'
+            vectorizer_params, model_params = decode_settings(best)
+            training_result = detector.train(corpus.texts(), np.asarray(corpus.labels), preprocessed=True,
+                                             publish=False, vectorizer_params=vectorizer_params,
+                                             model_params=model_params)
+            if not training_result['success']:
+                raise ValueError(training_result['error'])
+            if self.cancel_event.is_set():
+                raise SearchCancelled()
+
+            self.phase = 'publishing'
+            search = {
+                'job_id': self.job_id,
+                'mode': self.options['mode'],
+                'folds': summary['folds'],
+                'settings': summary['settings'],
+                'workers': summary['workers'],
+                'latency_weight': summary['latency_weight'],
+                'elapsed_seconds': summary['elapsed_seconds'],
+                'best': best,
+                'leaderboard': summary['results'][:HYPERPARAMETER_SEARCH_LEADERBOARD]
+            }
+            self.result = dict(search, test_accuracy=float(training_result['test_accuracy']),
+                               training_samples=training_result['training_samples'])
+            if self.as_candidate:
+                self.result['candidate_id'] = shadow_evaluator.load(
+                    training_result['vectorizer'], training_result['model'], {
+                        'test_accuracy': float(training_result['test_accuracy']),
+                        'training_samples': training_result['training_samples'],
+                        'params': training_result['params'],
+                        'search': search
+                    }, sample_rate=self.sample_rate)
+                shadow_evaluator.save(SHADOW_CANDIDATE_PATH)
+            else:
+                detector.publish_model(training_result['vectorizer'], training_result['model'])
+                detector.save_model(model_path)
+                model_version, rescore_job = activate_model_version(
+                    training_result['test_accuracy'], training_result['training_samples'],
+                    training_result['params'], search)
+                self.result['model_version'] = model_version
+                self.result['rescore_job_id'] = rescore_job.job_id if rescore_job else None
+
+            self.status = 'completed'
+            logger.info(f"Hyperparameter search {self.job_id} completed: "
+                        f"test accuracy {self.result['test_accuracy']:.3f}")
+
+        except SearchCancelled:
+            self.status = 'cancelled'
+            logger.info(f"Hyperparameter search {self.job_id} cancelled")
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            logger.error(f"Hyperparameter search {self.job_id} failed: {e}")
+        finally:
+            self.phase = None
+            self.finished_at = datetime.now().isoformat()
+
+
 # Initialize the enhanced model
 detector = AdvancedHateSpeechDetector()
 
-# Try to load existing model
+# Existing model, loaded by the background warm-up
 model_path = 'hate_speech_model.pkl'
-detector.load_model(model_path)
+
+# Pick up edits to the pattern files without a restart
+pattern_watcher = PatternWatcher([detector.abuse_patterns])
+pattern_watcher.start()
+
+# Recent posts and comments for campaign detection
+campaign_index = CampaignIndex()
+
+# Repeat-offender counters
+offender_tracker = OffenderTracker(DB_PATH)
+startup.run_phase('offender_counters', offender_tracker.load)
+offender_tracker.start()
+atexit.register(offender_tracker.close)
+
+# Live /predict-hate-speech traffic, which the re-scoring backfill yields to
+live_traffic = LiveTrafficGate()
+
+# Candidate model evaluated in the shadow of the serving model
+shadow_evaluator = ShadowEvaluator()
+
+# Re-scoring backfill jobs, newest last
+rescore_jobs = {}
+rescore_jobs_lock = Lock()
+
+# Hyperparameter search jobs, newest last
+search_jobs = {}
+search_jobs_lock = Lock()
+
+
+def current_model_version():
+    """Id of the latest model_metrics row, which identifies the serving model"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM model_metrics')
+    version = cursor.fetchone()[0]
+    conn.close()
+    return version
+
+
+def start_rescore_job(model_version):
+    """Run (or resume) the backfill for model_version, superseding jobs for older models"""
+    with rescore_jobs_lock:
+        for job in rescore_jobs.values():
+            if job.is_active():
+                if job.model_version == model_version:
+                    return job
+                job.stop('superseded')
+
+        job = RescoreJob.load_unfinished(DB_PATH, model_version) or RescoreJob(DB_PATH, model_version)
+        rescore_jobs[job.job_id] = job
+        while len(rescore_jobs) > RESCORE_JOB_HISTORY:
+            rescore_jobs.pop(next(iter(rescore_jobs)))
+        job.start()
+        return job
+
+
+# Long-lived structures reported by /memory-stats
+memory_monitor = MemoryMonitor({
+    'vectorizer.vocabulary_': lambda: getattr(detector.vectorizer, 'vocabulary_', None),
+    'vectorizer.stop_words_': lambda: getattr(detector.vectorizer, 'stop_words_', None),
+    'vectorizer.idf_': lambda: getattr(detector.vectorizer, 'idf_', None),
+    'model.coef_': lambda: getattr(detector.model, 'coef_', None),
+    'abuse_patterns': lambda: detector.abuse_patterns.current,
+    'campaign_index': lambda: campaign_index,
+    'offender_tracker': lambda: offender_tracker,
+    'shadow_candidate': lambda: shadow_evaluator.candidate,
+    'rescore_jobs': lambda: rescore_jobs,
+    'search_jobs': lambda: search_jobs,
+}, counts={
+    'vectorizer.vocabulary_': lambda: len(getattr(detector.vectorizer, 'vocabulary_', ())),
+    'vectorizer.stop_words_': lambda: len(getattr(detector.vectorizer, 'stop_words_', ())),
+    'campaign_index': lambda: len(campaign_index.documents),
+    'offender_tracker': lambda: len(offender_tracker.users),
+})
+memory_monitor.start_logging()
+
+
+def restore_shadow_candidate():
+    """Reload a candidate model that was under evaluation when the server stopped"""
+    if shadow_evaluator.restore(SHADOW_CANDIDATE_PATH):
+        logger.info("Shadow candidate model restored")
+
+
+def warm_up_detector():
+    """Score synthetic texts so the model, vectorizer and regexes (or the scoring pool) are hot for real traffic"""
+    for text in WARMUP_TEXTS:
+        predict_text(text)
+
+
+def resume_interrupted_rescore():
+    """Continue a backfill that was running when the server last stopped"""
+    model_version = current_model_version()
+    if detector.is_trained and RescoreJob.load_unfinished(DB_PATH, model_version, ('running',)):
+        job = start_rescore_job(model_version)
+        logger.info(f"Resumed re-scoring job {job.job_id}")
 
 
 # Add a health check endpoint
@@ -419,8 +1681,13 @@ def health_check():
         'timestamp': datetime.now().isoformat(),
         'version': '2.0.0',
         'model_trained': detector.is_trained,
+        'ready': startup.is_ready(),
+        'startup': startup.to_dict(),
+        'patterns': {'abuse': detector.abuse_patterns.info()},
+        'scoring_pool': scoring_pool.status(),
         'endpoints': {
             'predict': '/predict-hate-speech',
+            'predict_batch': '/predict-batch',
             'report_abuse': '/report-abuse',
             'store_data': '/store-training-data',
             'retrain': '/retrain-model',
@@ -429,6 +1696,26 @@ def health_check():
     })
 
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    return startup.ready_response()
+
+
+@app.route('/reload-patterns', methods=['POST'])
+@admin_only
+def reload_patterns():
+    """Validate and activate edited pattern files now instead of at the next poll"""
+    try:
+        reloaded = detector.abuse_patterns.reload(force=True)
+        info = detector.abuse_patterns.info()
+        status = 400 if info['last_error'] else 200
+        return jsonify({'reloaded': reloaded, 'patterns': {'abuse': info}}), status
+    except Exception as e:
+        logger.error(f"Pattern reload error: {e}")
+        return jsonify({'error': 'Pattern reload failed'}), 500
+
+
 def convert_types(obj):
     import numpy as np
     if isinstance(obj, dict):
@@ -442,12 +1729,117 @@ def convert_types(obj):
     return str(obj)
 
 
+def is_degraded():
+    """Whether predictions are pattern-only because warm-up has not loaded the model yet"""
+    return not startup.is_ready() and not detector.is_trained
+
+
+def predict_text(text):
+    """
+    (prediction, latency_ms) for text (str or AnalyzedText) from the serving model
+    The scoring pool works on a snapshot of the model, so model_lock is held only
+    to take it; in-process scoring holds the lock as before. Until warm-up loads
+    the model, predictions come from the patterns and are flagged degraded.
+    """
+    degraded = is_degraded()
+    if scoring_pool.is_running():
+        with model_lock:
+            serving = detector.serving_model()
+        started = time.perf_counter()
+        prediction = detector.predict(text, serving, pool=scoring_pool)
+    else:
+        with model_lock:
+            started = time.perf_counter()
+            prediction = detector.predict(text)
+    latency_ms = (time.perf_counter() - started) * 1000
+    if degraded:
+        prediction['degraded'] = True
+    return prediction, latency_ms
+
+
+def apply_campaign_result(prediction, campaign):
+    """Attach near-duplicate cluster info to a prediction and flag large clusters as spam"""
+    prediction['campaign_cluster_id'] = campaign['cluster_id'] if campaign else None
+    prediction['campaign_cluster_size'] = campaign['cluster_size'] if campaign else 0
+    prediction['campaign_accounts'] = campaign['accounts'] if campaign else 0
+    prediction['is_campaign'] = bool(campaign and campaign['cluster_size'] >= CAMPAIGN_MIN_CLUSTER_SIZE)
+
+    if prediction['is_campaign'] and 'spam' not in prediction['categories']:
+        prediction['categories'].append('spam')
+        prediction['is_hate_speech'] = True
+        prediction['severity'] = detector._calculate_severity(
+            prediction['categories'], prediction['confidence'])
+    return prediction
+
+
+def apply_offender_history(prediction, user_id):
+    """Count this result against the user and escalate repeat offenders"""
+    if user_id is None:
+        prediction['offender_history'] = None
+        return prediction
+    history = offender_tracker.record(user_id, prediction['severity'])
+    prediction['offender_history'] = history
+    if history['repeat_offender']:
+        prediction['requires_immediate_action'] = True
+    return prediction
+
+
+def record_abuse_report(cursor, text, user_id, reported_user_id, prediction):
+    """
+    Insert a report, or fold it into the open (pending or escalated) report with the same content hash
+    text may be the request's AnalyzedText; returns (report_id, occurrence_count)
+    """
+    analysis = analyze_text(text)
+    text = analysis.text
+    content_hash = analysis.fingerprint
+    dedup_key = content_hash
+    if REPORT_DEDUP_BY_REPORTED_USER and reported_user_id is not None:
+        dedup_key = f"{content_hash}:{reported_user_id}"
+
+    # Repeats only touch the counters; text and prediction are written once per cluster
+    cursor.execute('''
+        INSERT INTO abuse_reports (
+            text, user_id, reported_user_id, prediction, severity, requires_immediate_action,
+            content_hash, dedup_key, occurrence_count, last_seen_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (dedup_key) WHERE status IN ('pending', 'escalated') DO UPDATE SET
+            occurrence_count = occurrence_count + 1,
+            last_seen_at = CURRENT_TIMESTAMP,
+            requires_immediate_action = MAX(requires_immediate_action, excluded.requires_immediate_action)
+    ''', (
+        text,
+        user_id,
+        reported_user_id,
+        json.dumps(prediction),
+        prediction['severity'],
+        int(prediction['requires_immediate_action']),
+        content_hash,
+        dedup_key
+    ))
+
+    cursor.execute('''
+        SELECT id, occurrence_count FROM abuse_reports
+        WHERE dedup_key = ? AND status IN ('pending', 'escalated')
+    ''', (dedup_key,))
+    report_id, occurrence_count = cursor.fetchone()
+
+    if user_id is not None:
+        cursor.execute('''
+            INSERT OR IGNORE INTO abuse_report_reporters (report_id, user_id)
+            VALUES (?, ?)
+        ''', (report_id, user_id))
+
+    return report_id, occurrence_count
+
+
 @app.route('/predict-hate-speech', methods=['POST'])
 def predict_hate_speech():
     """
     Enhanced endpoint for hate speech prediction
     Expected input: {"text": "content to analyze", "userId": optional}
     Returns: Enhanced prediction with severity and action requirements
+    (pattern-only and flagged degraded until warm-up loads the model)
     """
     try:
         data = request.get_json()
@@ -456,10 +1848,28 @@ def predict_hate_speech():
 
         if not text:
             return jsonify({'error': 'No text provided'}), 400
+        if len(text) > MAX_INPUT_CHARS:
+            return jsonify({'error': f'Text exceeds {MAX_INPUT_CHARS} characters'}), 413
+
+        # Normalized once; scoring, campaign detection and the report share it
+        analysis = AnalyzedText(text)
 
         # Get prediction from enhanced model
-        with model_lock:
-            prediction = detector.predict(text)
+        live_traffic.enter()
+        try:
+            prediction, latency_ms = predict_text(analysis)
+        finally:
+            live_traffic.exit()
+
+        # A sample of requests is re-scored by the candidate model off the request path
+        if not prediction.get('degraded'):
+            shadow_evaluator.submit(analysis, prediction, latency_ms)
+
+        # Near-duplicate campaign detection across recent posts and comments
+        apply_campaign_result(prediction, campaign_index.observe(analysis, user_id))
+
+        # Sliding-window offense counts for the author
+        apply_offender_history(prediction, user_id)
 
         # Convert all values to standard types
         prediction = convert_types(prediction)
@@ -470,22 +1880,18 @@ def predict_hate_speech():
                 conn = sqlite3.connect(DB_PATH)
                 cursor = conn.cursor()
 
-                cursor.execute('''
-                    INSERT INTO abuse_reports (text, user_id, prediction, severity, requires_immediate_action)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    text,
-                    user_id,
-                    json.dumps(prediction),
-                    prediction['severity'],
-                    int(prediction['requires_immediate_action'])
-                ))
+                report_id, occurrence_count = record_abuse_report(
+                    cursor, analysis, user_id, None, prediction)
 
                 conn.commit()
                 conn.close()
 
-                logger.warning(
-                    f"Automatic abuse report created for user {user_id}")
+                if occurrence_count == 1:
+                    logger.warning(
+                        f"Automatic abuse report created for user {user_id}")
+                else:
+                    logger.debug(
+                        f"Repeat of abuse report {report_id} ({occurrence_count} occurrences)")
 
             except Exception as e:
                 logger.error(f"Auto-report creation error: {e}")
@@ -499,6 +1905,51 @@ def predict_hate_speech():
         return jsonify({'error': 'Prediction failed', 'details': str(e)}), 500
 
 
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Score many texts in one call, spread over the scoring pool when it runs
+    Expected input: {"texts": ["content to analyze", ...]}
+    Pure scoring: no campaign tracking, offender history or automatic reports
+    Until warm-up loads the model, predictions are pattern-only and flagged degraded
+    """
+    try:
+        data = request.get_json()
+        texts = data.get('texts')
+
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts must be a non-empty list of strings'}), 400
+        if len(texts) > PREDICT_BATCH_MAX_TEXTS:
+            return jsonify({'error': f'At most {PREDICT_BATCH_MAX_TEXTS} texts per batch'}), 413
+        if any(len(text) > MAX_INPUT_CHARS for text in texts):
+            return jsonify({'error': f'Text exceeds {MAX_INPUT_CHARS} characters'}), 413
+
+        degraded = is_degraded()
+        live_traffic.enter()
+        try:
+            if scoring_pool.is_running():
+                with model_lock:
+                    serving = detector.serving_model()
+                predictions = detector.predict_many(texts, serving, pool=scoring_pool)
+            else:
+                with model_lock:
+                    predictions = detector.predict_many(texts)
+        finally:
+            live_traffic.exit()
+        if degraded:
+            for prediction in predictions:
+                prediction['degraded'] = True
+
+        return jsonify({
+            'predictions': [convert_types(prediction) for prediction in predictions],
+            'count': len(predictions)
+        })
+
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        return jsonify({'error': 'Batch prediction failed', 'details': str(e)}), 500
+
+
 @app.route('/report-abuse', methods=['POST'])
 def report_abuse():
     """
@@ -519,28 +1970,23 @@ def report_abuse():
 
         if not text:
             return jsonify({'error': 'No text provided'}), 400
+        if len(text) > MAX_INPUT_CHARS:
+            return jsonify({'error': f'Text exceeds {MAX_INPUT_CHARS} characters'}), 413
 
-        # Get prediction for the reported content
-        with model_lock:
-            prediction = detector.predict(text)
+        # Get prediction for the reported content, normalizing it once for scoring and the report
+        analysis = AnalyzedText(text)
+        prediction = convert_types(predict_text(analysis)[0])
+
+        # Sliding-window offense counts for the reported user
+        apply_offender_history(prediction, reported_user_id)
 
         # Store abuse report
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO abuse_reports (text, user_id, reported_user_id, prediction, severity, requires_immediate_action)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            text,
-            user_id,
-            reported_user_id,
-            json.dumps(prediction),
-            prediction['severity'],
-            prediction['requires_immediate_action']
-        ))
+        report_id, occurrence_count = record_abuse_report(
+            cursor, analysis, user_id, reported_user_id, prediction)
 
-        report_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
@@ -549,6 +1995,8 @@ def report_abuse():
         return jsonify({
             'status': 'success',
             'report_id': report_id,
+            'occurrence_count': occurrence_count,
+            'duplicate': occurrence_count > 1,
             'prediction': prediction,
             'message': 'Abuse report submitted successfully'
         })
@@ -577,20 +2025,23 @@ def store_training_data():
         cursor = conn.cursor()
 
         cursor.execute('''
-            INSERT INTO training_data (text, timestamp, user_id, prediction, human_label)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO training_data (text, timestamp, user_id, prediction, human_label, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
         ''', (
             data.get('text'),
             data.get('timestamp'),
             data.get('userId'),
             json.dumps(data.get('prediction', {})),
-            data.get('humanLabel')
+            data.get('humanLabel'),
+            content_fingerprint(data.get('text') or '')
         ))
+        row_id = cursor.lastrowid
 
         conn.commit()
         conn.close()
 
-        logger.info(f"Training data stored: {data.get('text')}")
+        # Message text stays out of INFO logs
+        logger.info(f"Training data stored as row {row_id}")
 
         return jsonify({'status': 'success'})
 
@@ -599,71 +2050,415 @@ def store_training_data():
         return jsonify({'error': 'Failed to store data'}), 500
 
 
+@app.route('/ingest-training-data', methods=['POST'])
+def ingest_training_data():
+    """
+    Bulk load labeled examples into training_data, skipping texts already stored
+    JSON body: {"items": [{"text": str, "humanLabel": str, "userId": int,
+                           "timestamp": "ISO date", "prediction": {}}]}
+    CSV body (Content-Type: text/csv), streamed; columns come from ?preset=labeled_data|foul_language
+    or ?textColumn=...&categoryColumn=...; any category except not_hate_speech is labeled hate_speech
+    """
+    started = time.perf_counter()
+    try:
+        if request.mimetype == 'text/csv':
+            preset = request.args.get('preset')
+            if preset is not None and preset not in CSV_PRESETS:
+                return jsonify({'error': f"preset must be one of {sorted(CSV_PRESETS)}"}), 400
+            options = dict(CSV_PRESETS[preset]) if preset else {}
+            options['text_column'] = request.args.get('textColumn', options.get('text_column', 'text'))
+            options['category_column'] = request.args.get(
+                'categoryColumn', options.get('category_column', 'category'))
+            stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+            rows = csv_training_rows(CsvSource('upload', name='upload', stream=stream, **options))
+        else:
+            data = request.get_json(silent=True) or {}
+            items = data.get('items')
+            if not isinstance(items, list):
+                return jsonify({'error': 'items must be a list'}), 400
+            timestamp = datetime.now().isoformat()
+            rows = (
+                (item.get('text'), item.get('timestamp') or timestamp, item.get('userId'),
+                 json.dumps(item.get('prediction', {})), item.get('humanLabel'))
+                for item in items if isinstance(item, dict)
+            )
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            stats = ingest_rows(conn, rows)
+        finally:
+            conn.close()
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Ingested {stats['inserted']} training rows "
+            f"({stats['duplicates']} duplicates, {stats['skipped']} skipped) in {stats['seconds']}s")
+
+        return jsonify({'status': 'success', **stats})
+
+    except UnicodeDecodeError:
+        return jsonify({'error': 'CSV body must be UTF-8'}), 400
+    except Exception as e:
+        logger.error(f"Ingestion error: {e}")
+        return jsonify({'error': 'Failed to ingest data'}), 500
+
+
+def activate_model_version(test_accuracy, training_samples, params=None, search=None):
+    """
+    Record metrics for a newly published model and start its re-scoring backfill
+    params are the settings it was trained with; search is the summary of the
+    hyperparameter search that chose them
+    """
+    best = (search or {}).get('best', {})
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO model_metrics (accuracy, training_samples, params, cv_accuracy, cv_accuracy_std,
+                                   latency_ms_per_1k, search)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (test_accuracy, training_samples, json.dumps(params) if params is not None else None,
+          best.get('cv_accuracy'), best.get('cv_accuracy_std'), best.get('latency_ms_per_1k'),
+          json.dumps(search) if search is not None else None))
+    model_version = cursor.lastrowid
+
+    conn.commit()
+    conn.close()
+
+    # Re-score stored reports and predictions with the new model in the background
+    rescore_job = start_rescore_job(model_version) if RESCORE_AFTER_RETRAIN else None
+    return model_version, rescore_job
+
+
 @app.route('/retrain-model', methods=['POST'])
+@startup.requires_ready
 def retrain_model():
     """
     Endpoint to trigger model retraining with new data
+    Optional input: {"candidate": true, "sampleRate": 0.1} trains a candidate that is
+    shadow-evaluated on live traffic instead of replacing the serving model
     """
     try:
-        # Fetch training data from database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        data = request.get_json(silent=True) or {}
+        as_candidate = bool(data.get('candidate'))
 
-        cursor.execute('''
-            SELECT text, human_label FROM training_data
-            WHERE human_label IS NOT NULL
-        ''')
-
-        training_data = cursor.fetchall()
-        conn.close()
+        # Refresh the cached corpus; only new or edited rows get normalized
+        corpus = build_corpus([TrainingDataSource(DB_PATH)], CORPUS_CACHE_DIR)
 
-        if len(training_data) < 50:  # Minimum data requirement
+        if len(corpus) < 50:  # Minimum data requirement
             return jsonify({'error': 'Insufficient training data (minimum 50 samples required)'}), 400
 
         # Prepare training data
-        texts = [row[0] for row in training_data]
-        labels = [1 if row[1] == 'hate_speech' else 0 for row in training_data]
-
-        # Retrain model
-        with model_lock:
-            training_result = detector.train(texts, labels)
+        texts = corpus.texts()
+        labels = np.asarray(corpus.labels)
 
-        if training_result['success']:
-            # Save the retrained model
-            detector.save_model(model_path)
+        # Retrain model; the serving model keeps answering until the swap
+        training_result = detector.train(texts, labels, preprocessed=True, publish=not as_candidate)
 
-            # Store training metrics
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO model_metrics (accuracy, training_samples)
-                VALUES (?, ?)
-            ''', (
-                training_result['test_accuracy'],
-                training_result['training_samples']
-            ))
+        if not training_result['success']:
+            return jsonify({'error': training_result['error']}), 500
 
-            conn.commit()
-            conn.close()
+        if as_candidate:
+            candidate_id = shadow_evaluator.load(
+                training_result['vectorizer'], training_result['model'], {
+                    'test_accuracy': float(training_result['test_accuracy']),
+                    'training_samples': training_result['training_samples'],
+                    'params': training_result['params']
+                }, sample_rate=data.get('sampleRate'))
+            shadow_evaluator.save(SHADOW_CANDIDATE_PATH)
 
-            logger.info(
-                f"Model retrained successfully with {len(training_data)} samples")
+            logger.info(f"Candidate model {candidate_id} trained with {len(corpus)} samples")
 
             return jsonify({
                 'status': 'success',
-                'message': f'Model retrained with {len(training_data)} samples',
+                'message': f'Candidate model trained with {len(corpus)} samples',
                 'accuracy': training_result['test_accuracy'],
-                'training_samples': training_result['training_samples']
+                'training_samples': training_result['training_samples'],
+                'candidate_id': candidate_id,
+                'status_url': '/shadow'
             })
-        else:
-            return jsonify({'error': training_result['error']}), 500
+
+        # Save the retrained model
+        detector.save_model(model_path)
+
+        # Store training metrics
+        model_version, rescore_job = activate_model_version(
+            training_result['test_accuracy'], training_result['training_samples'], training_result['params'])
+
+        logger.info(
+            f"Model retrained successfully with {len(corpus)} samples")
+
+        return jsonify({
+            'status': 'success',
+            'message': f'Model retrained with {len(corpus)} samples',
+            'accuracy': training_result['test_accuracy'],
+            'training_samples': training_result['training_samples'],
+            'model_version': model_version,
+            'rescore_job_id': rescore_job.job_id if rescore_job else None
+        })
 
     except Exception as e:
         logger.error(f"Retraining error: {e}")
         return jsonify({'error': 'Retraining failed'}), 500
 
 
+@app.route('/hyperparameter-search', methods=['POST'])
+@admin_only
+@startup.requires_ready
+def start_hyperparameter_search():
+    """
+    Start a background cross-validated search over vectorizer and classifier settings
+    Optional input: {"mode": "grid"|"random", "iterations": 20, "folds": 5,
+    "space": {"vectorizer": {...}, "model": {...}}, "latencyWeight": 0.0001,
+    "workers": N, "seed": 42, "candidate": true, "sampleRate": 0.1}. The best
+    settings are refitted and published, or loaded as a shadow candidate.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            options = {
+                'mode': data.get('mode', 'grid'),
+                'iterations': int(data.get('iterations', SEARCH_DEFAULT_ITERATIONS)),
+                'folds': int(data.get('folds', SEARCH_DEFAULT_FOLDS)),
+                'space': data.get('space'),
+                'latency_weight': float(data.get('latencyWeight', SEARCH_LATENCY_WEIGHT)),
+                'workers': int(data.get('workers', 0)),
+                'seed': int(data.get('seed', 42))
+            }
+            if options['mode'] not in SEARCH_MODES:
+                raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+            if options['folds'] < 2 or options['iterations'] < 1 or options['workers'] < 0:
+                raise ValueError('folds must be at least 2, iterations at least 1 and workers not negative')
+            if options['space'] is not None and not isinstance(options['space'], dict):
+                raise ValueError('space must be an object')
+            settings = len(expand_configs(options['space'], options['mode'], options['iterations'],
+                                          options['seed']))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        with search_jobs_lock:
+            if any(job.is_active() for job in search_jobs.values()):
+                return jsonify({'error': 'A hyperparameter search is already running'}), 409
+            job = HyperparameterSearchJob(options, bool(data.get('candidate')), data.get('sampleRate'))
+            search_jobs[job.job_id] = job
+            while len(search_jobs) > HYPERPARAMETER_SEARCH_JOB_HISTORY:
+                search_jobs.pop(next(iter(search_jobs)))
+            job.start()
+
+        return jsonify({
+            'message': 'Hyperparameter search started',
+            'job_id': job.job_id,
+            'settings': settings,
+            'status_url': f"/hyperparameter-search/{job.job_id}"
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Hyperparameter search start error: {e}")
+        return jsonify({'error': 'Failed to start hyperparameter search'}), 500
+
+
+@app.route('/hyperparameter-search/<job_id>', methods=['GET'])
+def get_hyperparameter_search(job_id):
+    """Progress of a hyperparameter search and, once done, its leaderboard and refitted model"""
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Hyperparameter search not found'}), 404
+    return jsonify(convert_types(job.to_dict()))
+
+
+@app.route('/hyperparameter-search/<job_id>/cancel', methods=['POST'])
+@admin_only
+def cancel_hyperparameter_search(job_id):
+    """Cancel a running hyperparameter search"""
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Hyperparameter search not found'}), 404
+    job.cancel()
+    return jsonify(job.to_dict())
+
+
+@app.route('/shadow', methods=['GET'])
+def get_shadow_status():
+    """Candidate model and how it compares with the serving model on sampled live traffic"""
+    return jsonify(convert_types(shadow_evaluator.status()))
+
+
+def finish_shadow_evaluation(decision):
+    """Detach the candidate, record the evaluation outcome and drop its saved copy"""
+    candidate, summary = shadow_evaluator.take()
+    if candidate is None:
+        return None, None
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO shadow_evaluations (candidate_id, decision, samples, agreement, summary)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (candidate['candidate_id'], decision, summary['samples'], summary['agreement'],
+          json.dumps(summary)))
+    conn.commit()
+    conn.close()
+
+    if os.path.exists(SHADOW_CANDIDATE_PATH):
+        os.remove(SHADOW_CANDIDATE_PATH)
+    logger.info(f"Candidate model {candidate['candidate_id']} {decision}: {summary}")
+    return candidate, summary
+
+
+@app.route('/shadow/promote', methods=['POST'])
+@admin_only
+@startup.requires_ready
+def promote_shadow_candidate():
+    """Make the candidate the serving model"""
+    try:
+        candidate, summary = finish_shadow_evaluation('promoted')
+        if candidate is None:
+            return jsonify({'error': 'No candidate model loaded'}), 404
+
+        detector.publish_model(candidate['vectorizer'], candidate['model'])
+        detector.save_model(model_path)
+        model_version, rescore_job = activate_model_version(
+            candidate.get('test_accuracy'), candidate.get('training_samples'), candidate.get('params'),
+            candidate.get('search'))
+
+        return jsonify({
+            'status': 'success',
+            'candidate_id': candidate['candidate_id'],
+            'model_version': model_version,
+            'evaluation': summary,
+            'rescore_job_id': rescore_job.job_id if rescore_job else None
+        })
+
+    except Exception as e:
+        logger.error(f"Candidate promotion error: {e}")
+        return jsonify({'error': 'Failed to promote candidate'}), 500
+
+
+@app.route('/shadow/discard', methods=['POST'])
+@admin_only
+def discard_shadow_candidate():
+    """Drop the candidate and keep the serving model"""
+    try:
+        candidate, summary = finish_shadow_evaluation('discarded')
+        if candidate is None:
+            return jsonify({'error': 'No candidate model loaded'}), 404
+
+        return jsonify({
+            'status': 'success',
+            'candidate_id': candidate['candidate_id'],
+            'evaluation': summary
+        })
+
+    except Exception as e:
+        logger.error(f"Candidate discard error: {e}")
+        return jsonify({'error': 'Failed to discard candidate'}), 500
+
+
+@app.route('/rescore', methods=['POST'])
+@admin_only
+@startup.requires_ready
+def rescore():
+    """
+    Start, or resume from its checkpoint, the re-scoring backfill for the serving model
+    Stored reports and predictions are only rewritten when verdict or severity changed
+    """
+    try:
+        if not detector.is_trained:
+            return jsonify({'error': 'Model is not trained'}), 400
+
+        job = start_rescore_job(current_model_version())
+        return jsonify({
+            'message': 'Re-scoring started',
+            'job_id': job.job_id,
+            'status_url': f"/rescore/{job.job_id}"
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Re-scoring start error: {e}")
+        return jsonify({'error': 'Failed to start re-scoring'}), 500
+
+
+@app.route('/rescore/<job_id>', methods=['GET'])
+def get_rescore_job(job_id):
+    """Progress and flip counts of a re-scoring job"""
+    job = rescore_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Re-scoring job not found'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/rescore/<job_id>/pause', methods=['POST'])
+@admin_only
+def pause_rescore_job(job_id):
+    """Pause a re-scoring job; POST /rescore resumes it from its checkpoint"""
+    job = rescore_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Re-scoring job not found'}), 404
+    if job.is_active():
+        job.stop('paused')
+    return jsonify(job.to_dict())
+
+
+@app.route('/memory-stats', methods=['GET'])
+@admin_only
+def get_memory_stats():
+    """Approximate memory held by the model, indexes and trackers, plus process RSS and growth"""
+    try:
+        report = memory_monitor.report()
+        # Shared model and pattern blocks mapped by the scoring workers
+        report['scoring_pool'] = scoring_pool.status()
+        return jsonify(report)
+    except Exception as e:
+        logger.error(f"Memory stats error: {e}")
+        return jsonify({'error': 'Failed to measure memory'}), 500
+
+
+@app.route('/profiler', methods=['GET'])
+@admin_only
+def get_profiler_status():
+    """Status of the current or last profiling session"""
+    return jsonify({'session': request_profiler.status()})
+
+
+@app.route('/profiler/start', methods=['POST'])
+@admin_only
+def start_profiler():
+    """
+    Profile live requests for a bounded number of requests or seconds
+    Input: {"mode": "sample" | "cprofile", "requests": 500, "seconds": 30, "intervalMs": 5}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        session = request_profiler.start(
+            data.get('mode', 'sample'), data.get('requests'), data.get('seconds'),
+            data.get('intervalMs', PROFILER_DEFAULT_INTERVAL_MS))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'session': session}), 202
+
+
+@app.route('/profiler/stop', methods=['POST'])
+@admin_only
+def stop_profiler():
+    """Stop the running profiling session early"""
+    session = request_profiler.stop()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    return jsonify({'session': session.to_dict()})
+
+
+@app.route('/profiler/download', methods=['GET'])
+@admin_only
+def download_profile():
+    """Folded stacks (sample mode) for flamegraph.pl/speedscope, or a .prof file (cprofile mode)"""
+    exported = request_profiler.export()
+    if exported is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    body, mimetype, filename = exported
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
 @app.route('/model-stats', methods=['GET'])
 def get_model_stats():
     """Get comprehensive model and system statistics"""
@@ -680,16 +2475,16 @@ def get_model_stats():
         labeled_samples = cursor.fetchone()[0]
 
         # Get abuse report stats
-        cursor.execute('SELECT COUNT(*) FROM abuse_reports')
-        total_reports = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(occurrence_count), 0) FROM abuse_reports')
+        total_reports, total_occurrences = cursor.fetchone()
 
         cursor.execute(
             'SELECT COUNT(*) FROM abuse_reports WHERE requires_immediate_action = 1')
         critical_reports = cursor.fetchone()[0]
 
-        cursor.execute(
-            'SELECT COUNT(*) FROM abuse_reports WHERE status = "pending"')
-        pending_reports = cursor.fetchone()[0]
+        cursor.execute('SELECT status, count FROM abuse_report_status_counts WHERE count > 0')
+        status_counts = dict(cursor.fetchall())
+        pending_reports = status_counts.get('pending', 0)
 
         # Get recent model performance
         cursor.execute(
@@ -718,8 +2513,10 @@ def get_model_stats():
             },
             'abuse_reports': {
                 'total_reports': total_reports,
+                'total_occurrences': total_occurrences,
                 'critical_reports': critical_reports,
                 'pending_reports': pending_reports,
+                'status_counts': status_counts,
                 'severity_distribution': severity_distribution
             },
             'detection_capabilities': {
@@ -727,8 +2524,10 @@ def get_model_stats():
                 'pattern_based_detection': True,
                 'ml_based_detection': detector.is_trained,
                 'automatic_reporting': True,
-                'severity_assessment': True
+                'severity_assessment': True,
+                'campaign_detection': True
             },
+            'campaign_index': campaign_index.stats(),
             'endpoints': {
                 'predict': '/predict-hate-speech',
                 'report_abuse': '/report-abuse',
@@ -755,11 +2554,13 @@ def get_pending_reports():
         cursor = conn.cursor()
 
         cursor.execute('''
-            SELECT id, text, user_id, reported_user_id, severity,
-                   requires_immediate_action, created_at
-            FROM abuse_reports
-            WHERE status = "pending"
-            ORDER BY requires_immediate_action DESC, created_at DESC
+            SELECT r.id, r.text, r.user_id, r.reported_user_id, r.severity,
+                   r.requires_immediate_action, r.created_at,
+                   COALESCE(r.occurrence_count, 1), COALESCE(r.last_seen_at, r.created_at),
+                   (SELECT COUNT(*) FROM abuse_report_reporters rr WHERE rr.report_id = r.id)
+            FROM abuse_reports r
+            WHERE r.status = "pending"
+            ORDER BY r.requires_immediate_action DESC, r.last_seen_at DESC
             LIMIT 50
         ''')
 
@@ -772,7 +2573,10 @@ def get_pending_reports():
                 'reported_user_id': row[3],
                 'severity': row[4],
                 'requires_immediate_action': bool(row[5]),
-                'created_at': row[6]
+                'created_at': row[6],
+                'occurrence_count': row[7],
+                'last_seen_at': row[8],
+                'reporter_count': row[9]
             })
 
         conn.close()
@@ -788,6 +2592,254 @@ def get_pending_reports():
         return jsonify({'error': 'Failed to fetch pending reports'}), 500
 
 
+@app.route('/moderate-reports', methods=['POST'])
+@admin_only
+def moderate_reports():
+    """
+    Resolve, dismiss or escalate many abuse reports in one transaction
+    Expected input: {
+        "action": "resolve" | "dismiss" | "escalate",
+        "moderatorId": int (required),
+        "reportIds": [int, ...],            (and/or)
+        "contentHash": "hash of a cluster", (and/or)
+        "filter": {"status", "severity", "reportedUserId", "requiresImmediateAction",
+                   "createdBefore", "createdAfter"},
+        "recordLabels": optional bool, store decisions in training_data.human_label
+    }
+    Selectors are combined with AND; reports must be open (pending or escalated)
+    unless filter.status says otherwise.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action not in MODERATION_ACTIONS:
+            return jsonify({'error': f"action must be one of {sorted(MODERATION_ACTIONS)}"}), 400
+
+        report_ids = data.get('reportIds')
+        content_hash = data.get('contentHash')
+        filters = data.get('filter') or {}
+        if not report_ids and not content_hash and not filters:
+            return jsonify({'error': 'Provide reportIds, contentHash or filter'}), 400
+
+        clauses = []
+        params = []
+        if report_ids:
+            clauses.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps([int(report_id) for report_id in report_ids]))
+        if content_hash:
+            clauses.append('content_hash = ?')
+            params.append(content_hash)
+        if filters.get('status'):
+            clauses.append('status = ?')
+            params.append(filters['status'])
+        else:
+            clauses.append(f"status IN ({', '.join('?' for _ in OPEN_REPORT_STATUSES)})")
+            params.extend(OPEN_REPORT_STATUSES)
+        for key, column, operator in (
+            ('severity', 'severity', '='),
+            ('reportedUserId', 'reported_user_id', '='),
+            ('requiresImmediateAction', 'requires_immediate_action', '='),
+            ('createdBefore', 'created_at', '<'),
+            ('createdAfter', 'created_at', '>='),
+        ):
+            if filters.get(key) is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(int(filters[key]) if key == 'requiresImmediateAction' else filters[key])
+
+        new_status = MODERATION_ACTIONS[action]
+        moderator_id = data.get('moderatorId')
+        if moderator_id is None or not str(moderator_id).strip():
+            return jsonify({'error': 'moderatorId is required'}), 400
+        label = MODERATION_LABELS.get(action) if data.get('recordLabels') else None
+
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS moderation_targets (id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM moderation_targets')
+            cursor.execute(f'''
+                INSERT INTO moderation_targets (id)
+                SELECT id FROM abuse_reports WHERE {' AND '.join(clauses)}
+            ''', params)
+            matched = cursor.rowcount
+
+            cursor.execute('''
+                UPDATE abuse_reports
+                SET status = ?,
+                    moderator_id = ?,
+                    resolved_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE resolved_at END,
+                    requires_immediate_action = CASE WHEN ? THEN 1 ELSE requires_immediate_action END
+                WHERE id IN (SELECT id FROM moderation_targets)
+            ''', (new_status, moderator_id, action != 'escalate', action == 'escalate'))
+            updated = cursor.rowcount
+
+            labeled = 0
+            if label:
+                # One row per text, skipping texts already labeled (the same check as ingest_rows)
+                cursor.execute('''
+                    INSERT INTO training_data (text, timestamp, user_id, prediction, human_label, content_hash)
+                    SELECT text, ?, ?, prediction, ?, content_hash
+                    FROM abuse_reports
+                    WHERE id IN (
+                        SELECT MIN(id) FROM abuse_reports
+                        WHERE id IN (SELECT id FROM moderation_targets)
+                        GROUP BY COALESCE(content_hash, id)
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1 FROM training_data WHERE training_data.content_hash = abuse_reports.content_hash
+                    )
+                ''', (datetime.now().isoformat(), moderator_id, label))
+                labeled = cursor.rowcount
+
+            cursor.execute('SELECT status, count FROM abuse_report_status_counts WHERE count > 0')
+            status_counts = dict(cursor.fetchall())
+            conn.commit()
+        except sqlite3.IntegrityError:
+            # Escalating closed reports would open a second report for a cluster
+            cursor.execute(f'''
+                SELECT dedup_key, GROUP_CONCAT(id) FROM abuse_reports
+                WHERE dedup_key IN (
+                    SELECT dedup_key FROM abuse_reports WHERE id IN (SELECT id FROM moderation_targets)
+                )
+                AND (id IN (SELECT id FROM moderation_targets)
+                     OR status IN ({', '.join('?' for _ in OPEN_REPORT_STATUSES)}))
+                GROUP BY dedup_key
+                HAVING COUNT(*) > 1
+                LIMIT 1
+            ''', OPEN_REPORT_STATUSES)
+            conflict = cursor.fetchone()
+            conn.rollback()
+            if conflict is None:
+                raise
+            report_ids = sorted(int(report_id) for report_id in conflict[1].split(','))
+            return jsonify({
+                'error': f"Cluster {conflict[0]} would have more than one open report",
+                'dedup_key': conflict[0],
+                'report_ids': report_ids
+            }), 409
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        logger.info(f"Moderator {moderator_id} applied {action} to {updated} reports")
+
+        return jsonify({
+            'status': 'success',
+            'action': action,
+            'matched': matched,
+            'updated': updated,
+            'labeled': labeled,
+            'status_counts': status_counts
+        })
+
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid moderation request: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Bulk moderation error: {e}")
+        return jsonify({'error': 'Bulk moderation failed'}), 500
+
+
+@app.route('/search', methods=['GET'])
+@admin_only
+def search():
+    """
+    Ranked full-text search over abuse reports or training data
+    Query parameters: q, scope ('reports' or 'training'), syntax ('phrase' or
+    'fts' for raw FTS5 queries), status, severity, label, limit, offset
+    """
+    if not FTS_AVAILABLE:
+        return jsonify({'error': 'Full-text search is not available on this server'}), 503
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+
+    scope = request.args.get('scope', 'reports')
+    if scope not in ('reports', 'training'):
+        return jsonify({'error': 'scope must be "reports" or "training"'}), 400
+
+    limit = request.args.get('limit', SEARCH_DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    # Plain searches match the text as a phrase; syntax=fts passes FTS5 query syntax through
+    if request.args.get('syntax', 'phrase') == 'fts':
+        match = query
+    else:
+        match = '"' + query.replace('"', '""') + '"'
+
+    if scope == 'reports':
+        fts_table = 'abuse_reports_fts'
+        columns = 'r.id, r.text, r.status, r.severity, r.occurrence_count, r.created_at'
+        join = 'JOIN abuse_reports r ON r.id = abuse_reports_fts.rowid'
+        filters = (('status', 'r.status'), ('severity', 'r.severity'))
+        fields = ('id', 'text', 'status', 'severity', 'occurrence_count', 'created_at')
+    else:
+        fts_table = 'training_data_fts'
+        columns = 'r.id, r.text, r.human_label, r.created_at'
+        join = 'JOIN training_data r ON r.id = training_data_fts.rowid'
+        filters = (('label', 'r.human_label'),)
+        fields = ('id', 'text', 'label', 'created_at')
+
+    clauses = [f'{fts_table} MATCH ?']
+    params = [match]
+    for arg, column in filters:
+        value = request.args.get(arg)
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {columns},
+                   snippet({fts_table}, 0, '**', '**', '...', {SEARCH_SNIPPET_TOKENS}),
+                   bm25({fts_table})
+            FROM {fts_table}
+            {join}
+            WHERE {' AND '.join(clauses)}
+            ORDER BY bm25({fts_table})
+            LIMIT ? OFFSET ?
+        ''', (*params, limit + 1, offset))
+        rows = cursor.fetchall()
+        conn.close()
+    except sqlite3.OperationalError as e:
+        # Malformed FTS5 syntax surfaces here
+        return jsonify({'error': f'Invalid search query: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({'error': 'Search failed'}), 500
+
+    results = []
+    for row in rows[:limit]:
+        result = dict(zip(fields, row))
+        result['snippet'] = row[len(fields)]
+        result['score'] = -row[len(fields) + 1]
+        results.append(result)
+
+    return jsonify({
+        'status': 'success',
+        'scope': scope,
+        'results': results,
+        'count': len(results),
+        'offset': offset,
+        'next_offset': offset + limit if len(rows) > limit else None
+    })
+
+
+# Load and warm up the model in the background so the port binds immediately;
+# started last because the phases call helpers defined throughout this module
+startup.start_background([
+    ('load_model', lambda: detector.load_model(model_path)),
+    ('restore_shadow_candidate', restore_shadow_candidate),
+    ('warm_up', warm_up_detector),
+    ('resume_rescore', resume_interrupted_rescore),
+])
+
+
 if __name__ == '__main__':
     print("Starting Enhanced ML Integration Server...")
     print("Features:")
@@ -798,12 +2850,32 @@ if __name__ == '__main__':
     print("- Model retraining capabilities")
     print("\nEndpoints available:")
     print("- POST /predict-hate-speech")
+    print("- POST /predict-batch")
     print("- POST /report-abuse")
     print("- POST /store-training-data")
+    print("- POST /ingest-training-data")
     print("- POST /retrain-model")
+    print("- POST /hyperparameter-search")
+    print("- GET /hyperparameter-search/<job_id>")
+    print("- POST /hyperparameter-search/<job_id>/cancel")
+    print("- GET /shadow")
+    print("- POST /shadow/promote")
+    print("- POST /shadow/discard")
+    print("- POST /rescore")
+    print("- GET /rescore/<job_id>")
+    print("- POST /rescore/<job_id>/pause")
     print("- GET /model-stats")
+    print("- GET /memory-stats")
+    print("- POST /profiler/start")
+    print("- POST /profiler/stop")
+    print("- GET /profiler")
+    print("- GET /profiler/download")
     print("- GET /get-pending-reports")
+    print("- POST /moderate-reports")
+    print("- GET /search")
+    print("- POST /reload-patterns")
     print("- GET /health")
+    print("- GET /ready")
 
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
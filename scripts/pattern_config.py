@@ -0,0 +1,320 @@
+"""
+Versioned, hot-reloadable pattern and keyword sets shared by the detector and Hope
+Each set lives in a JSON file under scripts/patterns. Candidate files are validated
+in a child process (regex syntax, nested unbounded quantifiers and a timed probe
+against long adversarial inputs), compiled, and only then swapped in with a single
+reference assignment, so a bad edit never reaches live traffic.
+
+Usage:
+    python pattern_config.py check patterns/abuse_patterns.json [--kind regex|keywords]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+PATTERNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns')
+PATTERN_RELOAD_SECONDS = float(os.environ.get('PATTERN_RELOAD_SECONDS', '2'))
+# Whole-file validation budget; a file that exceeds it is rejected
+PATTERN_CHECK_TIMEOUT_SECONDS = 10
+# Slowest acceptable single search over a probe input
+PATTERN_PROBE_BUDGET_SECONDS = 0.05
+PATTERN_PROBE_LENGTH = 2000
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+_REGEX_FLAGS = {'IGNORECASE': re.IGNORECASE, 'MULTILINE': re.MULTILINE, 'DOTALL': re.DOTALL}
+
+
+class PatternConfigError(ValueError):
+    """A pattern file that must not be activated"""
+
+
+class PatternSet:
+    """Immutable, compiled contents of one pattern file"""
+
+    def __init__(self, kind, version, entries, checksum, path):
+        self.kind = kind
+        self.version = version
+        self.entries = entries
+        self.checksum = checksum
+        self.path = path
+        self.loaded_at = datetime.now().isoformat()
+
+    def info(self):
+        """Version details for health checks"""
+        return {
+            'version': self.version,
+            'checksum': self.checksum[:12],
+            'entries': sum(len(values) for values in self.entries.values()),
+            'loaded_at': self.loaded_at
+        }
+
+
+def _has_unbounded_repeat(items):
+    for op, av in items:
+        if op in _REPEATS:
+            _, max_count, sub = av
+            if max_count == sre_parse.MAXREPEAT or _has_unbounded_repeat(sub):
+                return True
+        elif op == sre_parse.SUBPATTERN:
+            if _has_unbounded_repeat(av[-1]):
+                return True
+        elif op == sre_parse.BRANCH:
+            if any(_has_unbounded_repeat(branch) for branch in av[1]):
+                return True
+    return False
+
+
+def _nested_repeat(items):
+    """True for constructs like (a+)+ or (\\w*\\s?)* that backtrack exponentially"""
+    for op, av in items:
+        if op in _REPEATS:
+            _, max_count, sub = av
+            if max_count > 1 and _has_unbounded_repeat(sub):
+                return True
+            if _nested_repeat(sub):
+                return True
+        elif op == sre_parse.SUBPATTERN:
+            if _nested_repeat(av[-1]):
+                return True
+        elif op == sre_parse.BRANCH:
+            if any(_nested_repeat(branch) for branch in av[1]):
+                return True
+    return False
+
+
+def _cycle_words(words):
+    return ' '.join(words[i % len(words)] for i in range(PATTERN_PROBE_LENGTH // 2))[:PATTERN_PROBE_LENGTH]
+
+
+def _probe_inputs(source):
+    """Long inputs built from the pattern's own words and generic filler"""
+    words = re.findall(r'[a-z]{2,}', source.lower()) or ['a']
+    probes = [
+        'a' * PATTERN_PROBE_LENGTH,
+        'a ' * (PATTERN_PROBE_LENGTH // 2),
+        _cycle_words(words) + '!',
+        (words[0] + ' ') * (PATTERN_PROBE_LENGTH // (len(words[0]) + 1)),
+    ]
+    # Everything before the last gap but nothing after it: "A.*B.*C" fails only at C,
+    # after trying every A/B pairing
+    if '.*' in source:
+        head_words = re.findall(r'[a-z]{2,}', source.rsplit('.*', 1)[0].lower())
+        if head_words:
+            probes.append(_cycle_words(head_words))
+    return probes
+
+
+def _flags(document):
+    flags = 0
+    for name in document.get('flags', []):
+        if name not in _REGEX_FLAGS:
+            raise PatternConfigError(f"Unsupported regex flag {name!r}")
+        flags |= _REGEX_FLAGS[name]
+    return flags
+
+
+def _read_document(path, kind):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        document = json.loads(raw)
+    except ValueError as e:
+        raise PatternConfigError(f"Invalid JSON: {e}")
+
+    version = document.get('version')
+    if not isinstance(version, str) or not version:
+        raise PatternConfigError('A non-empty "version" string is required')
+    key = 'patterns' if kind == 'regex' else 'keywords'
+    entries = document.get(key)
+    if not isinstance(entries, dict) or not entries:
+        raise PatternConfigError(f'"{key}" must be a non-empty object of lists')
+    for category, values in entries.items():
+        if not isinstance(values, list) or not values or not all(
+                isinstance(value, str) and value.strip() for value in values):
+            raise PatternConfigError(f"Category {category!r} must be a non-empty list of strings")
+    return document, entries, version, hashlib.sha256(raw).hexdigest()
+
+
+def check_file(path, kind='regex', probe=True):
+    """Return a list of problems with a pattern file; empty means it may be activated"""
+    try:
+        document, entries, _, _ = _read_document(path, kind)
+        flags = _flags(document) if kind == 'regex' else 0
+    except (OSError, PatternConfigError) as e:
+        return [str(e)]
+    if kind != 'regex':
+        return []
+
+    problems = []
+    for category, sources in entries.items():
+        for source in sources:
+            try:
+                compiled = re.compile(source, flags)
+                parsed = sre_parse.parse(source, flags)
+            except re.error as e:
+                problems.append(f"{category}: {source!r} does not compile: {e}")
+                continue
+            if _nested_repeat(parsed):
+                problems.append(f"{category}: {source!r} nests unbounded quantifiers")
+                continue
+            if not probe:
+                continue
+            for text in _probe_inputs(source):
+                started = time.perf_counter()
+                compiled.search(text)
+                elapsed = time.perf_counter() - started
+                if elapsed > PATTERN_PROBE_BUDGET_SECONDS:
+                    problems.append(
+                        f"{category}: {source!r} took {elapsed * 1000:.0f} ms on a "
+                        f"{len(text)}-character probe")
+                    break
+    return problems
+
+
+def check_file_isolated(path, kind='regex'):
+    """Run check_file in a child process so catastrophic backtracking cannot hang the server"""
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'check', path, '--kind', kind, '--json'],
+            capture_output=True, text=True, timeout=PATTERN_CHECK_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        return [f"Validation exceeded {PATTERN_CHECK_TIMEOUT_SECONDS}s; "
+                f"a pattern likely backtracks catastrophically"]
+    try:
+        return json.loads(result.stdout)['problems']
+    except (ValueError, KeyError):
+        return [f"Validation failed: {result.stderr.strip() or result.returncode}"]
+
+
+def compile_file(path, kind='regex'):
+    """Parse and compile a pattern file into a PatternSet (no safety checks)"""
+    document, entries, version, checksum = _read_document(path, kind)
+    if kind == 'regex':
+        flags = _flags(document)
+        compiled = {category: tuple(re.compile(source, flags) for source in sources)
+                    for category, sources in entries.items()}
+    else:
+        compiled = {category: tuple(keyword.lower() for keyword in keywords)
+                    for category, keywords in entries.items()}
+    return PatternSet(kind, version, compiled, checksum, path)
+
+
+class PatternStore:
+    """Holds the active PatternSet for one file and swaps in validated edits"""
+
+    def __init__(self, filename, kind='regex', required=()):
+        self.path = os.path.join(PATTERNS_DIR, filename)
+        self.kind = kind
+        self.required = tuple(required)
+        self.lock = Lock()
+        self.last_error = None
+        self.last_mtime = None
+        # Startup runs the same checks in-process; the file is trusted from the repo
+        problems = check_file(self.path, kind, probe=False)
+        if problems:
+            raise PatternConfigError(f"{self.path}: {'; '.join(problems)}")
+        self.last_mtime = os.stat(self.path).st_mtime_ns
+        self.current = self._compile()
+
+    def _compile(self):
+        pattern_set = compile_file(self.path, self.kind)
+        missing = [category for category in self.required if category not in pattern_set.entries]
+        if missing:
+            raise PatternConfigError(f"Missing required categories: {', '.join(missing)}")
+        return pattern_set
+
+    def reload(self, force=False):
+        """Validate and activate the file if it changed; returns whether a new set went live"""
+        with self.lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if not force and mtime == self.last_mtime:
+                    return False
+                self.last_mtime = mtime
+
+                problems = check_file_isolated(self.path, self.kind)
+                if problems:
+                    raise PatternConfigError('; '.join(problems))
+                candidate = self._compile()
+                if candidate.checksum == self.current.checksum:
+                    return False
+                if candidate.version == self.current.version:
+                    raise PatternConfigError(
+                        f"Content changed but version {candidate.version} was not bumped")
+            except (OSError, PatternConfigError) as e:
+                self.last_error = {'error': str(e), 'at': datetime.now().isoformat()}
+                logger.error(f"Rejected pattern file {self.path}: {e}")
+                return False
+
+            previous = self.current.version
+            self.current = candidate
+            self.last_error = None
+            logger.info(f"Activated {os.path.basename(self.path)} version {candidate.version} "
+                        f"(was {previous})")
+            return True
+
+    def info(self):
+        """Active version plus the last rejected edit, if any"""
+        return dict(self.current.info(), file=os.path.basename(self.path),
+                    last_error=self.last_error)
+
+
+class PatternWatcher:
+    """Polls pattern files and hot-reloads them on change"""
+
+    def __init__(self, stores, interval=PATTERN_RELOAD_SECONDS):
+        self.stores = stores
+        self.interval = interval
+        self.stop_event = Event()
+        self.thread = None
+
+    def start(self):
+        """Watch on a background thread"""
+        def run():
+            while not self.stop_event.wait(self.interval):
+                for store in self.stores:
+                    store.reload()
+        self.thread = Thread(target=run, name='pattern-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self.stop_event.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate a pattern or keyword file')
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('path')
+    parser.add_argument('--kind', choices=['regex', 'keywords'], default='regex')
+    parser.add_argument('--json', action='store_true', help='machine-readable output')
+    args = parser.parse_args(argv)
+
+    problems = check_file(args.path, args.kind)
+    if args.json:
+        print(json.dumps({'problems': problems}))
+    else:
+        for problem in problems:
+            print(problem)
+        print('OK' if not problems else f"{len(problems)} problem(s)")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
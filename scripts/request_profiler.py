@@ -0,0 +1,262 @@
+"""
+On-demand profiling of live requests for the moderation and Hope servers
+An admin switches on either a sampling profiler (a background thread reads the
+stacks of threads serving profiled requests every few milliseconds) or per-request
+cProfile, for a bounded number of requests or seconds. Sampled stacks are
+aggregated in the folded format read by flamegraph.pl and speedscope; cProfile
+results are merged and exported as a standard .prof file. When no session is
+running the request hooks only read one attribute.
+"""
+
+import cProfile
+import hmac
+import logging
+import marshal
+import os
+import pstats
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from threading import Event, Lock, Thread, get_ident
+
+from flask import jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Admin token for profiler endpoints; without one only localhost may use them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Session bounds, so a forgotten switch cannot run (or grow) indefinitely
+PROFILER_MAX_SECONDS = 300
+PROFILER_MAX_REQUESTS = 10000
+PROFILER_MAX_STACKS = 20000
+PROFILER_DEFAULT_INTERVAL_MS = 5
+PROFILER_MODES = ('sample', 'cprofile')
+
+
+def admin_only(view):
+    """Route decorator: require X-Admin-Token when ADMIN_TOKEN is set, else a local caller"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN:
+            token = request.headers.get('X-Admin-Token', '')
+            allowed = hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+        else:
+            allowed = request.remote_addr in LOCAL_ADDRESSES
+        if not allowed:
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """One bounded profiling run and its aggregated results"""
+
+    def __init__(self, mode, max_requests, max_seconds, interval_ms):
+        self.mode = mode
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.interval = interval_ms / 1000
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.stop_reason = None
+        self.requests_started = 0
+        self.requests_finished = 0
+        self.samples = 0
+        self.dropped_samples = 0
+        self.stacks = Counter()
+        self.stats = None
+        self.threads = set()
+        self.stop_event = Event()
+
+    def is_running(self):
+        return self.finished_at is None
+
+    def to_dict(self):
+        """JSON-serializable session status and the hottest frames"""
+        elapsed = time.perf_counter() - self.started
+        summary = {
+            'mode': self.mode,
+            'running': self.is_running(),
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'stop_reason': self.stop_reason,
+            'elapsed_seconds': round(elapsed, 2),
+            'max_requests': self.max_requests,
+            'max_seconds': self.max_seconds,
+            'requests_profiled': self.requests_finished,
+        }
+        if self.mode == 'sample':
+            # Self time: how often each frame was on top of a sampled stack
+            leaves = Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            summary.update(
+                interval_ms=round(self.interval * 1000, 2),
+                samples=self.samples,
+                unique_stacks=len(self.stacks),
+                dropped_samples=self.dropped_samples,
+                top_frames=[{'frame': frame, 'samples': count} for frame, count in leaves.most_common(10)])
+        elif self.stats is not None:
+            top = sorted(self.stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:10]
+            summary['top_functions'] = [
+                {'function': f"{name} ({os.path.basename(filename)}:{line})",
+                 'calls': calls, 'cumulative_seconds': round(cumulative, 4)}
+                for (filename, line, name), (_, calls, _, cumulative, _) in top]
+        return summary
+
+
+class RequestProfiler:
+    """Switchable profiler hooked into a Flask app's request lifecycle"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.session = None
+        # Checked by every request; True only while a session accepts requests
+        self.active = False
+
+    def install(self, app):
+        """Register the request hooks on app"""
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def start(self, mode='sample', max_requests=None, max_seconds=None,
+              interval_ms=PROFILER_DEFAULT_INTERVAL_MS):
+        """Begin a session; raises ValueError for bad bounds or when one is already running"""
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"mode must be one of {', '.join(PROFILER_MODES)}")
+        max_requests = int(max_requests or PROFILER_MAX_REQUESTS)
+        max_seconds = float(max_seconds or PROFILER_MAX_SECONDS)
+        interval_ms = float(interval_ms)
+        if not 0 < max_requests <= PROFILER_MAX_REQUESTS:
+            raise ValueError(f"requests must be between 1 and {PROFILER_MAX_REQUESTS}")
+        if not 0 < max_seconds <= PROFILER_MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {PROFILER_MAX_SECONDS}")
+        if not 1 <= interval_ms <= 1000:
+            raise ValueError('intervalMs must be between 1 and 1000')
+
+        with self.lock:
+            if self.session is not None and self.session.is_running():
+                raise ValueError('A profiling session is already running')
+            session = ProfileSession(mode, max_requests, max_seconds, interval_ms)
+            self.session = session
+            self.active = True
+
+        target = self._sample if mode == 'sample' else self._watch_deadline
+        Thread(target=target, args=(session,), name='request-profiler', daemon=True).start()
+        logger.info(f"Profiler started: {mode}, up to {max_requests} requests or {max_seconds}s")
+        return session.to_dict()
+
+    def stop(self, reason='stopped'):
+        """End the running session, keeping its results for download"""
+        with self.lock:
+            session = self.session
+            if session is None or not session.is_running():
+                return session
+            self.active = False
+            session.stop_reason = reason
+            session.finished_at = datetime.now().isoformat()
+            session.stop_event.set()
+        logger.info(f"Profiler {reason} after {session.requests_finished} requests")
+        return session
+
+    def status(self):
+        """Status of the current or last session"""
+        with self.lock:
+            return self.session.to_dict() if self.session else None
+
+    def export(self):
+        """(body, mimetype, filename) of the last session's results, or None"""
+        with self.lock:
+            session = self.session
+            if session is None:
+                return None
+            if session.mode == 'sample':
+                body = ''.join(f"{stack} {count}\n" for stack, count in session.stacks.most_common())
+                return body, 'text/plain', 'profile.folded'
+            if session.stats is None:
+                return b'', 'application/octet-stream', 'profile.prof'
+            # Same layout as pstats.Stats.dump_stats, readable by snakeviz and flameprof
+            return marshal.dumps(session.stats.stats), 'application/octet-stream', 'profile.prof'
+
+    def _before_request(self):
+        if not self.active or request.path.startswith('/profiler'):
+            return
+        with self.lock:
+            session = self.session
+            if not self.active or session.requests_started >= session.max_requests:
+                return
+            session.requests_started += 1
+            request.environ['profiler.session'] = session
+            if session.mode == 'sample':
+                session.threads.add(get_ident())
+                return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; skip overlapping requests
+            with self.lock:
+                session.requests_started -= 1
+            request.environ.pop('profiler.session')
+            return
+        request.environ['profiler.cprofile'] = profile
+
+    def _teardown_request(self, exc=None):
+        session = request.environ.pop('profiler.session', None)
+        if session is None:
+            return
+        profile = request.environ.pop('profiler.cprofile', None)
+        if profile is not None:
+            profile.disable()
+        with self.lock:
+            if profile is not None and session.is_running():
+                if session.stats is None:
+                    session.stats = pstats.Stats(profile)
+                else:
+                    session.stats.add(profile)
+            session.threads.discard(get_ident())
+            session.requests_finished += 1
+            done = session.requests_finished >= session.max_requests
+        if done:
+            self.stop('request limit reached')
+
+    def _watch_deadline(self, session):
+        if not session.stop_event.wait(session.max_seconds):
+            self.stop('time limit reached')
+
+    def _sample(self, session):
+        deadline = session.started + session.max_seconds
+        while not session.stop_event.wait(session.interval):
+            if time.perf_counter() >= deadline:
+                self.stop('time limit reached')
+                return
+            with self.lock:
+                thread_ids = list(session.threads)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not labels:
+                    continue
+                stack = ';'.join(reversed(labels))
+                with self.lock:
+                    session.samples += 1
+                    if stack in session.stacks or len(session.stacks) < PROFILER_MAX_STACKS:
+                        session.stacks[stack] += 1
+                    else:
+                        session.dropped_samples += 1
+            del frames
@@ -0,0 +1,369 @@
+"""
+Multi-process scoring pool for the moderation server
+Regex matching and TF-IDF scoring are Python-heavy, so threads of one server
+process share a single core. Worker processes score normalized text windows in
+parallel instead; each window arrives with the word n-grams the server already
+built for it, so workers only look them up. Workers do not load their own model: the fitted vocabulary,
+idf weights and coefficients are exported once into a shared-memory block that
+every worker maps read-only. Pattern sources are published the same way and each
+worker compiles a pattern set once per version. Without a working pool (off by
+default, unsupported model, broken worker) callers score in-process as before.
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+
+import numpy as np
+
+from text_normalization import word_analyzer_settings
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for scoring; 0 scores in the server process
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', '0'))
+# Longest wait for one scoring task before falling back to in-process scoring
+SCORING_TIMEOUT_SECONDS = float(os.environ.get('SCORING_TIMEOUT_SECONDS', '10'))
+# Windows per task, so a batch spreads over every worker
+SCORING_CHUNK_WINDOWS = 32
+
+_HEADER_BYTES = 8
+_ALIGN = 8
+
+
+def detect_patterns(text_processed, entries, severity_weights):
+    """Pattern-based categories and confidences for one preprocessed text"""
+    detected_categories = []
+    confidence_scores = []
+
+    for category, patterns in entries.items():
+        category_matches = 0
+        for pattern in patterns:
+            if pattern.search(text_processed):
+                category_matches += 1
+
+        if category_matches > 0:
+            detected_categories.append(category)
+            # Calculate confidence based on pattern matches
+            # Use a higher base confidence for any pattern match
+            base_confidence = 0.8 if category_matches > 0 else 0.0
+            confidence = min(base_confidence + (category_matches / len(patterns)) * 0.2, 1.0)
+            confidence_scores.append(
+                confidence * severity_weights.get(category, 0.5))
+
+    return detected_categories, confidence_scores
+
+
+def _write_block(meta, arrays=None):
+    """Create a shared-memory block holding meta (JSON) followed by arrays"""
+    arrays = arrays or {}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = [offset, array.dtype.str, list(array.shape)]
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps(dict(meta, arrays=layout)).encode('utf-8')
+    data_start = -(-(_HEADER_BYTES + len(header)) // _ALIGN) * _ALIGN
+
+    shm = SharedMemory(create=True, size=max(data_start + offset, 1))
+    shm.buf[:_HEADER_BYTES] = len(header).to_bytes(_HEADER_BYTES, 'little')
+    shm.buf[_HEADER_BYTES:_HEADER_BYTES + len(header)] = header
+    for name, array in arrays.items():
+        start, dtype, shape = layout[name]
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=data_start + start)
+        view[...] = array
+        del view
+    return shm
+
+
+def _read_block(name):
+    """Attach to a block by name; returns (shm, meta, read-only array views)"""
+    shm = SharedMemory(name=name)
+    size = int.from_bytes(bytes(shm.buf[:_HEADER_BYTES]), 'little')
+    meta = json.loads(bytes(shm.buf[_HEADER_BYTES:_HEADER_BYTES + size]).decode('utf-8'))
+    data_start = -(-(_HEADER_BYTES + size) // _ALIGN) * _ALIGN
+    arrays = {}
+    for array_name, (start, dtype, shape) in meta.pop('arrays').items():
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=data_start + start)
+        view.flags.writeable = False
+        arrays[array_name] = view
+    return shm, meta, arrays
+
+
+def _release(shm, unlink=False):
+    try:
+        shm.close()
+    except BufferError:
+        # A worker still holds array views; the mapping goes away with the process
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def export_model(vectorizer, model):
+    """
+    Copy a fitted TfidfVectorizer + binary LogisticRegression into shared memory
+    Raises ValueError for configurations the workers do not reimplement
+    """
+    if word_analyzer_settings(vectorizer) is None:
+        raise ValueError('only the default word analyzer is supported')
+    if model.coef_.shape[0] != 1 or len(model.classes_) != 2:
+        raise ValueError('only binary classifiers are supported')
+
+    # Terms sorted as UTF-8 bytes, searched with np.searchsorted in the workers
+    vocabulary = sorted((term.encode('utf-8'), column) for term, column in vectorizer.vocabulary_.items())
+    width = max((len(term) for term, _ in vocabulary), default=1)
+    terms = np.array([term for term, _ in vocabulary], dtype=f'S{width}')
+    columns = np.array([column for _, column in vocabulary], dtype=np.int32)
+    n_features = len(vocabulary)
+    idf = getattr(vectorizer, 'idf_', None) if vectorizer.use_idf else None
+    idf = np.ones(n_features) if idf is None else np.asarray(idf, dtype=np.float64)
+
+    meta = {
+        'kind': 'model',
+        'binary': vectorizer.binary,
+        'sublinear_tf': vectorizer.sublinear_tf,
+        'norm': vectorizer.norm,
+        'intercept': float(model.intercept_[0]),
+        'term_bytes': width,
+    }
+    return _write_block(meta, {
+        'terms': terms,
+        'columns': columns,
+        'idf': idf,
+        'coef': np.asarray(model.coef_[0], dtype=np.float64),
+    })
+
+
+def export_patterns(pattern_set, severity_weights):
+    """Copy a compiled pattern set's sources into shared memory"""
+    entries = {category: [[pattern.pattern, pattern.flags] for pattern in patterns]
+               for category, patterns in pattern_set.entries.items()}
+    return _write_block({'kind': 'patterns', 'checksum': pattern_set.checksum,
+                         'entries': entries, 'severity_weights': severity_weights})
+
+
+# Worker-side state: blocks attached by name, plus what was built from them
+_worker_blocks = {}
+_WORKER_MAX_BLOCKS = 4
+
+
+class _WorkerModel:
+    """Scores word n-grams against an attached model block"""
+
+    def __init__(self, meta, arrays):
+        self.terms = arrays['terms']
+        self.columns = arrays['columns']
+        self.idf = arrays['idf']
+        self.coef = arrays['coef']
+        self.intercept = meta['intercept']
+        self.term_bytes = meta['term_bytes']
+        self.binary = meta['binary']
+        self.sublinear_tf = meta['sublinear_tf']
+        self.norm = meta['norm']
+
+    def probability(self, ngrams):
+        """Positive-class probability of one window's n-grams, as predict_proba(...)[:, 1]"""
+        encoded = [gram.encode('utf-8') for gram in ngrams]
+        # Longer n-grams cannot be in the vocabulary (and would be truncated by the dtype)
+        encoded = [gram for gram in encoded if len(gram) <= self.term_bytes]
+        score = self.intercept
+        if encoded:
+            queries = np.array(encoded, dtype=self.terms.dtype)
+            positions = np.searchsorted(self.terms, queries)
+            positions[positions == len(self.terms)] = 0
+            found = self.terms[positions] == queries
+            if found.any():
+                columns, counts = np.unique(self.columns[positions[found]], return_counts=True)
+                values = np.ones(len(columns)) if self.binary else counts.astype(np.float64)
+                if self.sublinear_tf:
+                    values = np.log(values) + 1.0
+                values *= self.idf[columns]
+                if self.norm == 'l2':
+                    values /= math.sqrt(np.dot(values, values))
+                elif self.norm == 'l1':
+                    values /= np.abs(values).sum()
+                score += float(np.dot(values, self.coef[columns]))
+        if score >= 0:
+            return 1.0 / (1.0 + math.exp(-score))
+        return math.exp(score) / (1.0 + math.exp(score))
+
+
+def _worker_attach(name, build):
+    entry = _worker_blocks.get(name)
+    if entry is None:
+        while len(_worker_blocks) >= _WORKER_MAX_BLOCKS:
+            old_name = next(iter(_worker_blocks))
+            old_shm = _worker_blocks.pop(old_name)[0]
+            _release(old_shm)
+        shm, meta, arrays = _read_block(name)
+        entry = (shm, build(meta, arrays))
+        _worker_blocks[name] = entry
+    return entry[1]
+
+
+def _build_patterns(meta, arrays):
+    entries = {category: [re.compile(source, flags) for source, flags in patterns]
+               for category, patterns in meta['entries'].items()}
+    return entries, meta['severity_weights']
+
+
+def _score_windows(model_name, patterns_name, windows):
+    """Worker task: (categories, confidences, ml_confidence) for each (normalized text, n-grams) window"""
+    entries, severity_weights = _worker_attach(patterns_name, _build_patterns)
+    model = _worker_attach(model_name, _WorkerModel) if model_name else None
+    results = []
+    for text_processed, ngrams in windows:
+        categories, confidences = detect_patterns(text_processed, entries, severity_weights)
+        ml_confidence = model.probability(ngrams) if model is not None else 0.0
+        results.append((categories, confidences, ml_confidence))
+    return results
+
+
+def _worker_ready():
+    return True
+
+
+class ScoringPool:
+    """Worker processes scoring text windows against shared-memory model and pattern blocks"""
+
+    def __init__(self, workers=SCORING_WORKERS, timeout=SCORING_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = None
+        self.broken = False
+        self.lock = Lock()
+        # Published blocks: the current one and its predecessor, which in-flight tasks may still name
+        self.model_source = None
+        self.model_blocks = []
+        self.patterns_source = None
+        self.pattern_blocks = []
+        self.stats = {'tasks': 0, 'windows': 0, 'fallbacks': 0, 'model_exports': 0}
+
+    def start(self):
+        """
+        Fork the workers; call before the server starts any threads
+        Forked workers inherit imported modules, so the server module is not re-imported
+        """
+        if self.workers <= 0:
+            return False
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning('Scoring pool needs the fork start method; scoring in-process')
+            return False
+        # Started first so every worker shares it and attached blocks are not reported as leaks
+        resource_tracker.ensure_running()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('fork'))
+        # With fork every worker is launched on the first submit
+        self.executor.submit(_worker_ready).result()
+        logger.info(f"Scoring pool started with {self.workers} workers")
+        return True
+
+    def is_running(self):
+        return self.executor is not None and not self.broken
+
+    def _publish(self, source, current_source, blocks, export):
+        """Export source into a new block unless it is already current; returns the block name"""
+        if source is current_source and blocks:
+            return blocks[-1].name if blocks[-1] is not None else None
+        try:
+            shm = export()
+        except ValueError as e:
+            logger.warning(f"Scoring pool cannot share this model ({e}); scoring in-process")
+            shm = None
+        blocks.append(shm)
+        while len(blocks) > 2:
+            old = blocks.pop(0)
+            if old is not None:
+                _release(old, unlink=True)
+        return shm.name if shm is not None else None
+
+    def sync(self, vectorizer, model, patterns, severity_weights):
+        """Block names for this model and pattern set, exporting them on first use"""
+        with self.lock:
+            model_name = None
+            if model is not None:
+                model_name = self._publish(model, self.model_source, self.model_blocks,
+                                           lambda: export_model(vectorizer, model))
+                if model is not self.model_source:
+                    self.model_source = model
+                    self.stats['model_exports'] += 1
+                if model_name is None:
+                    return None
+            patterns_name = self._publish(patterns, self.patterns_source, self.pattern_blocks,
+                                          lambda: export_patterns(patterns, severity_weights))
+            self.patterns_source = patterns
+            return model_name, patterns_name
+
+    def score(self, windows, vectorizer, model, patterns, severity_weights):
+        """
+        (categories, confidences, ml_confidence) per AnalyzedText window, or None when the
+        caller should score in-process; model is None for pattern-only scoring
+        """
+        if not self.is_running():
+            return None
+        names = self.sync(vectorizer, model, patterns, severity_weights)
+        if names is None:
+            self.stats['fallbacks'] += 1
+            return None
+        model_name, patterns_name = names
+        # Workers get the windows' cached n-grams rather than re-tokenizing them
+        settings = word_analyzer_settings(vectorizer) if model_name else None
+        tasks = [(window.normalized, window.ngrams(settings) if settings else None) for window in windows]
+        try:
+            futures = [self.executor.submit(_score_windows, model_name, patterns_name,
+                                            tasks[start:start + SCORING_CHUNK_WINDOWS])
+                       for start in range(0, len(tasks), SCORING_CHUNK_WINDOWS)]
+            results = []
+            for future in futures:
+                results.extend(future.result(timeout=self.timeout))
+        except BrokenProcessPool as e:
+            logger.error(f"Scoring pool broke ({e}); scoring in-process from now on")
+            self.broken = True
+            self.stats['fallbacks'] += 1
+            return None
+        except Exception as e:
+            logger.error(f"Scoring pool error: {e}")
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats['tasks'] += len(futures)
+        self.stats['windows'] += len(windows)
+        return results
+
+    def status(self):
+        """Worker count, shared block sizes and fallback counts"""
+        with self.lock:
+            blocks = [block for block in self.model_blocks[-1:] + self.pattern_blocks[-1:]
+                      if block is not None]
+            return {
+                'enabled': self.workers > 0,
+                'running': self.is_running(),
+                'workers': self.workers,
+                'shared_bytes': sum(block.size for block in blocks),
+                **self.stats
+            }
+
+    def close(self):
+        """Stop the workers and remove the shared blocks"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        with self.lock:
+            for block in self.model_blocks + self.pattern_blocks:
+                if block is not None:
+                    _release(block, unlink=True)
+            self.model_blocks = []
+            self.pattern_blocks = []
+            self.model_source = None
+            self.patterns_source = None
@@ -0,0 +1,102 @@
+"""
+Startup phases, timings and readiness shared by the moderation and Hope servers
+Cheap setup runs before the port binds; model loading and warm-up run on a
+background thread, so /health answers immediately after a cold start and
+model-dependent endpoints wait briefly for readiness instead of failing.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from functools import wraps
+from threading import Event, Lock, Thread
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# How long a request that needs the model waits for warm-up before a 503
+STARTUP_READY_WAIT_SECONDS = float(os.environ.get('STARTUP_READY_WAIT_SECONDS', '20'))
+
+
+class StartupState:
+    """Readiness flag plus the duration of every startup phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.ready_event = Event()
+        self.lock = Lock()
+        self.phases = []
+        self.phase = None
+        self.errors = []
+        self.seconds_to_ready = None
+        self.thread = None
+
+    def run_phase(self, name, func, *args, background=False):
+        """Run one phase, recording how long it took; errors are logged, not raised"""
+        self.phase = name
+        phase_started = time.perf_counter()
+        result = None
+        try:
+            result = func(*args)
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {e}")
+            with self.lock:
+                self.errors.append({'phase': name, 'error': str(e)})
+        with self.lock:
+            self.phases.append({
+                'name': name,
+                'seconds': round(time.perf_counter() - phase_started, 4),
+                'background': background
+            })
+        return result
+
+    def start_background(self, phases):
+        """Run (name, func) phases on a background thread, then mark the service ready"""
+        def run():
+            for name, func in phases:
+                self.run_phase(name, func, background=True)
+            self.phase = None
+            self.seconds_to_ready = round(time.perf_counter() - self.started, 4)
+            self.ready_event.set()
+            logger.info(f"Service ready {self.seconds_to_ready}s after startup")
+
+        self.thread = Thread(target=run, name='startup-warmup', daemon=True)
+        self.thread.start()
+
+    def is_ready(self):
+        """Whether background warm-up has finished"""
+        return self.ready_event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until ready or timeout; returns readiness"""
+        return self.ready_event.wait(timeout)
+
+    def to_dict(self):
+        """JSON-serializable readiness and phase timings"""
+        with self.lock:
+            return {
+                'ready': self.is_ready(),
+                'phase': self.phase,
+                'started_at': self.started_at,
+                'seconds_to_ready': self.seconds_to_ready,
+                'phases': list(self.phases),
+                'errors': list(self.errors)
+            }
+
+    def requires_ready(self, view):
+        """Route decorator: wait for warm-up, then answer 503 if the service is still not ready"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.wait(STARTUP_READY_WAIT_SECONDS):
+                response = jsonify({'error': 'Service is warming up', 'startup': self.to_dict()})
+                response.headers['Retry-After'] = '5'
+                return response, 503
+            return view(*args, **kwargs)
+        return wrapper
+
+    def ready_response(self):
+        """Body and status for a /ready probe"""
+        return jsonify(self.to_dict()), 200 if self.is_ready() else 503
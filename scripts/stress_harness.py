@@ -0,0 +1,414 @@
+"""
+Concurrency stress harness for the moderation and Hope Flask apps
+Loads both services in-process against scratch databases, records single-threaded
+reference results, then fires concurrent scoring, retraining, report writes and
+stats reads through their Flask test clients. The run fails when a concurrent
+result differs from the reference, a request errors, SQLite reports "database is
+locked", or an optional throughput/latency gate is missed, so every concurrency
+change can be checked with one command.
+
+Usage:
+    python stress_harness.py [--service ml|hope|both] [--threads 8] [--duration 15]
+                             [--max-p99-ms 500] [--min-rps 50] [--report stress_report.json]
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from itertools import islice
+from threading import Barrier, Lock, Thread
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from training_corpus import LABELED_DATA_CATEGORIES, CsvSource  # noqa: E402
+from training_ingest import csv_training_rows, ingest_rows  # noqa: E402
+
+logger = logging.getLogger('stress_harness')
+
+LABELED_DATA_PATH = os.path.join(SCRIPTS_DIR, 'labeled_data.csv')
+
+# Relative weights of each operation in the concurrent mix
+ML_OPERATIONS = {'predict': 60, 'report': 10, 'store': 10, 'stats': 10, 'retrain': 1}
+HOPE_OPERATIONS = {'counsel': 60, 'hope_stats': 10, 'history': 10, 'train': 2}
+
+# Hope seed examples: 1 asks for support, 0 is everyday conversation
+HOPE_SEED_MESSAGES = [
+    ("I feel so lonely and nobody understands me", 1),
+    ("I can't stop worrying and I'm having panic attacks", 1),
+    ("My partner is abusive and I'm scared to go home", 1),
+    ("Someone keeps sending me hate messages online", 1),
+    ("I've been depressed and can't get out of bed", 1),
+    ("I lost my job and the bills keep piling up", 1),
+    ("My grandmother passed away last week", 1),
+    ("Work stress is overwhelming me every single day", 1),
+    ("I had a nice lunch with friends today", 0),
+    ("What a sunny afternoon, going for a walk", 0),
+    ("Just finished a good book, any recommendations?", 0),
+    ("Looking forward to the weekend trip", 0),
+    ("The new cafe downtown has great coffee", 0),
+    ("We watched a funny movie last night", 0),
+    ("My garden tomatoes are finally ripe", 0),
+    ("Planning a birthday party for my sister", 0),
+]
+HOPE_MESSAGES = [text for text, _ in HOPE_SEED_MESSAGES] + [
+    "I want to die and I don't see a way out",
+    "I keep wanting to hurt myself",
+    "This is an emergency, I need help now",
+    "My boyfriend is abusive and controls everything I do",
+    "I'm being cyber bullied at school",
+    "My marriage problems are getting worse",
+    "I have chronic pain and health worries",
+]
+
+
+def load_service(module_name, filename):
+    """Import a service script by path; it initializes its databases in the working directory"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LockedErrorCounter(logging.Handler):
+    """Counts log records mentioning SQLite lock contention"""
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.count = 0
+        self.lock = Lock()
+
+    def emit(self, record):
+        if 'database is locked' in record.getMessage():
+            with self.lock:
+                self.count += 1
+
+
+class Results:
+    """Thread-safe latency, status and mismatch bookkeeping"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.busy = defaultdict(int)
+        self.locked_responses = 0
+        self.mismatches = 0
+        self.mismatch_examples = []
+
+    def record(self, operation, latency_ms, ok, busy=False, locked=False):
+        with self.lock:
+            self.latencies[operation].append(latency_ms)
+            if busy:
+                self.busy[operation] += 1
+            elif not ok:
+                self.errors[operation] += 1
+            if locked:
+                self.locked_responses += 1
+
+    def mismatch(self, operation, text, expected, actual):
+        with self.lock:
+            self.mismatches += 1
+            if len(self.mismatch_examples) < 5:
+                self.mismatch_examples.append({
+                    'operation': operation, 'text': text[:80],
+                    'expected': expected, 'actual': actual
+                })
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(values), [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+
+def ml_signature(prediction):
+    """Model-derived fields of a prediction; campaign and offender state legitimately vary"""
+    return [
+        round(prediction['confidence'], 6),
+        round(prediction['ml_confidence'], 6),
+        round(prediction['pattern_confidence'], 6),
+        sorted(category for category in prediction['categories'] if category != 'spam')
+    ]
+
+
+def hope_signature(analysis):
+    """Analysis fields that depend only on the message and the model"""
+    return [analysis['crisis_level'], analysis['primary_concern'], round(analysis['confidence'], 6)]
+
+
+def sample_texts(count, seed):
+    """Deterministic sample of tweets from the bundled dataset"""
+    source = CsvSource(LABELED_DATA_PATH, 'tweet', 'class', category_map=LABELED_DATA_CATEGORIES)
+    texts = [text for text, _, _ in islice(source.rows(), 5000)]
+    return random.Random(seed).sample(texts, min(count, len(texts)))
+
+
+def setup_ml(seed_rows):
+    """Load the moderation app, seed labeled data and train the serving model"""
+    ml = load_service('ml_integration', 'ml-integration-example.py')
+    conn = sqlite3.connect(ml.DB_PATH)
+    try:
+        source = CsvSource(LABELED_DATA_PATH, 'tweet', 'class', category_map=LABELED_DATA_CATEGORIES)
+        ingest_rows(conn, islice(csv_training_rows(source), seed_rows))
+    finally:
+        conn.close()
+    response = ml.app.test_client().post('/retrain-model')
+    if response.status_code != 200:
+        raise RuntimeError(f"Initial retrain failed: {response.get_json()}")
+    return ml
+
+
+def setup_hope():
+    """Load Hope and train it once on the seed messages"""
+    hope = load_service('hope', 'Hope.py')
+    client = hope.app.test_client()
+    texts = [text for text, _ in HOPE_SEED_MESSAGES] * 4
+    labels = [label for _, label in HOPE_SEED_MESSAGES] * 4
+    response = client.post('/train-hope', json={'texts': texts, 'labels': labels})
+    if response.status_code != 202:
+        raise RuntimeError(f"Initial Hope training failed: {response.get_json()}")
+    wait_for_hope_training(client, response.get_json()['job_id'])
+    return hope
+
+
+def wait_for_hope_training(client, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/train-hope/{job_id}').get_json()
+        if job['status'] not in ('pending', 'running'):
+            if job['status'] != 'completed':
+                raise RuntimeError(f"Hope training {job['status']}: {job['error']}")
+            return job
+        time.sleep(0.1)
+    raise RuntimeError('Hope training did not finish in time')
+
+
+def build_references(ml, hope, ml_texts):
+    """Single-threaded results every concurrent response is compared against"""
+    references = {}
+    if ml is not None:
+        client = ml.app.test_client()
+        references['ml'] = {
+            text: ml_signature(client.post('/predict-hate-speech', json={'text': text}).get_json())
+            for text in ml_texts
+        }
+    if hope is not None:
+        client = hope.app.test_client()
+        references['hope'] = {
+            text: hope_signature(client.post('/counsel', json={
+                'message': text, 'user_id': 'reference'}).get_json())
+            for text in HOPE_MESSAGES
+        }
+    return references
+
+
+def run_operation(operation, clients, rng, ml_texts, references, results):
+    """Issue one request and record its latency, status and reference agreement"""
+    ml_client, hope_client = clients
+    text = None
+    started = time.perf_counter()
+
+    if operation == 'predict':
+        text = rng.choice(ml_texts)
+        response = ml_client.post('/predict-hate-speech', json={'text': text})
+    elif operation == 'report':
+        response = ml_client.post('/report-abuse', json={
+            'text': rng.choice(ml_texts), 'userId': rng.randint(1, 50),
+            'reportedUserId': rng.randint(51, 100)})
+    elif operation == 'store':
+        # Unlabeled rows never enter the training corpus, so retrains stay deterministic
+        response = ml_client.post('/store-training-data', json={
+            'text': rng.choice(ml_texts), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'userId': rng.randint(1, 50), 'prediction': {}})
+    elif operation == 'stats':
+        path = rng.choice(['/model-stats', '/get-pending-reports'])
+        response = ml_client.get(path)
+    elif operation == 'retrain':
+        response = ml_client.post('/retrain-model')
+    elif operation == 'counsel':
+        text = rng.choice(HOPE_MESSAGES)
+        response = hope_client.post('/counsel', json={
+            'message': text, 'user_id': f"stress-{rng.randint(1, 50)}"})
+    elif operation == 'hope_stats':
+        response = hope_client.get('/hope-stats')
+    elif operation == 'history':
+        response = hope_client.get('/hope-conversations?limit=20')
+    elif operation == 'train':
+        response = hope_client.post('/train-hope')
+    else:
+        raise ValueError(f"Unknown operation {operation}")
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    body = response.get_data(as_text=True)
+    busy = operation == 'train' and response.status_code == 409
+    ok = response.status_code < 400 or busy
+    results.record(operation, latency_ms, ok, busy, 'database is locked' in body)
+
+    if ok and operation == 'predict':
+        actual = ml_signature(response.get_json())
+        if actual != references['ml'][text]:
+            results.mismatch(operation, text, references['ml'][text], actual)
+    elif ok and operation == 'counsel':
+        actual = hope_signature(response.get_json())
+        if actual != references['hope'][text]:
+            results.mismatch(operation, text, references['hope'][text], actual)
+
+
+def run_stress(ml, hope, ml_texts, references, threads, duration, seed):
+    """Fire the weighted operation mix from many threads until the deadline"""
+    weights = {}
+    if ml is not None:
+        weights.update(ML_OPERATIONS)
+    if hope is not None:
+        weights.update(HOPE_OPERATIONS)
+    operations, operation_weights = zip(*weights.items())
+
+    results = Results()
+    start_barrier = Barrier(threads)
+    deadline = [None]
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        clients = (ml.app.test_client() if ml else None, hope.app.test_client() if hope else None)
+        start_barrier.wait()
+        while time.monotonic() < deadline[0]:
+            operation = rng.choices(operations, operation_weights)[0]
+            try:
+                run_operation(operation, clients, rng, ml_texts, references, results)
+            except Exception as e:
+                logger.error(f"{operation} raised {e!r}")
+                results.record(operation, 0.0, False)
+
+    deadline[0] = time.monotonic() + duration
+    workers = [Thread(target=worker, args=(i,), name=f"stress-{i}") for i in range(threads)]
+    started = time.monotonic()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results, time.monotonic() - started
+
+
+def summarize(results, elapsed, locked_logs, threads):
+    """Per-operation throughput and tail latency plus the totals the gates check"""
+    operations = {}
+    total_requests = 0
+    total_errors = 0
+    for operation, latencies in sorted(results.latencies.items()):
+        total_requests += len(latencies)
+        total_errors += results.errors[operation]
+        operations[operation] = dict(
+            requests=len(latencies),
+            errors=results.errors[operation],
+            busy=results.busy[operation],
+            rps=round(len(latencies) / elapsed, 2),
+            **percentiles(latencies))
+
+    all_latencies = [value for latencies in results.latencies.values() for value in latencies]
+    return {
+        'threads': threads,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total_requests,
+        'rps': round(total_requests / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(total_errors / total_requests, 5) if total_requests else 0.0,
+        'database_locked': locked_logs + results.locked_responses,
+        'reference_mismatches': results.mismatches,
+        'mismatch_examples': results.mismatch_examples,
+        'latency_ms': percentiles(all_latencies),
+        'operations': operations
+    }
+
+
+def check_gates(summary, args):
+    """Names of the gates the run failed"""
+    failures = []
+    if summary['reference_mismatches'] > args.max_mismatches:
+        failures.append(f"{summary['reference_mismatches']} results differ from the single-threaded reference")
+    if summary['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {summary['error_rate']} exceeds {args.max_error_rate}")
+    if summary['database_locked'] > args.max_locked:
+        failures.append(f"{summary['database_locked']} 'database is locked' errors")
+    if args.max_p99_ms is not None and (summary['latency_ms']['p99'] or 0) > args.max_p99_ms:
+        failures.append(f"p99 {summary['latency_ms']['p99']} ms exceeds {args.max_p99_ms} ms")
+    if args.min_rps is not None and summary['rps'] < args.min_rps:
+        failures.append(f"throughput {summary['rps']} rps is below {args.min_rps}")
+    return failures
+
+
+def print_summary(summary, failures):
+    print(f"\n{summary['requests']} requests from {summary['threads']} threads in "
+          f"{summary['elapsed_seconds']}s ({summary['rps']} rps)")
+    print(f"{'operation':<12}{'requests':>9}{'errors':>8}{'busy':>6}{'rps':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for operation, stats in summary['operations'].items():
+        print(f"{operation:<12}{stats['requests']:>9}{stats['errors']:>8}{stats['busy']:>6}"
+              f"{stats['rps']:>9}{stats['p50']:>9}{stats['p95']:>9}{stats['p99']:>9}")
+    print(f"Reference mismatches: {summary['reference_mismatches']}")
+    for example in summary['mismatch_examples']:
+        print(f"  {example}")
+    print(f"'database is locked': {summary['database_locked']}")
+    print('PASS' if not failures else 'FAIL: ' + '; '.join(failures))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent load against both Flask apps')
+    parser.add_argument('--service', choices=['ml', 'hope', 'both'], default='both')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of concurrent load')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--seed-rows', type=int, default=3000,
+                        help='labeled_data.csv rows loaded before the first retrain')
+    parser.add_argument('--texts', type=int, default=200, help='distinct texts sent to /predict-hate-speech')
+    parser.add_argument('--workdir', help='directory for scratch databases (default: a new temp dir)')
+    parser.add_argument('--report', help='write the summary as JSON to this path')
+    parser.add_argument('--max-mismatches', type=int, default=0)
+    parser.add_argument('--max-error-rate', type=float, default=0.0)
+    parser.add_argument('--max-locked', type=int, default=0)
+    parser.add_argument('--max-p99-ms', type=float)
+    parser.add_argument('--min-rps', type=float)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    locked_counter = LockedErrorCounter()
+    logging.getLogger().addHandler(locked_counter)
+
+    report_path = os.path.abspath(args.report) if args.report else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix='stress-')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    print(f"Scratch databases in {workdir}")
+
+    ml = setup_ml(args.seed_rows) if args.service in ('ml', 'both') else None
+    hope = setup_hope() if args.service in ('hope', 'both') else None
+    # Both apps log every request at INFO; keep the harness output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    ml_texts = sample_texts(args.texts, args.seed) if ml else []
+    references = build_references(ml, hope, ml_texts)
+
+    results, elapsed = run_stress(ml, hope, ml_texts, references, args.threads, args.duration, args.seed)
+    summary = summarize(results, elapsed, locked_counter.count, args.threads)
+    failures = check_gates(summary, args)
+    summary['failures'] = failures
+    print_summary(summary, failures)
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
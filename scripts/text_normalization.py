@@ -0,0 +1,158 @@
+"""
+Text normalization shared by the hate speech detector, Hope and their training tools
+Keeping a single implementation guarantees that cached training corpora and live
+predictions see identical text.
+"""
+
+import hashlib
+import re
+from functools import cached_property
+
+# Bump whenever preprocess_moderation_text changes output, so cached corpora rebuild
+NORMALIZATION_VERSION = 1
+
+# Compiled once; every request and training row goes through these
+_URL_RE = re.compile(
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_MENTION_RE = re.compile(r'@\w+|#\w+')
+_REPEAT_RE = re.compile(r'(.)\1{2,}')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Deliberate misspellings and l33t speak; no replacement is itself replaced, so one pass suffices
+_LEET_TABLE = str.maketrans({
+    '@': 'a', '3': 'e', '1': 'i', '0': 'o', '5': 's', '7': 't',
+    '4': 'a', '$': 's', '!': 'i', '+': 't'
+})
+
+
+def preprocess_moderation_text(text):
+    """Advanced text preprocessing"""
+    # Remove URLs
+    text = _URL_RE.sub('', text)
+
+    # Remove mentions and hashtags
+    text = _MENTION_RE.sub('', text)
+
+    # Handle character repetition (e.g., "sooooo" -> "so")
+    text = _REPEAT_RE.sub(r'\1\1', text)
+
+    # Handle deliberate misspellings and l33t speak
+    text = text.translate(_LEET_TABLE)
+
+    # Remove excessive punctuation
+    text = _PUNCTUATION_RE.sub(' ', text)
+
+    # Remove extra whitespace
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def preprocess_counseling_text(text):
+    """Hope's normalization: lowercase with collapsed whitespace"""
+    if not text:
+        return ""
+    return _WHITESPACE_RE.sub(' ', text.lower()).strip()
+
+
+def word_ngrams(tokens, ngram_range):
+    """Word n-grams in the order sklearn's word analyzer produces them"""
+    min_n, max_n = ngram_range
+    if max_n == 1:
+        return list(tokens)
+    grams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n + 1, len(tokens) + 1)):
+        for i in range(len(tokens) - n + 1):
+            grams.append(' '.join(tokens[i:i + n]))
+    return grams
+
+
+def word_analyzer_settings(vectorizer):
+    """
+    Hashable settings of a fitted vectorizer's default word analyzer, for AnalyzedText.ngrams
+    None when the analyzer is customized and only the vectorizer itself can tokenize
+    """
+    if (vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None
+            or vectorizer.preprocessor is not None or vectorizer.strip_accents is not None):
+        return None
+    stop_words = vectorizer.get_stop_words()
+    return (vectorizer.token_pattern, vectorizer.lowercase,
+            frozenset(stop_words) if stop_words else None, tuple(vectorizer.ngram_range))
+
+
+class AnalyzedText:
+    """
+    One request's text with its normalized forms, each computed on first use
+    Pattern, keyword, campaign, fingerprint and model-scoring stages share one object
+    instead of re-normalizing and re-tokenizing the same text.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._ngrams = {}
+
+    @cached_property
+    def normalized(self):
+        """Moderation normalization, as seen by the detector's patterns and model"""
+        return preprocess_moderation_text(self.text)
+
+    @cached_property
+    def folded(self):
+        """Case-folded moderation normalization"""
+        return self.normalized.lower()
+
+    @cached_property
+    def tokens(self):
+        """Whitespace tokens of the folded text"""
+        return self.folded.split()
+
+    @cached_property
+    def fingerprint(self):
+        """Hex digest identifying near-verbatim repeats"""
+        return hashlib.blake2b(self.folded.encode('utf-8'), digest_size=16).hexdigest()
+
+    @cached_property
+    def counseling(self):
+        """Hope's normalization, as seen by its keywords, patterns and model"""
+        return preprocess_counseling_text(self.text)
+
+    def ngrams(self, settings):
+        """Word n-grams of the normalized text, as sklearn's analyzer with these settings yields them"""
+        grams = self._ngrams.get(settings)
+        if grams is None:
+            token_pattern, lowercase, stop_words, ngram_range = settings
+            tokens = re.findall(token_pattern, self.folded if lowercase else self.normalized)
+            if stop_words is not None:
+                tokens = [token for token in tokens if token not in stop_words]
+            grams = self._ngrams[settings] = word_ngrams(tokens, ngram_range)
+        return grams
+
+
+def analyze_text(text):
+    """An AnalyzedText for text, passing existing ones through"""
+    return text if isinstance(text, AnalyzedText) else AnalyzedText(text)
+
+
+def content_fingerprint(text):
+    """Hex digest of the case-folded normalized text, identifying near-verbatim repeats"""
+    return analyze_text(text).fingerprint
+
+
+def text_windows(text, size, overlap):
+    """
+    (start, end) spans of overlapping windows covering text, for bounded-cost scoring
+    Window ends are pulled back to whitespace where possible so words are not split.
+    """
+    if len(text) <= size:
+        return [(0, len(text))]
+
+    spans = []
+    start = 0
+    while True:
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(' ', start + size // 2, end)
+            if cut > start:
+                end = cut
+        spans.append((start, end))
+        if end >= len(text):
+            return spans
+        start = max(end - overlap, start + 1)
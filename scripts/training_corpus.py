@@ -0,0 +1,312 @@
+"""
+Cached, columnar training corpus for the hate speech detector
+Imports the bundled CSV datasets and the training_data table once, normalizes every
+row with the detector's preprocessing and stores text, labels and content hashes as
+memory-mappable numpy columns. Rebuilds only re-read sources whose fingerprint
+changed and only re-normalize rows whose content hash is new.
+
+Usage:
+    python training_corpus.py build [--cache-dir DIR]
+    python training_corpus.py info [--cache-dir DIR]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from text_normalization import NORMALIZATION_VERSION, preprocess_moderation_text
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPTS_DIR, 'corpus_cache', 'full')
+CACHE_FORMAT_VERSION = 1
+CLEAN_CATEGORY = 'not_hate_speech'
+
+# labeled_data.csv "class" column: 0 hate speech, 1 offensive language, 2 neither
+LABELED_DATA_CATEGORIES = {'0': 'hate_speech', '1': 'offensive', '2': CLEAN_CATEGORY}
+
+
+def content_hash(text):
+    """16-byte digest identifying a raw text"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class CsvSource:
+    """Labeled rows from a CSV file; any category except not_hate_speech is abusive"""
+
+    def __init__(self, path, text_column, category_column, category_map=None, name=None,
+                 stream=None):
+        self.path = path
+        self.text_column = text_column
+        self.category_column = category_column
+        self.category_map = category_map
+        self.name = name or os.path.basename(path)
+        # An already open text stream (e.g. an upload) is read instead of path
+        self.stream = stream
+
+    def fingerprint(self):
+        """Size and modification time; a change triggers a re-read"""
+        stat = os.stat(self.path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def rows(self):
+        """Yield (text, category, label) tuples"""
+        if self.stream is not None:
+            yield from self._read(self.stream)
+            return
+        with open(self.path, newline='', encoding='utf-8') as f:
+            yield from self._read(f)
+
+    def _read(self, f):
+        for row in csv.DictReader(f):
+            text = row.get(self.text_column)
+            category = row.get(self.category_column)
+            if not text or category is None:
+                continue
+            if self.category_map is not None:
+                category = self.category_map.get(category)
+                if category is None:
+                    continue
+            yield text, category, 0 if category == CLEAN_CATEGORY else 1
+
+
+class TrainingDataSource:
+    """Human-labeled rows from the training_data table, labeled the way /retrain-model does"""
+
+    def __init__(self, db_path, name='training_data'):
+        self.db_path = db_path
+        self.name = name
+
+    def fingerprint(self):
+        """Always re-read; the table is cheap to scan and unchanged rows are reused by content hash"""
+        return None
+
+    def rows(self):
+        """Yield (text, category, label) tuples"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT text, human_label FROM training_data
+                WHERE human_label IS NOT NULL
+                ORDER BY id
+            ''')
+            for text, human_label in cursor:
+                yield text, human_label, 1 if human_label == 'hate_speech' else 0
+        finally:
+            conn.close()
+
+
+def default_sources(db_path=None):
+    """The bundled datasets plus the service's training_data table"""
+    sources = [
+        CsvSource(os.path.join(SCRIPTS_DIR, 'labeled_data.csv'), 'tweet', 'class',
+                  category_map=LABELED_DATA_CATEGORIES),
+        CsvSource(os.path.join(SCRIPTS_DIR, 'foul_language_training_data.csv'), 'text', 'category'),
+    ]
+    db_path = db_path or os.path.join(SCRIPTS_DIR, 'training_data.db')
+    if os.path.exists(db_path):
+        sources.append(TrainingDataSource(db_path))
+    return sources
+
+
+class TrainingCorpus:
+    """Read-only view over a built corpus; numeric columns are memory-mapped"""
+
+    def __init__(self, build_dir, manifest, mmap=True):
+        mode = 'r' if mmap else None
+        self.build_dir = build_dir
+        self.manifest = manifest
+        self.text_blob = np.load(os.path.join(build_dir, 'text.npy'), mmap_mode=mode)
+        self.offsets = np.load(os.path.join(build_dir, 'offsets.npy'), mmap_mode=mode)
+        self.labels = np.load(os.path.join(build_dir, 'labels.npy'), mmap_mode=mode)
+        self.category_codes = np.load(os.path.join(build_dir, 'categories.npy'), mmap_mode=mode)
+        self.hashes = np.load(os.path.join(build_dir, 'hashes.npy'), mmap_mode=mode)
+        self.category_names = manifest['categories']
+
+    def __len__(self):
+        return len(self.labels)
+
+    def text(self, index):
+        """Normalized text of one row"""
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.text_blob[start:stop].tobytes().decode('utf-8')
+
+    def texts(self, start=0, stop=None):
+        """Normalized texts for a row range, decoded in one pass"""
+        stop = len(self) if stop is None else stop
+        offsets = self.offsets[start:stop + 1]
+        base = int(offsets[0])
+        data = self.text_blob[base:int(offsets[-1])].tobytes()
+        return [data[int(a) - base:int(b) - base].decode('utf-8')
+                for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def categories(self, start=0, stop=None):
+        """Category names for a row range"""
+        return [self.category_names[code] for code in self.category_codes[start:stop]]
+
+    def source_range(self, name):
+        """(start, stop) row range contributed by a source"""
+        source = self.manifest['sources'][name]
+        return source['start'], source['stop']
+
+
+def _current_build_dir(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'CURRENT'), encoding='utf-8') as f:
+            return os.path.join(cache_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def load_corpus(cache_dir=DEFAULT_CACHE_DIR, mmap=True):
+    """Load the current corpus build, or None if there is no compatible build"""
+    build_dir = _current_build_dir(cache_dir)
+    if build_dir is None or not os.path.isdir(build_dir):
+        return None
+    with open(os.path.join(build_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if (manifest.get('format_version') != CACHE_FORMAT_VERSION or
+            manifest.get('normalization_version') != NORMALIZATION_VERSION):
+        return None
+    return TrainingCorpus(build_dir, manifest, mmap=mmap)
+
+
+def build_corpus(sources, cache_dir=DEFAULT_CACHE_DIR):
+    """Bring the cache in line with sources and return the loaded corpus"""
+    started = time.perf_counter()
+    previous = load_corpus(cache_dir)
+    reusable = {}
+
+    texts = []
+    labels = []
+    category_codes = []
+    hashes = []
+    category_names = []
+    category_index = {}
+    manifest_sources = {}
+    stats = {'reused_sources': 0, 'reused_rows': 0, 'normalized_rows': 0}
+
+    def category_code(name):
+        if name not in category_index:
+            category_index[name] = len(category_names)
+            category_names.append(name)
+        return category_index[name]
+
+    for source in sources:
+        fingerprint = source.fingerprint()
+        start = len(texts)
+        previous_source = previous.manifest['sources'].get(source.name) if previous else None
+
+        if previous_source and fingerprint is not None and previous_source['fingerprint'] == fingerprint:
+            # Source unchanged: copy its rows without reading or normalizing anything
+            p_start, p_stop = previous_source['start'], previous_source['stop']
+            texts.extend(previous.texts(p_start, p_stop))
+            labels.extend(int(label) for label in previous.labels[p_start:p_stop])
+            category_codes.extend(category_code(name) for name in previous.categories(p_start, p_stop))
+            hashes.extend(bytes(digest) for digest in previous.hashes[p_start:p_stop])
+            stats['reused_sources'] += 1
+            stats['reused_rows'] += p_stop - p_start
+        else:
+            if previous is not None and not reusable:
+                # Normalized text only depends on the raw text, so index it by content hash
+                reusable = dict(zip((bytes(digest) for digest in previous.hashes), previous.texts()))
+            for text, category, label in source.rows():
+                digest = content_hash(text)
+                normalized = reusable.get(digest)
+                if normalized is None:
+                    normalized = preprocess_moderation_text(text)
+                    stats['normalized_rows'] += 1
+                else:
+                    stats['reused_rows'] += 1
+                texts.append(normalized)
+                labels.append(label)
+                category_codes.append(category_code(category))
+                hashes.append(digest)
+
+        manifest_sources[source.name] = {
+            'fingerprint': fingerprint,
+            'start': start,
+            'stop': len(texts)
+        }
+
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    manifest = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'normalization_version': NORMALIZATION_VERSION,
+        'rows': len(texts),
+        'categories': category_names,
+        'sources': manifest_sources,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+    # Each build goes to its own directory; CURRENT is swapped atomically so
+    # concurrent readers keep their (possibly memory-mapped) build intact
+    os.makedirs(cache_dir, exist_ok=True)
+    build_name = f"build-{uuid.uuid4().hex[:12]}"
+    build_dir = os.path.join(cache_dir, build_name)
+    os.makedirs(build_dir)
+    np.save(os.path.join(build_dir, 'text.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(os.path.join(build_dir, 'offsets.npy'), offsets)
+    np.save(os.path.join(build_dir, 'labels.npy'), np.array(labels, dtype=np.int8))
+    np.save(os.path.join(build_dir, 'categories.npy'), np.array(category_codes, dtype=np.int16))
+    np.save(os.path.join(build_dir, 'hashes.npy'), np.array(hashes, dtype='S16'))
+    with open(os.path.join(build_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    pointer = os.path.join(cache_dir, f"CURRENT.{build_name}")
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(build_name)
+    os.replace(pointer, os.path.join(cache_dir, 'CURRENT'))
+
+    for entry in os.listdir(cache_dir):
+        if entry.startswith('build-') and entry != build_name:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+    logger.info(
+        f"Corpus built with {len(texts)} rows in {time.perf_counter() - started:.2f}s "
+        f"({stats['normalized_rows']} normalized, {stats['reused_rows']} reused)")
+    return load_corpus(cache_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect the cached training corpus')
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--db', default=None, help='training_data SQLite database to include')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        corpus = build_corpus(default_sources(args.db), args.cache_dir)
+    else:
+        started = time.perf_counter()
+        corpus = load_corpus(args.cache_dir)
+        if corpus is None:
+            print('No corpus cache found; run "python training_corpus.py build" first')
+            return 1
+        corpus.texts()
+        print(f"Loaded and decoded in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"Rows: {len(corpus)}")
+    print(f"Abusive: {int(np.sum(corpus.labels))}")
+    for name, source in corpus.manifest['sources'].items():
+        print(f"- {name}: {source['stop'] - source['start']} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Bulk ingestion of labeled examples into the training_data table
+Streams rows from the bundled CSV datasets (or any iterable), maps their source
+categories to human_label, skips texts whose content hash is already stored and
+inserts the rest with executemany in large transactions.
+
+Usage:
+    python training_ingest.py labeled_data.csv --preset labeled_data
+    python training_ingest.py foul_language_training_data.csv --preset foul_language
+    python training_ingest.py my.csv --text-column body --category-column label [--db PATH]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+from text_normalization import content_fingerprint
+from training_corpus import CLEAN_CATEGORY, LABELED_DATA_CATEGORIES, SCRIPTS_DIR, CsvSource
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(SCRIPTS_DIR, 'training_data.db')
+INGEST_BATCH_SIZE = 5000
+HUMAN_LABELS = ('hate_speech', 'not_hate_speech')
+
+# Column layouts of the bundled datasets
+CSV_PRESETS = {
+    'labeled_data': {'text_column': 'tweet', 'category_column': 'class',
+                     'category_map': LABELED_DATA_CATEGORIES},
+    'foul_language': {'text_column': 'text', 'category_column': 'category'},
+}
+
+
+def init_training_table(cursor):
+    """Create training_data and its content hash index, hashing pre-existing rows once"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS training_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            user_id INTEGER,
+            prediction TEXT,
+            human_label TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('PRAGMA table_info(training_data)')
+    if 'content_hash' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE training_data ADD COLUMN content_hash TEXT')
+        cursor.execute('SELECT id, text FROM training_data')
+        cursor.executemany(
+            'UPDATE training_data SET content_hash = ? WHERE id = ?',
+            [(content_fingerprint(text), row_id) for row_id, text in cursor.fetchall()])
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_training_data_content_hash
+        ON training_data (content_hash)
+    ''')
+
+
+def human_label_for(category):
+    """Map a source category to human_label; any category except not_hate_speech is abusive"""
+    return CLEAN_CATEGORY if category == CLEAN_CATEGORY else 'hate_speech'
+
+
+def csv_training_rows(source, timestamp=None):
+    """Training rows from a CsvSource, keeping the source category in prediction"""
+    timestamp = timestamp or datetime.now().isoformat()
+    for text, category, _label in source.rows():
+        prediction = json.dumps({'source': source.name, 'category': category})
+        yield text, timestamp, None, prediction, human_label_for(category)
+
+
+def ingest_rows(conn, rows, batch_size=INGEST_BATCH_SIZE):
+    """
+    Insert (text, timestamp, user_id, prediction, human_label) rows, skipping duplicates
+    Each batch is one transaction; duplicates within a batch are caught as well,
+    since executemany sees the rows inserted before it.
+    """
+    stats = {'received': 0, 'inserted': 0, 'duplicates': 0, 'skipped': 0}
+    cursor = conn.cursor()
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        stats['received'] += len(chunk)
+
+        batch = []
+        for text, timestamp, user_id, prediction, human_label in chunk:
+            if not text or not text.strip() or human_label not in HUMAN_LABELS:
+                stats['skipped'] += 1
+                continue
+            digest = content_fingerprint(text)
+            batch.append((text, timestamp, user_id, prediction, human_label, digest, digest))
+
+        try:
+            cursor.executemany('''
+                INSERT INTO training_data (text, timestamp, user_id, prediction, human_label, content_hash)
+                SELECT ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM training_data WHERE content_hash = ?)
+            ''', batch)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        inserted = max(cursor.rowcount, 0)
+        stats['inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+
+    return stats
+
+
+def ingest_csv(db_path, path, preset=None, text_column=None, category_column=None,
+               batch_size=INGEST_BATCH_SIZE):
+    """Ingest one CSV file into training_data and return the ingestion stats"""
+    options = dict(CSV_PRESETS[preset]) if preset else {}
+    if text_column:
+        options['text_column'] = text_column
+    if category_column:
+        options['category_column'] = category_column
+    if 'text_column' not in options or 'category_column' not in options:
+        raise ValueError('Text and category columns are required without a preset')
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        init_training_table(conn.cursor())
+        conn.commit()
+        stats = ingest_rows(conn, csv_training_rows(CsvSource(path, **options)), batch_size)
+    finally:
+        conn.close()
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Ingested {os.path.basename(path)}: {stats['inserted']} inserted, "
+        f"{stats['duplicates']} duplicates, {stats['skipped']} skipped in {stats['seconds']}s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk load labeled CSV data into training_data')
+    parser.add_argument('paths', nargs='+', help='CSV files to ingest')
+    parser.add_argument('--preset', choices=sorted(CSV_PRESETS))
+    parser.add_argument('--text-column')
+    parser.add_argument('--category-column')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        stats = ingest_csv(args.db, path, args.preset, args.text_column,
+                           args.category_column, args.batch_size)
+        print(f"{path}: {json.dumps(stats)}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())